@@ -0,0 +1,463 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import json
+import logging
+import os
+import re
+import shlex
+
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+from ginga.misc import Bunch
+from ginga.util import wcs
+
+from .config import load_config
+from .finders import fetch_survey_image, image_archives, make_server_bank
+from .finding_chart import annotate_finder
+from .footprint import Footprint
+from .geometry import radectopix
+from .guider import guider_outline
+from .hcam_finder import add_ccd_parts, ccd_windows, window_text
+from .image_cache import calc_cut_levels, load_fits
+from .pyramid import build_pyramid
+from .render import circle_shape, footprint_shapes, render_chart
+
+
+def _parse_coords(ra, dec):
+    """
+    Position from sexagesimal (RA in hours) or decimal degree strings
+    """
+    if ":" in ra or " " in ra.strip():
+        return SkyCoord(ra, dec, unit=(u.hourangle, u.deg))
+    return SkyCoord(float(ra), float(dec), unit=u.deg)
+
+
+def read_setup(path):
+    """
+    Read a target and windows from a setup file saved by ``hfinder``
+
+    Returns
+    -------
+    target : `~ginga.misc.Bunch.Bunch`
+        name, pointing (ra, dec), target position (targ_ra, targ_dec), all
+        in deg, rotator PA (deg), windows (wframe), whether they are drift
+        mode window pairs (drift) and nod offsets (nods) as (RA, Dec) in
+        arcsec
+    """
+    with open(path) as fp:
+        data = json.load(fp)
+    info = data.get("target", {})
+    target = Bunch.Bunch(name=info.get("target", ""), pa=float(info.get("PA", 0)))
+    if "RA" in info:
+        coo = _parse_coords(info["RA"], info["DEC"])
+        target.ra, target.dec = float(coo.ra.deg), float(coo.dec.deg)
+        coo = _parse_coords(
+            info.get("TARG_RA", info["RA"]), info.get("TARG_DEC", info["DEC"])
+        )
+        target.targ_ra, target.targ_dec = float(coo.ra.deg), float(coo.dec.deg)
+    appdata = data.get("appdata", {})
+    target.update(setup_windows(appdata))
+    nods = appdata.get("nodpattern", None)
+    target.nods = list(zip(nods["ra"], nods["dec"])) if nods else []
+    return target
+
+
+def setup_windows(appdata):
+    """
+    Windows from the instrument setup saved by ``hfinder``
+
+    Returns
+    -------
+    windows : dict
+        wframe, a list of window pairs (xsl, xsr, ys, nx, ny) in drift mode
+        or quads (xsll, xsul, xslr, xsur, ys, nx, ny) otherwise, empty for
+        full frame; and drift, whether they are window pairs
+    """
+    drift = "x1start_left" in appdata
+    wframe = []
+    n = 1
+    while "y{}start".format(n) in appdata:
+        if drift:
+            names = ("x{}start_left", "x{}start_right")
+        else:
+            names = (
+                "x{}start_lowerleft",
+                "x{}start_upperleft",
+                "x{}start_lowerright",
+                "x{}start_upperright",
+            )
+        names += ("y{}start", "x{}size", "y{}size")
+        wframe.append(tuple(int(appdata[name.format(n)]) for name in names))
+        n += 1
+    return dict(wframe=wframe, drift=drift)
+
+
+def read_targets(path):
+    """
+    Read a list of targets for batch finding charts
+
+    Each line of the file gives a target name, its RA and Dec, and
+    optionally the rotator PA (deg, zero by default) and a setup file
+    saved by ``hfinder``, from which the windows and nod pattern are
+    taken. RA and Dec are sexagesimal, with RA in hours, or decimal
+    degrees. Names with spaces must be quoted, and anything after a
+    ``#`` is ignored::
+
+        # name      ra           dec          pa    setup
+        "AR Sco"    16:21:47.28  -22:53:10.4  30.0  arsco.json
+        J1234+5678  188.5        56.9
+
+    A line can also be just a setup file, in which case the name,
+    pointing and PA are taken from it too. Setup files are found relative
+    to the target list.
+
+    Returns
+    -------
+    targets : list of `~ginga.misc.Bunch.Bunch`
+        as for `read_setup`
+    """
+    direc = os.path.dirname(os.path.abspath(path))
+    targets = []
+    with open(path) as fp:
+        for nline, line in enumerate(fp, 1):
+            fields = shlex.split(line, comments=True)
+            if not fields:
+                continue
+            try:
+                if len(fields) == 1:
+                    target = read_setup(os.path.join(direc, fields[0]))
+                    if "ra" not in target:
+                        raise ValueError("no target position in " + fields[0])
+                else:
+                    name, ra, dec = fields[:3]
+                    coo = _parse_coords(ra, dec)
+                    ra, dec = float(coo.ra.deg), float(coo.dec.deg)
+                    target = Bunch.Bunch(wframe=[], drift=False, nods=[])
+                    if len(fields) > 4:
+                        setup = read_setup(os.path.join(direc, fields[4]))
+                        for key in ("wframe", "drift", "nods"):
+                            target[key] = setup[key]
+                    target.update(
+                        dict(
+                            name=name,
+                            ra=ra,
+                            dec=dec,
+                            targ_ra=ra,
+                            targ_dec=dec,
+                            pa=float(fields[3]) if len(fields) > 3 else 0.0,
+                        )
+                    )
+            except Exception as err:
+                raise ValueError("{}, line {}: {}".format(path, nline, str(err)))
+            targets.append(target)
+    return targets
+
+
+def sky_pa(pa, tel):
+    """
+    Rotation of the FoV on the sky, positive from North through East, for
+    a rotator PA (deg)
+    """
+    pa_deg = pa - tel["paOff"]
+    if not tel["EofN"]:
+        pa_deg *= -1
+    return pa_deg
+
+
+def chart_footprint(tel, windows, guider=False):
+    """
+    Footprint of the CCD and windows, as drawn by ``hfinder``
+
+    Parameters
+    ----------
+    tel : dict
+        telescope parameters, as in the telescope sections of the config
+    windows : list
+        windows as (xs, ys, nx, ny) in instr pixels
+    guider : bool
+        add the outline of the GTC guider hole?
+
+    Returns
+    -------
+    footprint : `~hcam_finder.footprint.Footprint`
+    """
+    footprint = Footprint(
+        tel["px_scale"], tel["rotcen_x"], tel["rotcen_y"], tel["flipEW"]
+    )
+    add_ccd_parts(footprint, tel["nxtot"], tel["nytot"], windows)
+    if guider:
+        footprint.add(
+            "guider_hole",
+            "polygon",
+            guider_outline(tel["flipEW"]),
+            color="green",
+            linestyle="dash",
+        )
+    return footprint
+
+
+def render_target(target, options):
+    """
+    Fetch (or re-use) the survey image for a target and draw its chart
+
+    Runs in a worker process, so everything it needs is passed in.
+
+    Parameters
+    ----------
+    target : `~ginga.misc.Bunch.Bunch`
+        target, from `read_targets`
+    options : `~ginga.misc.Bunch.Bunch`
+        telescope (name), tel (its parameters), survey, cache_dir and size
+        of the charts
+
+    Returns
+    -------
+    chart : `~PIL.Image.Image`
+        the chart, with its box of target info
+    """
+    logger = logging.getLogger(__name__)
+    tel = options.tel
+    fov = max(tel["nxtot"], tel["nytot"]) * tel["px_scale"] / 3600
+    bank = make_server_bank(logger)
+    imfile = fetch_survey_image(
+        bank, options.survey, target.ra, target.dec, 5 * fov, options.cache_dir
+    )
+    if imfile is None:
+        raise ValueError("no image for this location in " + options.survey)
+
+    image = load_fits(imfile, logger)
+    try:
+        footprint = chart_footprint(
+            tel,
+            ccd_windows(target.wframe, target.drift),
+            guider=options.telescope == "GTC",
+        )
+        _, pix = footprint.place(image, target.ra, target.dec, sky_pa(target.pa, tel))
+        shapes = footprint_shapes(footprint, pix)
+        # 3 arcsecond radius target marker
+        x, y = radectopix(image, target.targ_ra, target.targ_dec)
+        radius = wcs.calc_radius_xy(image, x, y, 3 / 3600)
+        shapes.append(
+            circle_shape(
+                x, y, radius, color="blue", linewidth=3, fill=True, fillalpha=0.3
+            )
+        )
+        image.set(pyramid=build_pyramid(image.get_data()))
+        chart = render_chart(
+            image,
+            calc_cut_levels(image.get_data()),
+            shapes,
+            size=options.size,
+            flip_x=tel["flipEW"],
+        )
+    finally:
+        image.get("hdulist").close()
+
+    ra_txt, dec_txt = coord_strings(target.ra, target.dec)
+    return annotate_finder(
+        chart,
+        target.name,
+        options.telescope,
+        ra_txt,
+        dec_txt,
+        target.pa,
+        window_text(target.wframe, target.drift),
+    )
+
+
+def coord_strings(ra, dec):
+    """
+    Sexagesimal strings for a position (deg), as shown on charts
+    """
+    coo = SkyCoord(ra, dec, unit=u.deg)
+    return (
+        coo.ra.to_string(unit=u.hourangle, sep=":", precision=2, pad=True),
+        coo.dec.to_string(sep=":", precision=1, alwayssign=True, pad=True),
+    )
+
+
+def make_chart(target, options):
+    """
+    Draw the chart for a target and write it to the output directory
+
+    Parameters
+    ----------
+    target : `~ginga.misc.Bunch.Bunch`
+        target, from `read_targets`
+    options : `~ginga.misc.Bunch.Bunch`
+        as for `render_target`, plus outdir and format of the charts
+
+    Returns
+    -------
+    fname : str
+        the finding chart written
+    """
+    fname = re.sub(r"[^\w.+-]", "_", target.name) + "." + options.format
+    fname = os.path.join(options.outdir, fname)
+    render_target(target, options).save(fname)
+    return fname
+
+
+def run_batch(targets, options, processes=None, logger=None):
+    """
+    Make finding charts for many targets, one target per worker process
+
+    Parameters
+    ----------
+    targets : list of `~ginga.misc.Bunch.Bunch`
+        targets, from `read_targets`
+    options : `~ginga.misc.Bunch.Bunch`
+        as for `make_chart`
+    processes : int, optional
+        number of processes to use; by default one per CPU. With one
+        process, no pool is started.
+    logger : `logging.Logger`, optional
+        where to report progress
+
+    Returns
+    -------
+    results : list of `~ginga.misc.Bunch.Bunch`
+        name, fname (None on failure) and error (None on success) for each
+        target, in the order given
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(targets)))
+
+    results = [None] * len(targets)
+
+    def finished(n, fname=None, error=None):
+        results[n] = Bunch.Bunch(name=targets[n].name, fname=fname, error=error)
+        if error is None:
+            logger.info("{}: wrote {}".format(targets[n].name, fname))
+        else:
+            logger.error("{}: failed: {}".format(targets[n].name, error))
+
+    if processes == 1:
+        for n, target in enumerate(targets):
+            try:
+                finished(n, fname=make_chart(target, options))
+            except Exception as err:
+                finished(n, error=str(err))
+    else:
+        with ProcessPoolExecutor(processes) as pool:
+            futures = dict(
+                (pool.submit(make_chart, target, options), n)
+                for n, target in enumerate(targets)
+            )
+            for future in as_completed(futures):
+                try:
+                    finished(futures[future], fname=future.result())
+                except Exception as err:
+                    finished(futures[future], error=str(err))
+    return results
+
+
+def batch_parser(description):
+    """
+    Command line parser with the options shared by the batch scripts
+    """
+    surveys = [archive[1] for archive in image_archives]
+    parser = argparse.ArgumentParser(
+        description=description,
+        epilog=read_targets.__doc__.split("Returns")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("targets", help="file listing the targets")
+    parser.add_argument(
+        "-s",
+        "--survey",
+        default=surveys[0],
+        choices=surveys,
+        help="survey to take images from [%(default)s]",
+    )
+    parser.add_argument(
+        "-t", "--telescope", help="telescope, WHT or GTC [as in the config file]"
+    )
+    parser.add_argument(
+        "-c",
+        "--cache",
+        default=os.path.expanduser("~/.hfinder/images"),
+        help="directory to keep survey images in for re-use [%(default)s]",
+    )
+    parser.add_argument(
+        "-n",
+        "--processes",
+        type=int,
+        default=None,
+        help="number of worker processes [one per CPU]",
+    )
+    parser.add_argument(
+        "--size", type=int, default=2000, help="size of the charts (pix) [2000]"
+    )
+    return parser
+
+
+def batch_setup(parser, args, name):
+    """
+    Read the config and targets for a batch script
+
+    Returns
+    -------
+    targets : list of `~ginga.misc.Bunch.Bunch`
+        targets, from `read_targets`
+    options : `~ginga.misc.Bunch.Bunch`
+        as for `render_target`
+    logger : `logging.Logger`
+        where to report progress
+    """
+    logging.basicConfig(format="%(levelname)s | %(message)s", level=logging.INFO)
+    logger = logging.getLogger(name)
+
+    g = Bunch.Bunch(cpars=dict(), clog=logger)
+    load_config(g)
+    telescope = args.telescope or g.cpars["telins_name"]
+    if telescope not in g.cpars:
+        parser.error("unknown telescope " + telescope)
+
+    try:
+        targets = read_targets(args.targets)
+    except Exception as err:
+        parser.error(str(err))
+    if not os.path.isdir(args.cache):
+        os.makedirs(args.cache)
+
+    options = Bunch.Bunch(
+        telescope=telescope,
+        tel=dict(g.cpars[telescope]),
+        survey=args.survey,
+        cache_dir=args.cache,
+        size=args.size,
+    )
+    return targets, options, logger
+
+
+def main(argv=None):
+    """
+    Make finding charts for a list of targets from the command line
+    """
+    parser = batch_parser("Make HiPERCAM finding charts for a list of targets")
+    parser.add_argument(
+        "-o", "--outdir", default=".", help="directory for the charts [.]"
+    )
+    parser.add_argument(
+        "--format",
+        default="jpg",
+        choices=("jpg", "png"),
+        help="format of the charts [jpg]",
+    )
+    args = parser.parse_args(argv)
+    targets, options, logger = batch_setup(parser, args, "hfinder_batch")
+    if not os.path.isdir(args.outdir):
+        os.makedirs(args.outdir)
+    options.update(dict(outdir=args.outdir, format=args.format))
+
+    results = run_batch(targets, options, args.processes, logger)
+    nfailed = sum(result.error is not None for result in results)
+    if nfailed:
+        logger.error("{} of {} charts failed".format(nfailed, len(results)))
+    return 1 if nfailed else 0
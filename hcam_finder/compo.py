@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+from astropy import units as u
+
+from .geometry import points_in_polygon, true_runs
+
+from hcam_widgets.compo.utils import (
+    InjectionArm,
+    field_stop_centre,
+    focal_plane_scale,
+    MAX_ANGLE,
+    MIRROR_SIZE,
+    SHADOW_X,
+    SHADOW_Y,
+)
+
+# COMPO is only available on GTC, so the focal plane scale is fixed
+ARCSEC_PER_MM = focal_plane_scale.to_value(u.arcsec / u.mm)
+# length of the pickoff arm (mm)
+PICKOFF_ARM_LENGTH = 270.0
+# range of travel of the pickoff arm (deg)
+PICKOFF_MAX_ANGLE = MAX_ANGLE.to_value(u.deg)
+# radius of pickoff and injection mirrors (deg)
+MIRROR_RADIUS = 0.5 * MIRROR_SIZE.to_value(u.deg)
+# baffle outline on the arms, about the mirror centre (mm)
+BAFFLE = 0.5 * np.array(
+    [
+        [-SHADOW_X.to_value(u.mm), -SHADOW_Y.to_value(u.mm)],
+        [SHADOW_X.to_value(u.mm), -SHADOW_Y.to_value(u.mm)],
+        [SHADOW_X.to_value(u.mm), SHADOW_Y.to_value(u.mm)],
+        [-SHADOW_X.to_value(u.mm), SHADOW_Y.to_value(u.mm)],
+    ]
+)
+
+_patrol_arc = {}
+_injector = {}
+
+
+def focal_plane_to_offsets(xy_mm):
+    """
+    Convert positions in the focal plane to sky offsets from the chip centre
+
+    Follows `hcam_widgets.compo.utils.focal_plane_to_sky`, which flips
+    both axes.
+
+    Parameters
+    ----------
+    xy_mm : array-like
+        focal plane positions (mm), with shape (..., 2)
+
+    Returns
+    -------
+    xy : `~numpy.ndarray`
+        offsets (deg), x to the East and y to the North
+    """
+    return -np.asarray(xy_mm, dtype=float) * ARCSEC_PER_MM / 3600
+
+
+def circle_points(centre, radius):
+    """
+    Footprint vertices for a circle: its centre and a point on the edge
+    """
+    centre = np.asarray(centre, dtype=float)
+    edge = centre + np.array([radius, 0.0])
+    return np.stack((centre, edge), axis=-2)
+
+
+def patrol_arc(npoints=40):
+    """
+    Path followed by the field stop of the injection arm
+
+    Computed once, then cached.
+
+    Returns
+    -------
+    xy : `~numpy.ndarray`
+        offsets (deg) from the chip centre, shape (npoints, 2)
+    """
+    if npoints not in _patrol_arc:
+        theta = np.linspace(-65, 65, npoints) * u.deg
+        # circular arc, swapping dec sign
+        x, y = field_stop_centre(theta)
+        _patrol_arc[npoints] = np.column_stack((x.to_value(u.deg), -y.to_value(u.deg)))
+    return _patrol_arc[npoints]
+
+
+def pickoff_position(theta_deg):
+    """
+    Position of pickoff mirror centre in focal plane (mm)
+
+    A vectorised version of `hcam_widgets.compo.utils.PickoffArm.position`.
+
+    Parameters
+    ----------
+    theta_deg : float or array-like
+        pickoff arm angle(s) in degrees
+
+    Returns
+    -------
+    xy : `~numpy.ndarray`
+        focal plane position(s), shape (..., 2)
+    """
+    theta = np.radians(theta_deg)
+    r = PICKOFF_ARM_LENGTH
+    return np.stack((r * np.sin(theta), r * (1 - np.cos(theta))), axis=-1)
+
+
+def pickoff_angle_for(xy_deg):
+    """
+    Pickoff arm angle that brings the mirror closest to sky positions
+
+    The mirror centre moves on a circle about the arm pivot, so the best
+    angle follows directly from the position angle about the pivot,
+    limited to the travel of the arm.
+
+    Parameters
+    ----------
+    xy_deg : array-like
+        positions as offsets (deg) from the chip centre, shape (..., 2)
+
+    Returns
+    -------
+    theta : `~numpy.ndarray`
+        pickoff arm angle (deg)
+    miss : `~numpy.ndarray`
+        distance (deg) from the mirror centre at that angle to each
+        position; positions within `MIRROR_RADIUS` can be picked off
+    """
+    # back to the focal plane (mm), relative to the pivot of the arm
+    xy = -np.asarray(xy_deg, dtype=float) * 3600 / ARCSEC_PER_MM
+    r = PICKOFF_ARM_LENGTH
+    theta = np.degrees(np.arctan2(xy[..., 0], r - xy[..., 1]))
+    theta = np.clip(theta, -PICKOFF_MAX_ANGLE, PICKOFF_MAX_ANGLE)
+    mirror = focal_plane_to_offsets(pickoff_position(theta))
+    miss = np.hypot(*np.moveaxis(np.asarray(xy_deg) - mirror, -1, 0))
+    return theta, miss
+
+
+def pickoff_geometry(theta_deg):
+    """
+    Outline of the pickoff arm baffle and mirror, for one or more angles
+
+    Parameters
+    ----------
+    theta_deg : float or array-like
+        pickoff arm angle(s) in degrees
+
+    Returns
+    -------
+    baffle : `~numpy.ndarray`
+        baffle corners as offsets (deg) from the chip centre, shape (..., 4, 2)
+    mirror : `~numpy.ndarray`
+        centre of pickoff mirror as offsets (deg) from the chip centre,
+        shape (..., 2)
+    """
+    theta = np.radians(theta_deg)[..., np.newaxis]
+    c, s = np.cos(theta), np.sin(theta)
+    # baffle turns with the arm
+    x = BAFFLE[:, 0] * c - BAFFLE[:, 1] * s
+    y = BAFFLE[:, 0] * s + BAFFLE[:, 1] * c
+    centre = pickoff_position(theta_deg)
+    baffle = np.stack((x, y), axis=-1) + centre[..., np.newaxis, :]
+    return focal_plane_to_offsets(baffle), focal_plane_to_offsets(centre)
+
+
+def injector_geometry(theta_deg):
+    """
+    Outline of the injection arm baffle and mirror
+
+    The injection arm only ever sits at one of a few positions, so the
+    geometry (including clipping of the baffle to the chip) is taken from
+    `hcam_widgets` and cached for each position.
+
+    Parameters
+    ----------
+    theta_deg : float
+        injection arm angle in degrees
+
+    Returns
+    -------
+    baffle : `~numpy.ndarray`
+        baffle corners as offsets (deg) from the chip centre, shape (N, 2)
+    mirror : `~numpy.ndarray`
+        centre of injection mirror as offsets (deg) from the chip centre
+    """
+    theta_deg = float(theta_deg)
+    if theta_deg not in _injector:
+        baffle, fov = InjectionArm().to_patches(theta_deg * u.deg, unit=u.mm)
+        xy = baffle.get_xy()
+        if np.all(xy[0] == xy[-1]):
+            xy = xy[:-1]
+        _injector[theta_deg] = (
+            focal_plane_to_offsets(xy),
+            focal_plane_to_offsets(fov.center),
+        )
+    return _injector[theta_deg]
+
+
+def window_samples(windows, nsamp=16):
+    """
+    Grid of sample points filling each of a set of rectangular windows
+
+    Parameters
+    ----------
+    windows : array-like
+        window corners, in order around each window, shape (W, 4, 2)
+    nsamp : int
+        number of samples along each side of a window
+
+    Returns
+    -------
+    xy : `~numpy.ndarray`
+        sample points at the centres of an nsamp x nsamp grid of cells,
+        shape (W, nsamp**2, 2)
+    """
+    windows = np.asarray(windows, dtype=float)
+    f = (np.arange(nsamp) + 0.5) / nsamp
+    fx, fy = [g.ravel()[:, np.newaxis] for g in np.meshgrid(f, f)]
+    c0 = windows[:, np.newaxis, 0]
+    c1 = windows[:, np.newaxis, 1]
+    c3 = windows[:, np.newaxis, 3]
+    return c0 + fx * (c1 - c0) + fy * (c3 - c0)
+
+
+def vignetting(windows, pickoff_angle, injector_angle=None, nsamp=16):
+    """
+    Fraction of each window vignetted by the COMPO arms
+
+    All windows are checked against all pickoff angles at once, by
+    testing a grid of points in each window against the arm baffles and
+    mirrors. The injection mirror itself is not counted, since that is
+    where the picked-off target is seen.
+
+    Parameters
+    ----------
+    windows : array-like
+        window corners as offsets (deg) from the chip centre, shape (W, 4, 2)
+    pickoff_angle : float or array-like
+        pickoff arm angle(s) in degrees
+    injector_angle : float, optional
+        injection arm angle in degrees. The injection arm is ignored if
+        not given.
+    nsamp : int
+        number of samples along each side of a window
+
+    Returns
+    -------
+    fraction : `~numpy.ndarray`
+        vignetted fraction of each window, shape pickoff_angle.shape + (W,)
+    """
+    pts = window_samples(windows, nsamp)
+    x, y = pts[..., 0], pts[..., 1]
+
+    baffle, mirror = pickoff_geometry(pickoff_angle)
+    baffle = baffle[..., np.newaxis, np.newaxis, :, :]
+    mirror = mirror[..., np.newaxis, np.newaxis, :]
+    hit = points_in_polygon(x, y, baffle)
+    hit |= np.hypot(x - mirror[..., 0], y - mirror[..., 1]) < MIRROR_RADIUS
+
+    if injector_angle is not None:
+        baffle, mirror = injector_geometry(injector_angle)
+        hit_inj = points_in_polygon(x, y, baffle)
+        hit_inj &= np.hypot(x - mirror[0], y - mirror[1]) >= MIRROR_RADIUS
+        hit |= hit_inj
+    return hit.mean(axis=-1)
+
+
+def clear_ranges(windows, step=0.5, nsamp=16):
+    """
+    Pickoff angles that leave every window clear of the pickoff arm
+
+    The whole range of travel of the pickoff arm is checked in one go.
+    The injection arm does not move with the pickoff, so is not included.
+
+    Parameters
+    ----------
+    windows : array-like
+        window corners as offsets (deg) from the chip centre, shape (W, 4, 2)
+    step : float
+        spacing of the angles checked (deg)
+    nsamp : int
+        number of samples along each side of a window
+
+    Returns
+    -------
+    ranges : list of tuple
+        (start, end) of each clear range of pickoff angle (deg)
+    """
+    angles = np.arange(-PICKOFF_MAX_ANGLE, PICKOFF_MAX_ANGLE + 0.5 * step, step)
+    clear = np.all(vignetting(windows, angles, nsamp=nsamp) == 0, axis=-1)
+    return [(angles[i], angles[j]) for i, j in true_runs(clear)]
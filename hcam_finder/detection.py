@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+
+from .star_catalog import angular_separation
+
+# zero point used for detected sources when the image header gives none
+DEFAULT_ZERO_POINT = 25.0
+# header keywords that may hold the photometric zero point of a survey image
+ZERO_POINT_KEYWORDS = ("MAGZP", "PHOTZP", "ZEROPT", "ZP", "FPA.ZP")
+
+
+def zero_point(image):
+    """
+    Photometric zero point of an image, from its header
+
+    Returns
+    -------
+    zp : float or None
+        magnitude of a source giving one count, or None if not known
+    """
+    header = image.get_header()
+    for key in ZERO_POINT_KEYWORDS:
+        try:
+            return float(header[key])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def _block_stats(data, box, stride=4):
+    """
+    Median and robust RMS of each box x box block of an image
+
+    Only every `stride`-th pixel in each direction is used, which is
+    plenty for a background estimate and much faster.
+    """
+    ny, nx = data.shape
+    nby, nbx = max(1, ny // box), max(1, nx // box)
+    by, bx = ny // nby, nx // nbx
+    blocks = data[: nby * by, : nbx * bx].reshape(nby, by, nbx, bx)
+    sample = blocks[:, ::stride, :, ::stride].swapaxes(1, 2).reshape(nby, nbx, -1)
+    median = np.nanmedian(sample, axis=-1)
+    mad = np.nanmedian(np.abs(sample - median[..., np.newaxis]), axis=-1)
+    return median, 1.4826 * mad, (by, bx)
+
+
+def _block_weights(pos, size, nblock):
+    """
+    Neighbouring block centres and interpolation weights for pixel positions
+    """
+    pos = np.clip((np.asarray(pos) + 0.5) / size - 0.5, 0, nblock - 1)
+    lo = np.minimum(pos.astype(int), max(nblock - 2, 0))
+    hi = np.minimum(lo + 1, nblock - 1)
+    return lo, hi, (pos - lo).astype(np.float32)
+
+
+def _interpolate_blocks(values, block, y, x, grid=True):
+    """
+    Bilinear interpolation of values at block centres
+
+    Values are found on the grid of pixels given by the 1D arrays `y` and
+    `x`, or at the points (`y`, `x`) if `grid` is False.
+    """
+    ylo, yhi, wy = _block_weights(y, block[0], values.shape[0])
+    xlo, xhi, wx = _block_weights(x, block[1], values.shape[1])
+    values = values.astype(np.float32)
+    if grid:
+        wy = wy[:, np.newaxis]
+        rows = (1 - wy) * values[ylo] + wy * values[yhi]
+        return (1 - wx) * rows[:, xlo] + wx * rows[:, xhi]
+    return (1 - wy) * ((1 - wx) * values[ylo, xlo] + wx * values[ylo, xhi]) + wy * (
+        (1 - wx) * values[yhi, xlo] + wx * values[yhi, xhi]
+    )
+
+
+def _smooth3(data):
+    """
+    3x3 box sum of the interior pixels of an image, shape (ny - 2, nx - 2)
+    """
+    rows = data[:-2] + data[1:-1]
+    rows += data[2:]
+    out = rows[:, :-2] + rows[:, 1:-1]
+    out += rows[:, 2:]
+    return out
+
+
+def detect_sources(data, nsigma=5.0, box=64, radius=2, max_sources=2000):
+    """
+    Find point sources in an image
+
+    The background and its noise are estimated in blocks, and a detection
+    threshold interpolated from them to every pixel. Pixels of a lightly
+    smoothed copy of the image that are above the threshold are then
+    compared with their neighbours, so only local maxima are kept. Each
+    source is centroided, and its flux summed, in a small box about the
+    peak, after subtracting the background there. Every step works on
+    whole arrays, and only the few that must touch every pixel do, so a
+    4k x 4k image takes a fraction of a second.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        2D image data
+    nsigma : float
+        detection threshold, in units of the background noise of the
+        smoothed image
+    box : int
+        size of the blocks used to estimate the background (pix)
+    radius : int
+        half-width of the box used for centroids and fluxes (pix)
+    max_sources : int
+        the most sources to return; the brightest are kept
+
+    Returns
+    -------
+    x, y : `~numpy.ndarray`
+        centroids of the sources (pix, zero-based)
+    flux : `~numpy.ndarray`
+        background subtracted flux in the box about each source, in data
+        units, sorted from brightest to faintest
+    """
+    data = np.asarray(data, dtype=np.float32)
+    ny, nx = data.shape
+    median, rms, block = _block_stats(data, box)
+
+    # 3x3 sums reduce the noise relative to the signal by a factor 3
+    threshold = 9 * median + 3 * nsigma * rms
+    smoothed = _smooth3(data)
+    above = smoothed > _interpolate_blocks(
+        threshold, block, np.arange(1, ny - 1), np.arange(1, nx - 1)
+    )
+    # smoothed[j, i] is centred on pixel (j + 1, i + 1)
+    edge = radius + 1
+    ys, xs = np.nonzero(above[edge - 1 : 1 - edge, edge - 1 : 1 - edge])
+    ys += edge - 1
+    xs += edge - 1
+
+    # local maxima; ties go to the first pixel in raster order
+    peak = smoothed[ys, xs]
+    keep = np.ones(len(ys), dtype=bool)
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dy == dx == 0:
+                continue
+            neighbour = smoothed[ys + dy, xs + dx]
+            if (dy, dx) < (0, 0):
+                keep &= peak > neighbour
+            else:
+                keep &= peak >= neighbour
+    ys, xs = ys[keep] + 1, xs[keep] + 1
+
+    # first moments and flux in a box about each peak
+    offsets = np.arange(-radius, radius + 1)
+    oy, ox = [o.ravel() for o in np.meshgrid(offsets, offsets, indexing="ij")]
+    background = _interpolate_blocks(median, block, ys, xs, grid=False)
+    stamps = data[ys[:, np.newaxis] + oy, xs[:, np.newaxis] + ox]
+    stamps -= background[:, np.newaxis]
+    flux = stamps.sum(axis=-1)
+    good = np.isfinite(flux) & (flux > 0)
+    stamps, flux, ys, xs = stamps[good], flux[good], ys[good], xs[good]
+    weights = np.clip(stamps, 0, None)
+    total = weights.sum(axis=-1)
+    x = xs + np.dot(weights, ox) / total
+    y = ys + np.dot(weights, oy) / total
+
+    order = np.argsort(-flux, kind="stable")[:max_sources]
+    return x[order], y[order], flux[order]
+
+
+class SourceList(object):
+    """
+    Sources detected on an image, with the same cone search as
+    `~hcam_finder.star_catalog.StarCatalog`, so they can stand in for a
+    catalog.
+
+    Parameters
+    ----------
+    ra, dec : array-like
+        positions (deg)
+    mag : array-like
+        magnitudes
+    name : str
+        name used to label the sources
+    columns : dict
+        any other columns, such as pixel positions and fluxes
+    """
+
+    def __init__(self, ra, dec, mag, name="detected", **columns):
+        columns.update(ra=ra, dec=dec, mag=mag)
+        order = np.argsort(np.asarray(mag), kind="stable")
+        self.name = name
+        self.data = dict(
+            (key, np.asarray(val)[order]) for key, val in columns.items()
+        )
+        self.columns = sorted(self.data)
+
+    def __len__(self):
+        return len(self.data["ra"])
+
+    def cone(self, ra_deg, dec_deg, radius_deg, mag_limit=None, epoch=None):
+        """
+        Find the sources within a cone
+
+        Detected sources have no proper motions, so `epoch` is ignored;
+        positions are always those on the image.
+
+        Returns
+        -------
+        sources : dict
+            array of values of each column for the sources found, sorted
+            from brightest to faintest
+        """
+        sep = angular_separation(ra_deg, dec_deg, self.data["ra"], self.data["dec"])
+        keep = sep <= radius_deg
+        if mag_limit is not None:
+            keep &= self.data["mag"] <= mag_limit
+        return dict((key, col[keep]) for key, col in self.data.items())
+
+
+def image_sources(image, bscale=1.0, **kwargs):
+    """
+    Detect the sources on an image with a WCS
+
+    Parameters
+    ----------
+    image : `~ginga.AstroImage.AstroImage`
+        image to search
+    bscale : float
+        scaling of the raw data values, applied to the fluxes
+    kwargs : dict
+        passed on to `detect_sources`
+
+    Returns
+    -------
+    sources : `SourceList`
+        positions, magnitudes on the image zero point (or a nominal one),
+        pixel positions and fluxes of the sources
+    """
+    x, y, flux = detect_sources(image.get_data(), **kwargs)
+    flux = bscale * flux
+    zp = zero_point(image)
+    if zp is None:
+        zp = DEFAULT_ZERO_POINT
+    if len(x):
+        radec = np.asarray(
+            image.wcs.datapt_to_wcspt(np.column_stack((x, y))), dtype=float
+        )
+    else:
+        radec = np.zeros((0, 2))
+    mag = zp - 2.5 * np.log10(flux)
+    return SourceList(radec[:, 0], radec[:, 1], mag, x=x, y=y, flux=flux)
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import logging
+import os
+
+from PIL import Image, ImageDraw
+from ginga.misc import Bunch
+
+from . import __version__ as version
+from .batch import batch_parser, batch_setup, coord_strings, render_target, sky_pa
+from .finding_chart import get_font
+from .hcam_finder import window_text
+from .pdf import PDFWriter
+from .star_catalog import angular_separation
+
+# width of the pages of the PDF (inches), that of A4
+PAGE_WIDTH = 8.27
+# nod positions listed per line of the notes
+NODS_PER_LINE = 5
+
+
+def page_notes(target, options):
+    """
+    Lines of text describing a target's setup, for the foot of its page
+    """
+    ra, dec = coord_strings(target.ra, target.dec)
+    lines = [
+        "{} ({}, {})".format(target.name, options.telescope, options.survey),
+        "Pointing: {} {}".format(ra, dec),
+    ]
+    sep = angular_separation(target.ra, target.dec, target.targ_ra, target.targ_dec)
+    if sep * 3600 > 0.05:
+        targ_ra, targ_dec = coord_strings(target.targ_ra, target.targ_dec)
+        lines.append("Target: {} {}".format(targ_ra, targ_dec))
+    lines.append(
+        "Rotator PA: {:.1f}, on sky {:.1f} (E of N)".format(
+            target.pa, sky_pa(target.pa, options.tel) % 360
+        )
+    )
+    wins = window_text(target.wframe, target.drift)
+    if wins:
+        lines.append("Windows:")
+        lines.extend("    " + line for line in wins.splitlines())
+    else:
+        lines.append("Windows: full frame")
+    nods = target.get("nods", [])
+    if nods:
+        lines.append("Nod pattern, RA and Dec offsets (arcsec):")
+        nods = ["({:.1f}, {:.1f})".format(dra, ddec) for dra, ddec in nods]
+        for i in range(0, len(nods), NODS_PER_LINE):
+            lines.append("    " + ", ".join(nods[i : i + NODS_PER_LINE]))
+    else:
+        lines.append("Nod pattern: none")
+    return lines
+
+
+def add_notes(chart, lines):
+    """
+    Add lines of notes in a white strip below a chart
+
+    Returns
+    -------
+    page : `~PIL.Image.Image`
+        the chart with its notes
+    """
+    width, height = chart.size
+    font = get_font(width // 50)
+    line_height = int(1.4 * font.size)
+    margin = line_height // 2
+    page_height = height + len(lines) * line_height + 2 * margin
+    page = Image.new("RGB", (width, page_height), "white")
+    page.paste(chart, (0, 0))
+    draw = ImageDraw.Draw(page)
+    for n, line in enumerate(lines):
+        y = height + margin + n * line_height
+        draw.text((margin, y), line, font=font, fill="black")
+    return page
+
+
+def page_key(target, options):
+    """
+    Key identifying the page for a target, from everything drawn on it
+
+    Pages are only re-rendered when this changes.
+    """
+    content = dict(
+        target=dict(target.items()),
+        telescope=options.telescope,
+        tel=options.tel,
+        survey=options.survey,
+        size=options.size,
+        version=version,
+    )
+    text = json.dumps(content, sort_keys=True, default=float)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def make_page(target, options):
+    """
+    Render the dossier page for a target, or re-use it if unchanged
+
+    Runs in a worker process. Pages are kept as JPEG files in the page
+    cache, so only the file name goes back to the main process.
+
+    Parameters
+    ----------
+    target : `~ginga.misc.Bunch.Bunch`
+        target, from `~hcam_finder.batch.read_targets`
+    options : `~ginga.misc.Bunch.Bunch`
+        as for `~hcam_finder.batch.render_target`, plus page_dir, where
+        pages are cached
+
+    Returns
+    -------
+    page : `~ginga.misc.Bunch.Bunch`
+        fname of the page, and whether it was reused
+    """
+    fname = os.path.join(options.page_dir, page_key(target, options) + ".jpg")
+    if os.path.exists(fname):
+        return Bunch.Bunch(fname=fname, reused=True)
+    page = add_notes(render_target(target, options), page_notes(target, options))
+    # write under a temporary name, so a page of the final name is complete
+    partname = "{}.{}.part".format(fname, os.getpid())
+    page.save(partname, "JPEG", quality=90)
+    os.replace(partname, fname)
+    return Bunch.Bunch(fname=fname, reused=False)
+
+
+def error_page(target, options, error):
+    """
+    Page for a target whose chart could not be made, with its notes
+    """
+    chart = Image.new("RGB", (options.size, options.size), "white")
+    draw = ImageDraw.Draw(chart)
+    font = get_font(options.size // 40)
+    draw.text(
+        (options.size // 20, options.size // 20),
+        "No finding chart:\n" + error,
+        font=font,
+        fill="red",
+    )
+    return add_notes(chart, page_notes(target, options))
+
+
+def _pages(targets, options, processes):
+    """
+    Pages for the targets in order, rendered ahead by a pool of processes
+
+    At most twice as many pages as processes are in hand at once, so the
+    number of pages waiting to be written stays bounded.
+
+    Yields
+    ------
+    target, page, error
+        the page from `make_page` (None on failure) and the error (None on
+        success) for each target
+    """
+    if processes == 1:
+        for target in targets:
+            try:
+                yield target, make_page(target, options), None
+            except Exception as err:
+                yield target, None, str(err)
+        return
+
+    with ProcessPoolExecutor(processes) as pool:
+        todo = iter(targets)
+        pending = deque()
+        for target in todo:
+            pending.append((target, pool.submit(make_page, target, options)))
+            if len(pending) >= 2 * processes:
+                break
+        while pending:
+            target, future = pending.popleft()
+            for following in todo:
+                future_page = pool.submit(make_page, following, options)
+                pending.append((following, future_page))
+                break
+            try:
+                yield target, future.result(), None
+            except Exception as err:
+                yield target, None, str(err)
+
+
+def write_dossier(targets, options, fname, processes=None, logger=None):
+    """
+    Write the finding charts and setups of many targets into one PDF
+
+    Pages are rendered in parallel, one target per worker process, and
+    written to the PDF in the order of the targets as they arrive, so
+    only a few pages are ever held at once, however many targets there
+    are. Each page's JPEG is copied into the PDF once, as it is. Rendered
+    pages are cached, and reused when the dossier is rebuilt for any
+    target whose setup has not changed. A target whose chart cannot be
+    made still gets a page, with its setup and the error.
+
+    Parameters
+    ----------
+    targets : list of `~ginga.misc.Bunch.Bunch`
+        targets, from `~hcam_finder.batch.read_targets`
+    options : `~ginga.misc.Bunch.Bunch`
+        as for `make_page`
+    fname : str
+        PDF file to write
+    processes : int, optional
+        number of processes to use; by default one per CPU. With one
+        process, no pool is started.
+    logger : `logging.Logger`, optional
+        where to report progress
+
+    Returns
+    -------
+    results : list of `~ginga.misc.Bunch.Bunch`
+        name, reused (True if the page was reused) and error (None on
+        success) for each target, in the order given
+    """
+    if logger is None:
+        logger = logging.getLogger(__name__)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(targets)))
+
+    # the dossier only replaces any old one once it is complete
+    partname = fname + ".part"
+    results = []
+    try:
+        with open(partname, "wb") as fp:
+            pdf = PDFWriter(fp, PAGE_WIDTH, title="HiPERCAM finding charts")
+            pages = _pages(targets, options, processes)
+            for n, (target, page, error) in enumerate(pages):
+                if error is None:
+                    pdf.add_jpeg_file(page.fname)
+                    what = "reused" if page.reused else "rendered"
+                    logger.info("{}: page {} {}".format(target.name, n + 1, what))
+                else:
+                    pdf.add_image(error_page(target, options, error))
+                    logger.error("{}: failed: {}".format(target.name, error))
+                results.append(
+                    Bunch.Bunch(
+                        name=target.name,
+                        reused=error is None and page.reused,
+                        error=error,
+                    )
+                )
+            pdf.close()
+        os.replace(partname, fname)
+    finally:
+        if os.path.exists(partname):
+            os.unlink(partname)
+    return results
+
+
+def main(argv=None):
+    """
+    Write a PDF dossier of finding charts for a list of targets
+    """
+    parser = batch_parser(
+        "Write one PDF of HiPERCAM finding charts and setups for a list of targets"
+    )
+    parser.add_argument("pdf", help="PDF file to write")
+    parser.add_argument(
+        "-p",
+        "--pages",
+        default=os.path.expanduser("~/.hfinder/pages"),
+        help="directory to keep rendered pages in for re-use [%(default)s]",
+    )
+    args = parser.parse_args(argv)
+    targets, options, logger = batch_setup(parser, args, "hfinder_dossier")
+    if not targets:
+        parser.error("no targets in " + args.targets)
+    if not os.path.isdir(args.pages):
+        os.makedirs(args.pages)
+    options.page_dir = args.pages
+
+    results = write_dossier(targets, options, args.pdf, args.processes, logger)
+    nfailed = sum(result.error is not None for result in results)
+    nreused = sum(result.reused for result in results)
+    logger.info(
+        "wrote {} pages to {}, {} reused".format(len(results), args.pdf, nreused)
+    )
+    if nfailed:
+        logger.error("{} of {} charts failed".format(nfailed, len(results)))
+    return 1 if nfailed else 0
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+from astropy.coordinates import get_body_barycentric
+from astropy.time import Time
+from configobj import ConfigObj
+from ginga.misc import Bunch
+
+# Gaussian gravitational constant (rad/day), so GM_sun = K**2 AU**3/day**2
+K_GAUSS = 0.01720209895
+# speed of light (AU/day)
+C_AU_PER_DAY = 173.1446326846693
+# obliquity of the ecliptic at J2000 (deg)
+OBLIQUITY_J2000 = 84381.448 / 3600
+
+
+def read_elements(path):
+    """
+    Read heliocentric orbital elements from a file
+
+    The file holds ``key = value`` lines. Angles are in degrees, referred
+    to the ecliptic and equinox of J2000, and dates are MJD (TT). The
+    orbit is given either by the semi-major axis ``a`` (AU) and mean
+    anomaly ``M`` at the date ``epoch``, as for asteroids, or by the
+    perihelion distance ``q`` (AU) and date of perihelion ``tp``, as for
+    comets. ``e``, ``i``, ``node`` (longitude of the ascending node) and
+    ``peri`` (argument of perihelion) are always needed, and ``name`` is
+    optional. For example::
+
+        name = 2001 FO32
+        epoch = 61000.0
+        a = 1.5
+        e = 0.3
+        i = 10.0
+        node = 30.0
+        peri = 60.0
+        M = 120.0
+
+    Returns
+    -------
+    elements : `~ginga.misc.Bunch.Bunch`
+        name, q, e, i, node, peri and tp
+    """
+    values = ConfigObj(path)
+    elements = Bunch.Bunch(name=values.get("name", "moving target"))
+    try:
+        for key in ("e", "i", "node", "peri"):
+            elements[key] = float(values[key])
+        if "q" in values:
+            elements.q = float(values["q"])
+            elements.tp = float(values["tp"])
+        else:
+            a = float(values["a"])
+            elements.q = a * (1 - elements.e)
+            n = K_GAUSS / abs(a) ** 1.5
+            elements.tp = float(values["epoch"]) - np.radians(float(values["M"])) / n
+    except KeyError as err:
+        raise ValueError("missing orbital element {} in {}".format(err, path))
+    return elements
+
+
+def _solve_kepler(mean_anomaly, e, hyperbolic=False, niter=50, tol=1e-12):
+    """
+    Solve Kepler's equation for all mean anomalies at once, by Newton's
+    method; for the eccentric anomaly, or the hyperbolic anomaly
+    """
+    if hyperbolic:
+        anomaly = np.arcsinh(mean_anomaly / e)
+    else:
+        mean_anomaly = np.mod(mean_anomaly + np.pi, 2 * np.pi) - np.pi
+        anomaly = mean_anomaly + 0.85 * e * np.sign(np.sin(mean_anomaly))
+    for _ in range(niter):
+        if hyperbolic:
+            step = (e * np.sinh(anomaly) - anomaly - mean_anomaly) / (
+                e * np.cosh(anomaly) - 1
+            )
+        else:
+            step = (anomaly - e * np.sin(anomaly) - mean_anomaly) / (
+                1 - e * np.cos(anomaly)
+            )
+        anomaly = anomaly - step
+        if np.all(np.abs(step) < tol):
+            break
+    return anomaly
+
+
+def heliocentric_positions(elements, mjd):
+    """
+    Heliocentric positions from two-body orbital elements
+
+    Parameters
+    ----------
+    elements : `~ginga.misc.Bunch.Bunch`
+        from `read_elements`
+    mjd : array-like
+        dates (MJD, TT)
+
+    Returns
+    -------
+    xyz : `~numpy.ndarray`
+        equatorial (ICRS) positions (AU), shape mjd.shape + (3,)
+    """
+    q, e = elements.q, elements.e
+    dt = np.asarray(mjd, dtype=float) - elements.tp
+
+    # position in the plane of the orbit, x towards perihelion
+    if abs(e - 1) < 1e-6:
+        # parabolic, by Barker's equation
+        w = dt * K_GAUSS * np.sqrt(1 / (2 * q**3))
+        y = np.cbrt(1.5 * w + np.sqrt(2.25 * w * w + 1))
+        d = y - 1 / y
+        x, y = q * (1 - d * d), 2 * q * d
+    elif e < 1:
+        a = q / (1 - e)
+        anomaly = _solve_kepler(dt * K_GAUSS / a**1.5, e)
+        x = a * (np.cos(anomaly) - e)
+        y = a * np.sqrt(1 - e * e) * np.sin(anomaly)
+    else:
+        a = q / (1 - e)
+        anomaly = _solve_kepler(dt * K_GAUSS / (-a) ** 1.5, e, hyperbolic=True)
+        x = a * (np.cosh(anomaly) - e)
+        y = -a * np.sqrt(e * e - 1) * np.sinh(anomaly)
+
+    # rotate to the ecliptic, then to the equator
+    peri, node, inc, obl = np.radians(
+        [elements.peri, elements.node, elements.i, OBLIQUITY_J2000]
+    )
+    cw, sw = np.cos(peri), np.sin(peri)
+    cn, sn = np.cos(node), np.sin(node)
+    ci, si = np.cos(inc), np.sin(inc)
+    px, py, pz = cn * cw - sn * sw * ci, sn * cw + cn * sw * ci, sw * si
+    qx, qy, qz = -cn * sw - sn * cw * ci, -sn * sw + cn * cw * ci, cw * si
+    ex, ey, ez = x * px + y * qx, x * py + y * qy, x * pz + y * qz
+    co, so = np.cos(obl), np.sin(obl)
+    return np.stack((ex, co * ey - so * ez, so * ey + co * ez), axis=-1)
+
+
+def ephemeris(elements, times, niter=2):
+    """
+    Geocentric astrometric positions of a solar system body
+
+    All times are computed in one pass, with the Earth's position from
+    the ephemeris built into astropy, so no network access is needed.
+    Light travel time is allowed for, but perturbations by the planets
+    and the parallax of the observer are not; positions of bodies very
+    close to the Earth are therefore only approximate.
+
+    Parameters
+    ----------
+    elements : `~ginga.misc.Bunch.Bunch`
+        from `read_elements`
+    times : `~astropy.time.Time`
+        times of the positions
+    niter : int
+        iterations of the light travel time correction
+
+    Returns
+    -------
+    ra, dec : `~numpy.ndarray`
+        positions (deg)
+    delta : `~numpy.ndarray`
+        distance from the Earth (AU)
+    """
+    times = Time(times)
+    earth = get_body_barycentric("earth", times) - get_body_barycentric("sun", times)
+    earth = np.moveaxis(earth.xyz.to_value("AU"), 0, -1)
+    mjd = times.tt.mjd
+    delta = np.zeros(np.shape(mjd))
+    for _ in range(niter + 1):
+        rho = heliocentric_positions(elements, mjd - delta / C_AU_PER_DAY) - earth
+        delta = np.sqrt(np.sum(rho * rho, axis=-1))
+    ra = np.degrees(np.arctan2(rho[..., 1], rho[..., 0])) % 360
+    dec = np.degrees(np.arcsin(rho[..., 2] / delta))
+    return ra, dec, delta
@@ -2,22 +2,34 @@
 from __future__ import print_function, absolute_import, unicode_literals, division
 import tempfile
 import threading
+import time
 import os
 import six
 import re
+from collections import OrderedDict
 
 import numpy as np
+from ginga.misc import Bunch
 from ginga.util import catalog, dp, wcs
-from ginga.canvas.types.all import Circle
+from ginga.canvas.types.all import Circle, CompoundObject, Line, Path, Text
 from astropy import units as u
 from astropy.coordinates import SkyCoord
 from astropy.coordinates.name_resolve import NameResolveError
+from astropy.time import Time
 
 import hcam_widgets.widgets as w
 from hcam_widgets.tkutils import get_root
 
+from .ephemeris import ephemeris, read_elements
 from .finding_chart import make_finder
-from .shapes import CCDWin
+from .footprint import Footprint, unrotate_offsets
+from .geometry import add_offsets_radec, points_in_polygon, radec_offsets, radectopix
+from .image_cache import ImageCache
+from .optimizer import search_pointings
+from .render import ChartTransform, canvas_shapes, render_chart
+from .scheduler import RedrawScheduler
+from .spatial import BoxTree
+from .star_catalog import StarCatalog, angular_separation, propagate_positions
 
 from .panstarrs import PS1ImageServer
 from .ztf import ZTFImageServer
@@ -30,8 +42,11 @@ except ImportError:
 
 if not six.PY3:
     import Tkinter as tk
+    import tkFileDialog as filedialog
+    import tkSimpleDialog as simpledialog
 else:
     import tkinter as tk
+    from tkinter import filedialog, simpledialog
 
 # Image Archives
 DSS_URL = "http://archive.eso.org/dss/dss?ra=%(ra)s&dec=%(dec)s&mime-type=application/x-fits&x=%(width)s&y=%(height)s"
@@ -89,6 +104,69 @@ def _deg_px(deg_val, px_scale):
     return deg_val.to(u.pix, equivalencies=u.pixel_scale(px_scale)).value
 
 
+def make_server_bank(logger):
+    """
+    Bank of all the image servers in `image_archives`
+    """
+    bank = catalog.ServerBank(logger)
+    for longname, shortname, klass, url, description in image_archives:
+        bank.add_image_server(klass(logger, longname, shortname, url, description))
+    return bank
+
+
+def fetch_survey_image(bank, servername, ra_deg, dec_deg, width_deg, directory):
+    """
+    Download a survey image, or re-use one already downloaded
+
+    There is one file per survey and field, so switching back to a survey
+    already downloaded just re-uses the file on disk. Downloads go to a
+    temporary name first, so a file of the final name is always complete,
+    even if several processes share the directory.
+
+    Parameters
+    ----------
+    bank : `~ginga.util.catalog.ServerBank`
+        image servers, from `make_server_bank`
+    servername : str
+        short name of the survey, from `image_archives`
+    ra_deg, dec_deg : float
+        centre of the image (deg)
+    width_deg : float
+        width and height of the image (deg)
+    directory : str
+        where to keep downloaded images
+
+    Returns
+    -------
+    filepath : str or None
+        the image file, or None if the survey has no image of the field
+    """
+    coo = SkyCoord(ra_deg, dec_deg, unit=u.deg)
+    ra_txt = coo.ra.to_string(unit=u.hourangle, sep=":", precision=2)
+    dec_txt = coo.dec.to_string(sep=":", precision=1, alwayssign=True)
+    # width and height are specified in arcmin
+    wd = 60 * width_deg
+    params = dict(ra=ra_txt, dec=dec_txt, width=wd, height=wd)
+
+    filename = "{}_{}_{}_{:.1f}.fits".format(servername, ra_txt, dec_txt, wd)
+    filepath = os.path.join(directory, re.sub(r"[^\w.+-]", "_", filename))
+    if os.path.exists(filepath):
+        bank.logger.debug(msg="re-using cached image " + filepath)
+        return filepath
+
+    partpath = "{}.{}.part".format(filepath, os.getpid())
+    try:
+        dstpath = bank.get_image(servername, partpath, **params)
+        if dstpath == partpath:
+            os.replace(partpath, filepath)
+            dstpath = filepath
+    finally:
+        # don't leave a partial download behind
+        if os.path.exists(partpath):
+            os.unlink(partpath)
+    return dstpath
+
+
 class TelChooser(tk.Menu):
     """
     Provides a menu to choose the telescope.
@@ -127,6 +205,37 @@ class TelChooser(tk.Menu):
 class FovSetter(tk.LabelFrame):
 
     overlay_names = ["ccd_overlay"]
+    # interval between updates of the pointing widgets while dragging (ms)
+    drag_sync_ms = 250
+    # size of the grab handles at the chip corners, for rotating (pix)
+    handle_size = 20
+    # local star catalog, and the most stars to draw from it
+    star_catalog = None
+    catalog_max_stars = 500
+    _catalog_key = None
+    # epoch of the target coordinates entered, as given by Simbad (yr)
+    target_epoch = 2000.0
+    # stars that move further than this between the image and observing
+    # epochs are marked with their track (arcsec)
+    min_track_length = 1.0
+    # track of a moving target from `load_orbit`, and the most points on it
+    track = None
+    track_max_points = 500
+    _track_key = None
+    # comparison stars found by `find_comparisons`, and the setup they
+    # were found for, from `comparison_key`
+    comparison_stars = None
+    _comparison_key = None
+    # how close a catalog star must be to the target to be the target (arcsec)
+    target_match_radius = 2.0
+    # grid searched by `find_best_pointings`; PA step (deg), and the largest
+    # and step of pointing offsets (arcsec)
+    optimize_pa_step = 2.0
+    optimize_offset_max = 30.0
+    optimize_offset_step = 5.0
+    # configurations found by `find_best_pointings`, and the one applied
+    pointing_options = []
+    pointing_choice = -1
 
     def __init__(self, master, fitsimage, logger):
         """
@@ -134,13 +243,18 @@ class FovSetter(tk.LabelFrame):
 
         fitsimage is reverence to CanvasView.
 
-        Normally, concrete classes will only have to implement _make_ccd and window_string.
-        More complex concrete classes may have to also change the overlay names and provide
-        a custom draw_ccd method.
+        Normally, concrete classes will only have to implement _ccd_windows,
+        _make_footprint and window_string.
+        More complex concrete classes may have to also change the overlay names and
+        extend get_footprints.
         """
         tk.LabelFrame.__init__(self, master, pady=2, text="Object")
 
         self.fitsimage = fitsimage
+        # all redraws of the overlays go through here
+        self.redraw = RedrawScheduler(self, self.place_overlays)
+        self.currently_moving_fov = False
+        self.currently_rotating_fov = False
 
         g = get_root(self).globals
         self.set_telins(g)
@@ -229,6 +343,28 @@ class FovSetter(tk.LabelFrame):
         )
         self.launchButton.grid(row=row, column=column, sticky=tk.W)
 
+        row += 1
+        self.compButton = tk.Button(
+            self,
+            width=14,
+            fg="black",
+            text="Find Comparisons",
+            bg=g.COL["main"],
+            command=self.show_comparisons,
+        )
+        self.compButton.grid(row=row, column=column, sticky=tk.W)
+
+        row += 1
+        self.optimizeButton = tk.Button(
+            self,
+            width=14,
+            fg="black",
+            text="Optimise Pointing",
+            bg=g.COL["main"],
+            command=self.optimize_cb,
+        )
+        self.optimizeButton.grid(row=row, column=column, sticky=tk.W)
+
         self.imfilepath = None
         self.logger = logger
 
@@ -236,32 +372,29 @@ class FovSetter(tk.LabelFrame):
         self.fitsimage.canvas.add_callback("cursor-down", self.click_cb)
         self.fitsimage.canvas.add_callback("cursor-move", self.click_drag_cb)
         self.fitsimage.canvas.add_callback("cursor-up", self.click_release_cb)
-        self.currently_moving_fov = False
-        self.currently_rotating_fov = False
 
         # Add our image servers
-        self.bank = catalog.ServerBank(self.logger)
-        for longname, shortname, klass, url, description in image_archives:
-            obj = klass(self.logger, longname, shortname, url, description)
-            self.bank.add_image_server(obj)
+        self.bank = make_server_bank(self.logger)
         self.tmpdir = tempfile.mkdtemp()
+        # downloaded images are memory-mapped and kept for quick re-use
+        self.image_cache = ImageCache(self.logger)
 
         # current dither index
         self.dither_index = 0
 
-        # catalog servers
-        """
-        for longname in conesearch.list_catalogs():
-            shortname = longname
-            url = ""    # astropy conesearch doesn't need URL
-            description = longname
-            obj = catalog.AstroPyCatalogServer(logger, longname, shortname,
-                                               url, description)
-            self.bank.addCatalogServer(obj)
-        """
+        # local star catalog to overlay, if there is one
+        path = g.cpars.get("star_catalog", "")
+        if path:
+            try:
+                self.star_catalog = StarCatalog(os.path.expanduser(path))
+            except Exception as err:
+                errmsg = "could not open star catalog {}: {}".format(path, str(err))
+                self.logger.warn(errmsg)
 
         # canvas that we will draw on
         self.canvas = fitsimage.canvas
+        # canvas updates while dragging the FoV
+        self.canvas_redraw = RedrawScheduler(self, self.canvas.update_canvas)
 
     def have_decimal_coords(self):
         r = re.compile(r"^[-+]?\d*[.,]?\d*$")
@@ -273,30 +406,244 @@ class FovSetter(tk.LabelFrame):
                 ret_val = True
         return ret_val
 
-    def targetMarker(self):
-        g = get_root(self).globals
+    def target_coords(self):
+        """
+        Position of the target, from the coordinates entry box
+        """
         if self.have_decimal_coords():
-            coo = SkyCoord(self.targCoords.value(), unit=u.deg)
-        else:
-            coo = SkyCoord(self.targCoords.value(), unit=(u.hour, u.deg))
+            return SkyCoord(self.targCoords.value(), unit=u.deg)
+        return SkyCoord(self.targCoords.value(), unit=(u.hour, u.deg))
+
+    @property
+    def observing_epoch(self):
+        """
+        Epoch of the observations (yr), from the configured date or today
+        """
+        g = get_root(self).globals
+        date = g.cpars.get("obs_date", "") or Time.now().iso[:10]
+        return Time(date).decimalyear
+
+    def positions_at(self, stars, epoch):
+        """
+        Positions of stars from a cone search at the observing epoch,
+        moved to another epoch
+
+        Stars without proper motions, or an unknown epoch, are not moved.
+        """
+        if epoch is None or "pmra" not in stars or "pmdec" not in stars:
+            return stars["ra"], stars["dec"]
+        return propagate_positions(
+            stars["ra"],
+            stars["dec"],
+            stars["pmra"],
+            stars["pmdec"],
+            epoch - self.observing_epoch,
+        )
+
+    def target_track(self):
+        """
+        Position of the target at the epoch of the image and at the
+        observing epoch.
+
+        The target is moved by its proper motion if it is in the catalog
+        with one; otherwise both are the coordinates entered.
+
+        Returns
+        -------
+        track : `~numpy.ndarray`
+            RA and Dec (deg) at the image and observing epochs, shape (2, 2)
+        """
+        coo = self.target_coords()
+        track = np.array([[coo.ra.deg, coo.dec.deg]] * 2)
+        try:
+            catalog = self.get_catalog()
+        except ValueError:
+            return track
+        radius = self.target_match_radius / 3600
+        stars = catalog.cone(coo.ra.deg, coo.dec.deg, radius, epoch=self.target_epoch)
+        if len(stars["ra"]) == 0 or "pmra" not in stars or "pmdec" not in stars:
+            return track
+        sep = angular_separation(coo.ra.deg, coo.dec.deg, stars["ra"], stars["dec"])
+        i = np.argmin(sep)
         image = self.fitsimage.get_image()
+        epochs = np.array([image.get("epoch", None) or np.nan, self.observing_epoch])
+        epochs[np.isnan(epochs)] = self.target_epoch
+        ra, dec = propagate_positions(
+            stars["ra"][i],
+            stars["dec"][i],
+            stars["pmra"][i],
+            stars["pmdec"][i],
+            epochs - self.target_epoch,
+        )
+        return np.column_stack((ra, dec))
+
+    def load_orbit(self, path, start, end, step=10.0):
+        """
+        Compute the track of a moving target over a time window.
 
-        # 3 arcsecond radius target marker
-        x, y = image.radectopix(coo.ra.deg, coo.dec.deg)
+        Positions at all times are computed in one go, from the orbital
+        elements, without any network access. The target is then set to
+        its position at the start of the window.
+
+        Parameters
+        ----------
+        path : str
+            file of orbital elements; see `~hcam_finder.ephemeris.read_elements`
+        start, end : `~astropy.time.Time` or str
+            time window (UTC)
+        step : float
+            spacing of the points on the track (min). Fewer points are used
+            for long windows.
+
+        Returns
+        -------
+        track : `~ginga.misc.Bunch.Bunch`
+            name, elements, times, ra and dec (deg) of the track
+        """
+        elements = read_elements(path)
+        start, end = Time(start, scale="utc"), Time(end, scale="utc")
+        span = (end - start).to_value(u.min)
+        if span <= 0:
+            raise ValueError("time window ends before it starts")
+        npoints = int(min(self.track_max_points, np.ceil(span / step) + 1))
+        times = start + np.linspace(0, span, npoints) * u.min
+        ra, dec, _ = ephemeris(elements, times)
+        self.track = Bunch.Bunch(
+            name=elements.name, elements=elements, times=times, ra=ra, dec=dec
+        )
+        self.targName.set(elements.name)
+        self.point_at_time(start)
+        return self.track
+
+    def point_at_time(self, time):
+        """
+        Set the target, and point at it, for a time on the moving target track
+        """
+        time = Time(time, scale="utc")
+        ra, dec, _ = ephemeris(self.track.elements, time.reshape(1))
+        coo = SkyCoord(ra[0], dec[0], unit=u.deg)
+        self.targCoords.set(coo.to_string(style="hmsdms", sep=":"))
+        self.ra.set(ra[0])
+        self.dec.set(dec[0])
+        self.track.time = time
+        self.redraw.request()
+        if self.fitsimage.get_image() is not None:
+            self.targetMarker()
+
+    def clear_track(self):
+        """
+        Forget the moving target track
+        """
+        self.track = None
+        self.redraw.request()
+
+    def load_orbit_cb(self):
+        """
+        Ask for an orbital elements file and time window, and load them
+        """
+        path = filedialog.askopenfilename(title="Orbital elements")
+        if not path:
+            return
+        g = get_root(self).globals
+        date = Time(g.cpars.get("obs_date", "") or Time.now().iso[:10])
+        window = simpledialog.askstring(
+            "Time window",
+            "Start and end of the time window (UTC)",
+            initialvalue="{}T20:00 {}T06:00".format(
+                date.iso[:10], (date + 1 * u.day).iso[:10]
+            ),
+        )
+        if not window:
+            return
+        try:
+            self.load_orbit(path, *window.split())
+        except Exception as err:
+            self.logger.error(msg="failed to load orbit: {}".format(str(err)))
+            return
+        self.logger.info(
+            "track of {} computed at {} times".format(
+                self.track.name, len(self.track.times)
+            )
+        )
+
+    def point_at_time_cb(self):
+        """
+        Ask for a time, and point at the moving target then
+        """
+        if self.track is None:
+            self.logger.warn("no moving target track loaded")
+            return
+        time = simpledialog.askstring(
+            "Point at time",
+            "Time (UTC)",
+            initialvalue=self.track.time.isot[:16],
+        )
+        if not time:
+            return
+        try:
+            self.point_at_time(time)
+        except Exception as err:
+            self.logger.error(msg="failed to point at target: {}".format(str(err)))
+
+    def targetMarker(self):
+        track = self.target_track()
+        image = self.fitsimage.get_image()
+
+        # 3 arcsecond radius target marker, at the observing epoch
+        pix = radectopix(image, track[:, 0], track[:, 1])
+        x, y = pix[1]
         size = wcs.calc_radius_xy(image, x, y, 3 / 3600)
         circ = Circle(x, y, size, fill=True, linewidth=3, color="blue", fillalpha=0.3)
+        shapes = [circ]
+        if angular_separation(*track.ravel()) * 3600 > self.min_track_length:
+            # from where the target is on the image
+            shapes.append(Line(*pix.ravel(), color="blue", linewidth=2))
         self.canvas.delete_object_by_tag("Target")
-        self.canvas.add(circ, tag="Target", redraw=True)
+        self.canvas.add(CompoundObject(*shapes), tag="Target", redraw=True)
 
     def window_string(self):
         raise NotImplementedError
 
+    def render_chart(self, size):
+        """
+        Draw the current view as a finding chart, from the image data
+
+        The chart shows the region of the image in the viewer, turned and
+        flipped as it is there, with all the overlays (including the nod
+        coverage map), at any resolution.
+
+        Parameters
+        ----------
+        size : int
+            length of the longer side of the chart (pix)
+
+        Returns
+        -------
+        chart : `~PIL.Image.Image`
+            the RGB chart
+        """
+        viewer = self.fitsimage
+        rgbmap = viewer.get_rgbmap()
+        return render_chart(
+            viewer.get_image(),
+            viewer.get_cut_levels(),
+            canvas_shapes(self.canvas.get_objects()),
+            size=size,
+            cmap_name=rgbmap.get_cmap().name,
+            imap_name=rgbmap.get_imap().name,
+            transform=ChartTransform.from_viewer(viewer, size),
+        )
+
     def publish(self):
         g = get_root(self).globals
-        arr = self.fitsimage.get_image_as_array()
+        self.redraw.flush()
+        if self.fitsimage.get_image() is None:
+            self.logger.error(msg="no image to make a finding chart from")
+            return
+        chart = self.render_chart(g.cpars.get("chart_size", 2000))
         make_finder(
             self.logger,
-            arr,
+            chart,
             self.targName.value(),
             g.cpars["telins_name"],
             self.ra.as_string(),
@@ -311,51 +658,150 @@ class FovSetter(tk.LabelFrame):
 
     def click_cb(self, *args):
         canvas, event, x, y = args
+        # make sure overlay is up to date before seeing what was clicked
+        self.redraw.flush()
         try:
-            obj = self.canvas.get_object_by_tag("ccd_overlay")
-            self.currently_moving_fov = obj.contains_pt((x, y))
+            hits = self.hit_index.query(x, y)
+            self.currently_moving_fov = any(
+                hit.handle is None
+                and hit.tag == "ccd_overlay"
+                and hit.shape.contains_pt((x, y))
+                for hit in hits
+            )
             if self.currently_moving_fov:
                 self.ref_pos_x = x
                 self.ref_pos_y = y
             else:
-                mainCCD = None
-                for thing in obj.objects:
-                    if thing.name == "mainCCD":
-                        mainCCD = thing
-                points = np.array(mainCCD.points)
                 ref = np.array((x, y))
-                dists = np.sum(np.sqrt((points - ref) ** 2), axis=1)
-                if np.any(dists < 20):
+                if any(
+                    np.sum(np.abs(hit.handle - ref)) < self.handle_size
+                    for hit in hits
+                    if hit.handle is not None
+                ):
                     self.currently_rotating_fov = True
                     self.ref_pa = np.degrees(np.arctan2(y - self.ctr_y, x - self.ctr_x))
+                    self.drag_pa = self.pa.value()
+            self.drag_synced = time.time()
         except Exception as err:
             errmsg = "failed to draw CCD: {}".format(str(err))
             self.logger.warn(errmsg)
 
+    @property
+    def hit_index(self):
+        """
+        Spatial index of the overlay shapes and the rotation grab handles.
+
+        Built when first needed after the overlays change, so clicks and
+        hovering only test the few shapes near the cursor.
+        """
+        if self._hit_index is None:
+            boxes = []
+            items = []
+            size = self.handle_size
+            for tag in self.overlay_names + ["catalog_overlay", "comparison_overlay"]:
+                obj = self.canvas.tags.get(tag, None)
+                if obj is None:
+                    continue
+                for shape in obj.objects:
+                    boxes.append(shape.get_llur())
+                    items.append(Bunch.Bunch(tag=tag, shape=shape, handle=None))
+                    if tag != "ccd_overlay" or shape.name != "mainCCD":
+                        continue
+                    for x, y in shape.points:
+                        boxes.append((x - size, y - size, x + size, y + size))
+                        items.append(
+                            Bunch.Bunch(tag=tag, shape=shape, handle=np.array((x, y)))
+                        )
+            self._hit_index = BoxTree(boxes, items)
+        return self._hit_index
+
+    def objects_at(self, x, y):
+        """
+        Overlay shapes under a position on the image
+
+        Returns
+        -------
+        shapes : list of tuple
+            (overlay tag, canvas object) of each shape containing the position
+        """
+        return [
+            (hit.tag, hit.shape)
+            for hit in self.hit_index.query(x, y)
+            if hit.handle is None and hit.shape.contains_pt((x, y))
+        ]
+
+    def describe_at(self, x, y):
+        """
+        Names of the overlay shapes under a position, for the cursor readout
+        """
+        return ", ".join(shape.name for tag, shape in self.objects_at(x, y))
+
     def click_drag_cb(self, *args):
+        """
+        Drag or rotate the FoV.
+
+        While the mouse is down the overlays are moved directly in pixel
+        space. The pointing widgets are only updated every `drag_sync_ms`
+        and when the mouse is released, at which point the overlays are
+        redrawn exactly.
+        """
         canvas, event, x, y = args
         image = self.fitsimage.get_image()
         if self.currently_moving_fov and image is not None:
             xoff = x - self.ref_pos_x
             yoff = y - self.ref_pos_y
-            new_ra, new_dec = image.pixtoradec(self.ctr_x + xoff, self.ctr_y + yoff)
             self.ref_pos_x = x
             self.ref_pos_y = y
-            # update ra, dec boxes; triggers redraw callback
-            self.ra.set(new_ra)
-            self.dec.set(new_dec)
+            self.ctr_x += xoff
+            self.ctr_y += yoff
+            self._drag_overlays(lambda obj: obj.move_delta_pt((xoff, yoff)))
         elif self.currently_rotating_fov and image is not None:
             pa = np.degrees(np.arctan2(y - self.ctr_y, x - self.ctr_x))
             delta_pa = pa - self.ref_pa
+            ctr = (self.ctr_x, self.ctr_y)
+            self._drag_overlays(lambda obj: obj.rotate_deg([delta_pa], ctr))
             if not self.EofN:
                 delta_pa *= -1
-            self.pa.set(self.pa.value() + delta_pa)
+            self.drag_pa += delta_pa
             self.ref_pa = pa
+        else:
+            return
+
+        if 1000 * (time.time() - self.drag_synced) > self.drag_sync_ms:
+            self._sync_drag()
+
+    def _drag_overlays(self, move):
+        """
+        Apply `move` to each overlay canvas object and schedule a canvas update
+        """
+        for tag in self.overlay_names:
+            obj = self.canvas.tags.get(tag, None)
+            if obj is not None:
+                move(obj)
+        self._hit_index = None
+        self.canvas_redraw.request()
+
+    def _sync_drag(self):
+        """
+        Update the pointing widgets to match the dragged overlay
+        """
+        self.drag_synced = time.time()
+        image = self.fitsimage.get_image()
+        if self.currently_moving_fov and image is not None:
+            new_ra, new_dec = image.pixtoradec(self.ctr_x, self.ctr_y)
+            self.ra.set(new_ra)
+            self.dec.set(new_dec)
+        elif self.currently_rotating_fov:
+            self.pa.set(self.drag_pa % 360)
 
     def click_release_cb(self, *args):
         canvas, event, x, y = args
-        self.currently_moving_fov = False
-        self.currently_rotating_fov = False
+        if self.currently_moving_fov or self.currently_rotating_fov:
+            self._sync_drag()
+            self.currently_moving_fov = False
+            self.currently_rotating_fov = False
+            # now redraw exactly from the widget values
+            self.redraw.request()
 
     def set_telins(self, g):
         telins = g.cpars["telins_name"]
@@ -375,6 +821,10 @@ class FovSetter(tk.LabelFrame):
         self.EofN = g.cpars[telins]["EofN"]
         # rotator position in degrees when chip runs N-S
         self.paOff = g.cpars[telins]["paOff"]
+        # footprints depend on all of the above, so must be rebuilt
+        self._footprints = dict()
+        self._drawn_at = None
+        self._hit_index = None
         if hasattr(self, "fitsimage"):
             self.draw_ccd()
 
@@ -402,131 +852,650 @@ class FovSetter(tk.LabelFrame):
         self.targCoords.set(coo.to_string(style="hmsdms", sep=":"))
 
     def update_pointing_cb(self, *args):
-        image = self.fitsimage.get_image()
-        if image is None:
-            return
-        try:
-            objs = [self.canvas.get_object_by_tag(name) for name in self.overlay_names]
-            ctr_x, ctr_y = image.radectopix(self.ctr_ra_deg, self.ctr_dec_deg)
-            self.ctr_x, self.ctr_y = ctr_x, ctr_y
-            old_x, old_y = image.radectopix(self.ra_as_drawn, self.dec_as_drawn)
-            for obj in objs:
-                if obj is not None:
-                    obj.move_delta(ctr_x - old_x, ctr_y - old_y)
-            self.canvas.update_canvas()
-            self.ra_as_drawn = self.ctr_ra_deg
-            self.dec_as_drawn = self.ctr_dec_deg
-        except Exception:
-            self.draw_ccd(*args)
+        # overlays are moved directly while dragging
+        if not (self.currently_moving_fov or self.currently_rotating_fov):
+            self.redraw.request()
 
     def update_rotation_cb(self, *args):
+        if not (self.currently_moving_fov or self.currently_rotating_fov):
+            self.redraw.request()
+
+    @property
+    def pa_deg(self):
+        """
+        Rotation of the FoV on the sky, positive from North through East
+        """
+        pa = self.pa.value() - self.paOff
+        if not self.EofN:
+            pa *= -1
+        return pa
+
+    def nod_offsets(self, g):
+        """
+        Offsets of all nod positions from the pointing (arcsec), shape (N, 2)
+
+        A single zero offset is returned if there is no nod pattern.
+        """
+        nods = getattr(g.ipars, "nodPattern", None)
+        if not nods:
+            return np.zeros((1, 2))
+        return np.column_stack((nods["ra"], nods["dec"])).astype(float)
+
+    def find_comparisons(self, max_stars=10):
+        """
+        Find comparison stars that stay in a window at every nod position.
+
+        Catalog stars near the pointing are tested against every window at
+        every nod position in one go. Candidates are ranked by how close
+        they are in magnitude to the target, if the target is in the
+        catalog, otherwise from brightest to faintest.
+
+        Parameters
+        ----------
+        max_stars : int
+            the most candidates to return
+
+        Returns
+        -------
+        stars : list of `~ginga.misc.Bunch.Bunch`
+            ra, dec, mag, dmag (magnitude relative to the target, or NaN)
+            and name of the window holding each candidate
+        """
+        catalog = self.get_catalog()
+        g = get_root(self).globals
+        windows, polygons = self._window_polygons()
+
+        ra0, dec0 = self.ctr_ra_deg, self.ctr_dec_deg
+        offsets = self.nod_offsets(g) / 3600
+        nod_ra, nod_dec = add_offsets_radec(ra0, dec0, offsets[:, 0], offsets[:, 1])
+        # search out to the furthest window corner at any nod position
+        reach = np.max(np.hypot(*polygons.reshape(-1, 2).T))
+        reach += np.max(np.hypot(*offsets.T))
+        stars = catalog.cone(ra0, dec0, reach, epoch=self.observing_epoch)
+
+        # star positions relative to each nod position, in the detector
+        # frame, tested against every window: shape (nods, stars, windows)
+        x, y = radec_offsets(
+            nod_ra[:, np.newaxis], nod_dec[:, np.newaxis], stars["ra"], stars["dec"]
+        )
+        x, y = unrotate_offsets(x, y, self.pa_deg)
+        inside = points_in_polygon(
+            x[..., np.newaxis], y[..., np.newaxis], polygons
+        ).all(axis=0)
+        found = np.flatnonzero(inside.any(axis=1))
+
+        # the target itself is not a comparison
+        mag = stars["mag"]
+        target, is_target, target_mag = self._match_target(stars)
+        found = found[~is_target[found]]
+
+        dmag = mag - target_mag
+        rank = mag if np.isnan(target_mag) else np.abs(dmag)
+        found = found[np.argsort(rank[found], kind="stable")][:max_stars]
+        return [
+            Bunch.Bunch(
+                ra=stars["ra"][i],
+                dec=stars["dec"][i],
+                mag=mag[i],
+                dmag=dmag[i],
+                window=windows[np.argmax(inside[i])].name,
+            )
+            for i in found
+        ]
+
+    def get_catalog(self):
+        """
+        Stars to work with: the local catalog if there is one, otherwise
+        the sources detected on the current image
+        """
+        if self.star_catalog is not None:
+            return self.star_catalog
         image = self.fitsimage.get_image()
-        if image is None:
-            return
+        sources = None if image is None else image.get("sources", None)
+        if sources is None:
+            raise ValueError("no star catalog configured and no sources detected")
+        return sources
+
+    def _window_polygons(self):
+        """
+        Windows of the CCD footprint, or the whole chip in full frame mode
+
+        Returns
+        -------
+        windows : list of `~ginga.misc.Bunch.Bunch`
+            footprint parts of the windows
+        polygons : `~numpy.ndarray`
+            window corners in the detector frame (deg), shape (W, 4, 2)
+        """
+        footprint = self.get_footprint()
+        windows = [part for part in footprint.parts if part.name.startswith("window")]
+        if not windows:
+            windows = footprint.parts[:1]
+        return windows, np.array([part.xy for part in windows])
+
+    def _match_target(self, stars):
+        """
+        Find the target among catalog stars, by their positions at the
+        epoch of the target coordinates
+
+        Returns
+        -------
+        target : `~astropy.coordinates.SkyCoord` or None
+            target position, if one has been given
+        is_target : `~numpy.ndarray`
+            True for stars at the position of the target
+        target_mag : float
+            magnitude of the target, or NaN if it is not in the catalog
+        """
         try:
-            objs = [self.canvas.get_object_by_tag(name) for name in self.overlay_names]
-            pa = self.pa.value() - self.paOff
-            if not self.EofN:
-                pa *= -1
-            for obj in objs:
-                if obj is not None:
-                    obj.rotate_deg([pa - self.pa_as_drawn], (self.ctr_x, self.ctr_y))
-            self.canvas.update_canvas()
-            self.pa_as_drawn = pa
+            target = self.target_coords()
         except Exception:
-            self.draw_ccd(*args)
+            # no target given
+            return None, np.zeros(len(stars["ra"]), dtype=bool), np.nan
+        ra, dec = self.positions_at(stars, self.target_epoch)
+        sep = 3600 * angular_separation(target.ra.deg, target.dec.deg, ra, dec)
+        is_target = sep < self.target_match_radius
+        target_mag = stars["mag"][np.argmin(sep)] if np.any(is_target) else np.nan
+        return target, is_target, target_mag
+
+    def pointing_search_setup(self):
+        """
+        Everything the pointing search needs, taken from the widgets.
+
+        Must be called from the GUI thread. The result holds only numbers
+        and arrays, so `~hcam_finder.optimizer.search_pointings` can run
+        on it in a worker thread without touching any widgets.
 
-    def _chip_cen(self):
+        Returns
+        -------
+        setup : `~ginga.misc.Bunch.Bunch`
+            as for `~hcam_finder.optimizer.search_pointings`
         """
-        return chip centre in ra, dec
+        catalog = self.get_catalog()
+        g = get_root(self).globals
+        windows, polygons = self._window_polygons()
+        nods = self.nod_offsets(g) / 3600
+        offset_max = self.optimize_offset_max / 3600
+
+        ra0, dec0 = self.ctr_ra_deg, self.ctr_dec_deg
+        reach = np.max(np.hypot(*polygons.reshape(-1, 2).T))
+        reach += np.max(np.hypot(*nods.T)) + np.sqrt(2) * offset_max
+        stars = catalog.cone(ra0, dec0, reach, epoch=self.observing_epoch)
+        target, is_target, target_mag = self._match_target(stars)
+
+        comps = np.column_stack(
+            radec_offsets(ra0, dec0, stars["ra"], stars["dec"])
+        )[~is_target]
+        if target is not None:
+            target = np.array(radec_offsets(ra0, dec0, target.ra.deg, target.dec.deg))
+        return Bunch.Bunch(
+            ra=ra0,
+            dec=dec0,
+            stars=comps,
+            target=target,
+            # windows are rectangles in the detector frame
+            windows=np.hstack((polygons.min(axis=1), polygons.max(axis=1))),
+            nods=nods,
+            pa_step=self.optimize_pa_step,
+            offset_max=offset_max,
+            offset_step=self.optimize_offset_step / 3600,
+            pa_offset=self.paOff,
+            EofN=self.EofN,
+        )
+
+    def find_best_pointings(self):
+        """
+        Search PA and small pointing offsets for the most comparison stars.
+
+        Every combination of PA and offset on a grid is scored by how
+        many catalog stars stay in a window at every nod position, while
+        keeping the target in a window too. See `search_pointings`.
+
+        Returns
+        -------
+        best : list of `~ginga.misc.Bunch.Bunch`
+            ra, dec and rotator PA (deg) of the best configurations, and
+            the number of comparison stars for each
+        """
+        return search_pointings(self.pointing_search_setup())
+
+    def optimize_cb(self):
+        """
+        Run the pointing search without blocking the GUI
+
+        The setup is read from the widgets here, on the GUI thread; only
+        the search itself runs in a worker thread.
         """
-        xoff_hpix = self.nxtot / 2 - self.rotcen_x
-        yoff_hpix = self.nytot / 2 - self.rotcen_y
-        yoff_deg = _px_deg(yoff_hpix, self.px_scale)
-        xoff_deg = _px_deg(xoff_hpix, self.px_scale)
+        self.redraw.flush()
+        self.pointing_options = []
+        try:
+            setup = self.pointing_search_setup()
+        except Exception as err:
+            errmsg = "failed to optimise pointing: {}".format(str(err))
+            self.logger.error(msg=errmsg)
+            return
+        self.fitsimage.onscreen_message("Optimising pointing; please wait...")
+        result = dict()
+
+        def search():
+            try:
+                result["best"] = search_pointings(setup)
+            except Exception as err:
+                result["error"] = err
+
+        t = threading.Thread(target=search)
+        t.daemon = True
+        t.start()
+        self.after(200, self._check_optimize, t, result)
 
-        if not self.flipEW:
-            xoff_deg *= -1
+    def _check_optimize(self, t, result):
+        if t.is_alive():
+            self.after(200, self._check_optimize, t, result)
+            return
+        self.fitsimage.onscreen_message(None)
+        if "error" in result:
+            errmsg = "failed to optimise pointing: {}".format(str(result["error"]))
+            self.logger.error(msg=errmsg)
+            return
 
-        return wcs.add_offset_radec(
-            self.ctr_ra_deg, self.ctr_dec_deg, xoff_deg, yoff_deg
+        self.pointing_options = result["best"]
+        self.pointing_choice = -1
+        if not self.pointing_options:
+            msg = "no pointing keeps the target in a window"
+        else:
+            msg = "best pointings (press O to apply each in turn)"
+            for n, config in enumerate(self.pointing_options):
+                msg += "\n{}: RA {} Dec {} PA {:.1f}, {} comparison stars".format(
+                    n + 1,
+                    wcs.ra_deg_to_str(config.ra),
+                    wcs.dec_deg_to_str(config.dec),
+                    config.rotator_pa,
+                    config.ncomps,
+                )
+        self.logger.info(msg)
+        self.fitsimage.onscreen_message(msg, delay=10.0)
+
+    def apply_pointing(self, n):
+        """
+        Set the pointing and PA to one of the configurations found by
+        `optimize_cb`
+        """
+        config = self.pointing_options[n]
+        self.ra.set(config.ra)
+        self.dec.set(config.dec)
+        self.pa.set(config.rotator_pa)
+        self.pointing_choice = n
+        self.redraw.request()
+
+    def next_pointing(self):
+        """
+        Apply the next of the configurations found by `optimize_cb`
+        """
+        if self.pointing_options:
+            n = (self.pointing_choice + 1) % len(self.pointing_options)
+            self.apply_pointing(n)
+
+    def comparison_key(self):
+        """
+        Everything the comparison stars depend on: target, pointing, PA,
+        windows, nod pattern and observing epoch
+        """
+        g = get_root(self).globals
+        return (
+            self.targCoords.value(),
+            self.ctr_ra_deg,
+            self.ctr_dec_deg,
+            self.pa_deg,
+            self.get_footprint(),
+            self.nod_offsets(g).tobytes(),
+            self.observing_epoch,
         )
 
-    def _make_win(self, xs, ys, nx, ny, image, **params):
+    def current_comparisons(self):
         """
-        Make a canvas object to represent a CCD window
+        Comparison stars for the current setup
+
+        Stars found for an earlier setup are looked for again, and dropped
+        if that fails, so stale stars are never returned.
 
-        Parameters
-        ----------
-        xs, ys, nx, ny : float
-            xstart, ystart and size in instr pixels
-        image : `~ginga.AstroImage`
-            image reference for calculating scales
-        params : dict
-            parameters passed straight through to canvas object
         Returns
         -------
-        win : `~ginga.canvas.CompoundObject`
-            ginga canvas object to draw on FoV
+        stars : list of `~ginga.misc.Bunch.Bunch` or None
+            as for `find_comparisons`, or None if they have not been
+            looked for
         """
-        # need bottom left coord and xy size of window in degrees
-        # offset of bottom left coord window from chip ctr in degrees
-        xoff_hpix = xs * u.pix - self.rotcen_x
-        yoff_hpix = ys * u.pix - self.rotcen_y
-        yoff_deg = _px_deg(yoff_hpix, self.px_scale)
-        xoff_deg = _px_deg(xoff_hpix, self.px_scale)
+        if self.comparison_stars is None:
+            return None
+        key = self.comparison_key()
+        if key != self._comparison_key:
+            try:
+                stars = self.find_comparisons()
+            except Exception as err:
+                errmsg = "dropped comparison stars for an old setup: {}".format(
+                    str(err)
+                )
+                self.logger.warn(errmsg)
+                stars = None
+            self.comparison_stars = stars
+            self._comparison_key = key
+        return self.comparison_stars
+
+    def show_comparisons(self):
+        """
+        Find comparison stars and mark them on the image
+        """
+        tag = "comparison_overlay"
+        self.redraw.flush()
+        image = self.fitsimage.get_image()
+        try:
+            key = self.comparison_key()
+            stars = self.find_comparisons()
+        except Exception as err:
+            errmsg = "failed to find comparison stars: {}".format(str(err))
+            self.logger.error(msg=errmsg)
+            return
+        self.comparison_stars = stars
+        self._comparison_key = key
+
+        self.canvas.delete_object_by_tag(tag, redraw=False)
+        if stars and image is not None:
+            pix = radectopix(
+                image, [star.ra for star in stars], [star.dec for star in stars]
+            )
+            size = wcs.calc_radius_xy(image, pix[0, 0], pix[0, 1], 4 / 3600)
+            shapes = []
+            for n, ((x, y), star) in enumerate(zip(pix, stars)):
+                shape = Circle(x, y, size, color="green", linewidth=2)
+                shape.name = "comparison {}".format(n + 1)
+                shapes.append(shape)
+            self.canvas.add(CompoundObject(*shapes), tag=tag, redraw=False)
+        self._hit_index = None
+        self.canvas.update_canvas()
 
-        if not self.flipEW:
-            xoff_deg *= -1
+        msg = "{} comparison stars found".format(len(stars))
+        for n, star in enumerate(stars):
+            msg += "\n{}: {} {} {:.1f} mag".format(
+                n + 1,
+                wcs.ra_deg_to_str(star.ra),
+                wcs.dec_deg_to_str(star.dec),
+                star.mag,
+            )
+            if not np.isnan(star.dmag):
+                msg += " ({:+.1f})".format(star.dmag)
+            msg += " in {}".format(star.window)
+        self.logger.info(msg)
+        self.fitsimage.onscreen_message(msg, delay=10.0)
+
+    def _ccd_windows(self, g):
+        """
+        List of (xs, ys, nx, ny) in instr pixels for the current windows.
 
-        ll_ra, ll_dec = wcs.add_offset_radec(
-            self.ctr_ra_deg, self.ctr_dec_deg, xoff_deg, yoff_deg
-        )
-        xsize_deg = _px_deg(nx * u.pix, self.px_scale)
-        ysize_deg = _px_deg(ny * u.pix, self.px_scale)
-        if not self.flipEW:
-            xsize_deg *= -1
-        return CCDWin(ll_ra, ll_dec, xsize_deg, ysize_deg, image, **params)
+        The footprint is only rebuilt when this changes. Must be
+        implemented by concrete sub class.
+        """
+        raise NotImplementedError()
 
-    def _make_ccd(self, image):
+    def _make_footprint(self, windows):
         """
-        Converts the current instrument settings to a ginga canvas object.
+        Converts the chip layout and windows to a `~hcam_finder.footprint.Footprint`
 
         Must be implemented by concrete sub class
         """
         raise NotImplementedError()
 
-    def draw_ccd(self, *args):
+    def _new_footprint(self):
+        """
+        Empty footprint for the current telescope and instrument
+        """
+        return Footprint(
+            self.px_scale.to_value(u.arcsec / u.pix),
+            self.rotcen_x.to_value(u.pix),
+            self.rotcen_y.to_value(u.pix),
+            self.flipEW,
+        )
+
+    def _cached_footprint(self, tag, key, make):
+        """
+        Return the footprint for an overlay, rebuilding it only if `key` changed
+
+        Parameters
+        ----------
+        tag : str
+            tag of the overlay
+        key : object
+            description of the setup the footprint is built from
+        make : callable
+            called with no arguments to build a new footprint
+        """
+        footprint = self._footprints.get(tag, None)
+        if footprint is None or footprint.key != key:
+            footprint = make()
+            footprint.key = key
+            self._footprints[tag] = footprint
+        return footprint
+
+    def get_footprint(self):
+        """
+        Return the CCD footprint, rebuilding it only if the windows changed
+        """
+        g = get_root(self).globals
+        windows = self._ccd_windows(g)
+        return self._cached_footprint(
+            "ccd_overlay", windows, lambda: self._make_footprint(windows)
+        )
+
+    def get_footprints(self):
+        """
+        Footprints of all the overlays to draw, keyed by overlay tag.
+
+        Concrete classes with extra overlays should extend this.
+        """
+        return OrderedDict([("ccd_overlay", self.get_footprint())])
+
+    def _draw_overlay(self, tag, footprint, image, ra_deg, dec_deg, pa_deg):
+        """
+        Draw an overlay from scratch, replacing any existing one
+        """
+        ctr, pix = footprint.place(image, ra_deg, dec_deg, pa_deg)
+        obj = CompoundObject(*footprint.make_shapes(pix))
+        obj.editable = True
+        obj.showcap = True
+        # remember which footprint this is, so it can just be moved later
+        obj.footprint = footprint
+        self.canvas.delete_object_by_tag(tag, redraw=False)
+        self.canvas.add(obj, tag=tag, redraw=False)
+        return ctr
+
+    def place_overlays(self, ra_deg=None, dec_deg=None):
+        """
+        Draw the overlays at the current (or given) pointing and PA.
+
+        Each overlay keeps the footprint it was drawn from. The current
+        footprint is compared to it part by part: unchanged parts are
+        moved in place and only parts that were added, removed or changed
+        get new canvas objects. Nothing is redrawn if nothing has changed.
+        """
         image = self.fitsimage.get_image()
         if image is None:
             return
+        if ra_deg is None:
+            ra_deg, dec_deg = self.ctr_ra_deg, self.ctr_dec_deg
 
         try:
-            pa = self.pa.value() - self.paOff
-            if not self.EofN:
-                pa *= -1
+            pa = self.pa_deg
+            footprints = self.get_footprints()
         except Exception as err:
-            errmsg = "failed to find rotation: {}".format(str(err))
-            self.logger.error(errmsg)
+            errmsg = "failed to find FoV: {}".format(str(err))
+            self.logger.error(msg=errmsg)
+            return
+
+        drawn = self._drawn_at
+        moved = (
+            drawn is None
+            or drawn[0] is not image
+            or drawn[1:] != (ra_deg, dec_deg, pa)
+        )
+        self._drawn_at = (image, ra_deg, dec_deg, pa)
+
+        changed = False
+        for tag in self.overlay_names:
+            if tag not in footprints and tag in self.canvas.tags:
+                self.canvas.delete_object_by_tag(tag, redraw=False)
+                changed = True
+
+        for tag, footprint in footprints.items():
+            obj = self.canvas.tags.get(tag, None)
+            try:
+                if getattr(obj, "footprint", None) is None:
+                    ctr = self._draw_overlay(tag, footprint, image, ra_deg, dec_deg, pa)
+                    changed = True
+                elif moved or obj.footprint is not footprint:
+                    ctr, pix = footprint.place(image, ra_deg, dec_deg, pa)
+                    nchanged = footprint.update_overlay(obj, pix)
+                    changed = changed or moved or nchanged > 0
+                else:
+                    continue
+            except Exception as err:
+                errmsg = "failed to draw {}: {}".format(tag, str(err))
+                self.logger.error(msg=errmsg)
+                self.canvas.delete_object_by_tag(tag, redraw=False)
+                continue
+            self.ctr_x, self.ctr_y = ctr
 
         try:
-            obj = self._make_ccd(image)
-            obj.showcap = True
-
-            self.canvas.delete_object_by_tag("ccd_overlay")
-            self.canvas.add(obj, tag="ccd_overlay", redraw=False)
-            # rotate
-            obj.rotate_deg([pa], (self.ctr_x, self.ctr_y))
-            obj.color = "red"
-
-            # save old values so we don't have to recompute FOV if we're just moving
-            self.pa_as_drawn = pa
-            self.ra_as_drawn, self.dec_as_drawn = self.ctr_ra_deg, self.ctr_dec_deg
+            changed = self.place_extras(image, pa) or changed
         except Exception as err:
-            errmsg = "failed to draw CCD: {}".format(str(err))
+            errmsg = "failed to draw extra overlays: {}".format(str(err))
             self.logger.error(msg=errmsg)
 
-        self.canvas.update_canvas()
+        # save pointing, so nod positions can be drawn relative to it
+        self.ra_as_drawn, self.dec_as_drawn = ra_deg, dec_deg
+        if changed:
+            self._hit_index = None
+            self.canvas.update_canvas()
+
+    def place_extras(self, image, pa_deg):
+        """
+        Draw any overlays that do not follow the current pointing.
+
+        Called at the end of every `place_overlays`. Returns True if the
+        canvas needs redrawing. Concrete classes with extra overlays should
+        extend this.
+        """
+        changed = self.place_catalog(image)
+        return self.place_track(image) or changed
+
+    def place_track(self, image):
+        """
+        Draw the track of a moving target, with times marked along it
+
+        Ticks are placed every hour, or every day for windows of more than
+        two days.
+        """
+        tag = "track_overlay"
+        # by identity, as tracks hold arrays; a new track is a new Bunch
+        key = (image, self.track)
+        if self._track_key is not None and all(
+            new is old for new, old in zip(key, self._track_key)
+        ):
+            return False
+        self._track_key = key
+        self.canvas.delete_object_by_tag(tag, redraw=False)
+        if self.track is None:
+            return True
+
+        times = self.track.times
+        tick = 1 * u.hour if (times[-1] - times[0]) <= 2 * u.day else 1 * u.day
+        first = np.ceil((times[0].mjd * u.day / tick).decompose().value)
+        last = np.floor((times[-1].mjd * u.day / tick).decompose().value)
+        ticks = Time((np.arange(first, last + 1) * tick).to_value(u.day), format="mjd")
+        ra, dec, _ = ephemeris(self.track.elements, ticks)
+        pix = radectopix(
+            image,
+            np.concatenate((self.track.ra, ra)),
+            np.concatenate((self.track.dec, dec)),
+        )
+        path, marks = pix[: len(times)], pix[len(times) :]
+
+        shapes = [Path([tuple(pt) for pt in path], color="magenta", linewidth=2)]
+        size = wcs.calc_radius_xy(image, path[0, 0], path[0, 1], 1 / 3600)
+        fmt = "%H:%M" if tick == 1 * u.hour else "%m-%d"
+        for (x, y), t in zip(marks, ticks):
+            shapes.append(Circle(x, y, size, color="magenta", fill=True))
+            shapes.append(
+                Text(x + 2 * size, y, t.strftime(fmt), color="magenta", fontsize=10)
+            )
+        shapes[0].name = self.track.name
+        self.canvas.add(CompoundObject(*shapes), tag=tag, redraw=False)
+        return True
+
+    def place_catalog(self, image):
+        """
+        Draw the stars from the local catalog that fall on the image, or
+        the sources detected on it if there is no catalog.
+
+        The catalog is only queried when a new image is loaded, or the
+        observing epoch changes. All the stars are converted to pixels in
+        one WCS call and added to the canvas as one compound object, with
+        markers scaled by magnitude. Stars are drawn at their positions at
+        the observing epoch, with lines back to where they are on the
+        image for any that have moved far enough to matter.
+        """
+        tag = "catalog_overlay"
+        epoch = self.observing_epoch
+        if (image, epoch) == self._catalog_key:
+            return False
+        self._catalog_key = (image, epoch)
+        self.canvas.delete_object_by_tag(tag, redraw=False)
+        try:
+            catalog = self.get_catalog()
+        except ValueError:
+            return True
+
+        # cone around the image, out to its furthest corner
+        ny, nx = image.get_data().shape[:2]
+        corners = np.array([(nx / 2, ny / 2), (0, 0), (nx, 0), (0, ny), (nx, ny)])
+        radec = np.asarray(image.wcs.datapt_to_wcspt(corners), dtype=float)
+        ra, dec = radec[0, :2]
+        radius = np.max(np.hypot(*radec_offsets(ra, dec, radec[1:, 0], radec[1:, 1])))
+        stars = catalog.cone(ra, dec, radius, epoch=epoch)
+        stars = dict((key, col[: self.catalog_max_stars]) for key, col in stars.items())
+        mag = stars["mag"]
+        if len(mag) == 0:
+            return True
+
+        # positions at the observing and image epochs, in one WCS call
+        ra_img, dec_img = self.positions_at(stars, image.get("epoch", None))
+        pix, pix_img = np.split(
+            radectopix(
+                image,
+                np.concatenate((stars["ra"], ra_img)),
+                np.concatenate((stars["dec"], dec_img)),
+            ),
+            2,
+        )
+        # marker radius from 2 to 15 arcsec, bigger for brighter stars
+        px_per_arcsec = wcs.calc_radius_xy(image, nx / 2, ny / 2, 1 / 3600)
+        radii = px_per_arcsec * np.clip(2 + 1.5 * (mag.max() - mag), 2, 15)
+        moved = np.hypot(*(pix - pix_img).T) > px_per_arcsec * self.min_track_length
+        shapes = []
+        for (x, y), (x0, y0), r, m, track in zip(pix, pix_img, radii, mag, moved):
+            shape = Circle(x, y, r, color="cyan", linewidth=1)
+            shape.name = "{} {:.1f} mag".format(catalog.name, m)
+            shapes.append(shape)
+            if track:
+                shapes.append(Line(x0, y0, x, y, color="cyan", linewidth=1))
+        self.canvas.add(CompoundObject(*shapes), tag=tag, redraw=False)
+        self.logger.info(
+            "drew {} stars from {}".format(len(shapes), catalog.name)
+        )
+        return True
+
+    def draw_ccd(self, *args):
+        """
+        Schedule a redraw of the overlays with the current settings
+        """
+        self.redraw.request()
 
     def create_blank_image(self):
         self.fitsimage.onscreen_message("Creating blank field...", delay=1.0)
@@ -584,27 +1553,41 @@ class FovSetter(tk.LabelFrame):
             finally:
                 self.fitsimage.onscreen_message(None)
 
+    def cutout_region(self):
+        """
+        Centre and width (deg) of the survey image to download.
+
+        Five times the field of view, about the pointing, or for a moving
+        target enough to cover the field of view all along its track, so
+        one image serves the whole time window.
+        """
+        ra, dec = self.ctr_ra_deg, self.ctr_dec_deg
+        fov = max(self.fov_x, self.fov_y)
+        width = 5 * fov
+        if self.track is not None:
+            x, y = radec_offsets(ra, dec, self.track.ra, self.track.dec)
+            x0, x1 = min(x.min(), 0), max(x.max(), 0)
+            y0, y1 = min(y.min(), 0), max(y.max(), 0)
+            ra, dec = add_offsets_radec(ra, dec, 0.5 * (x0 + x1), 0.5 * (y0 + y1))
+            width = max(width, x1 - x0 + 2 * fov, y1 - y0 + 2 * fov)
+        return float(ra), float(dec), float(width)
+
     def _load_image(self):
         try:
-            fov_deg = 5 * max(self.fov_x, self.fov_y)
-            ra_txt = self.ra.as_string()
-            dec_txt = self.dec.as_string()
-            # width and height are specified in arcmin
-            wd = 60 * fov_deg
-            ht = 60 * fov_deg
-            params = dict(ra=ra_txt, dec=dec_txt, width=wd, height=ht)
-
-            # query server and download file
-            filename = "sky.fits"
-            filepath = os.path.join(self.tmpdir, filename)
-            if os.path.exists(filepath):
-                os.unlink(filepath)
-
-            dstpath = self.bank.get_image(self.servername, filepath, **params)
+            dstpath = fetch_survey_image(
+                self.bank, self.servername, *self.cutout_region(), directory=self.tmpdir
+            )
         except Exception as err:
             errmsg = "Failed to download sky image: {}".format(str(err))
             self.logger.error(msg=errmsg)
             self.imfilepath = None
             return
 
+        if dstpath is not None:
+            # ingest here, off the GUI thread, so display statistics are ready
+            try:
+                self.image_cache.get_entry(dstpath)
+            except Exception as err:
+                errmsg = "Failed to read sky image: {}".format(str(err))
+                self.logger.error(msg=errmsg)
         self.imfilepath = dstpath
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, absolute_import, unicode_literals, division
+import math
 import six
 from os.path import expanduser
 
@@ -61,8 +62,61 @@ def make_finder_opencv(logger, fname, img_array, object_name, tel, ra, dec, pa,
     )
 
 
+_fonts = {}
+
+
+def _font_file():
+    try:
+        return importlib_resources.files("hcam_finder") / "data/Lato-Regular.ttf"
+    except AttributeError:
+        # backport for Python <P3.9
+        import pkg_resources
+
+        return pkg_resources.resource_filename("hcam_finder", "data/Lato-Regular.ttf")
+
+
+def get_font(size):
+    """
+    The font used on finding charts, at a given size (pix)
+
+    Each size is loaded once, then cached.
+    """
+    size = max(1, int(size))
+    if size not in _fonts:
+        _fonts[size] = ImageFont.truetype(str(_font_file()), size)
+    return _fonts[size]
+
+
+def fit_font(lines, width, ref_size=100):
+    """
+    Smallest font in which the widest of some lines of text is at least
+    `width` wide.
+
+    Text width is proportional to font size, so the size is found from
+    one measurement at a reference size.
+    """
+    ref_width = max(get_font(ref_size).getbbox(line)[2] for line in lines)
+    return get_font(math.ceil(ref_size * width / max(ref_width, 1)))
+
+
 def make_finder_pillow(logger, fname, img_array, object_name, tel, ra, dec, pa, wins):
-    image = Image.fromarray(img_array)
+    image = annotate_finder(img_array, object_name, tel, ra, dec, pa, wins)
+    image.save(fname)
+
+
+def annotate_finder(img_array, object_name, tel, ra, dec, pa, wins):
+    """
+    Add the box of object info to a finding chart
+
+    Returns
+    -------
+    image : `~PIL.Image.Image`
+        the annotated RGB chart
+    """
+    if isinstance(img_array, Image.Image):
+        image = img_array
+    else:
+        image = Image.fromarray(img_array)
     image = image.convert("RGB")
     width, height = image.size
     draw = ImageDraw.Draw(image)
@@ -80,31 +134,18 @@ def make_finder_pillow(logger, fname, img_array, object_name, tel, ra, dec, pa,
             version=version,
         )
     )
-    font_size = 5
-    try:
-        font_file = importlib_resources.files("hcam_finder") / "data/Lato-Regular.ttf"
-    except AttributeError:
-        # backport for Python <P3.9
-        import pkg_resources
-
-        font_file = pkg_resources.resource_filename(
-            "hcam_finder", "data/Lato-Regular.ttf"
-        )
-
-    text_x = 0.0
-    while text_x / width < 0.4:
-        font_size += 1
-        font = ImageFont.truetype(str(font_file), font_size)
-        _, _, text_x, text_y = max((font.getbbox(txt) for txt in info_msg.splitlines()))
+    lines = info_msg.splitlines()
+    font = fit_font(lines, 0.4 * width)
+    text_x = max(font.getbbox(txt)[2] for txt in lines)
+    text_y = max(font.getbbox(txt)[3] for txt in lines)
 
-    nlines = len(info_msg.splitlines()) + 1
+    nlines = len(lines) + 1
     rect_x, rect_y = int(1.1 * text_x), nlines * int(text_y)
     rectangle = Image.new("RGBA", (rect_x, rect_y), (255, 255, 255, 200))
 
-    width, height = image.size
     x = width - rect_x
     y = 0
     image.paste(rectangle, (x, y), rectangle)
     x = width - 1.05 * text_x
     draw.text((x, y), info_msg, font=font, fill="rgb(255, 0, 0)")
-    image.save(fname)
+    return image
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+from ginga.canvas.types.all import Circle, Line, Path
+from ginga.misc import Bunch
+
+from .geometry import add_offsets_radec, radectopix, rect_corners
+from .shapes import CCDWin
+
+
+def rotate_offsets(xy, pa_deg):
+    """
+    Rotate tangent plane offsets by a position angle
+
+    Parameters
+    ----------
+    xy : `~numpy.ndarray`
+        offsets with shape (N, 2); x increases to the East, y to the North
+    pa_deg : float
+        rotation angle in degrees, positive from North through East
+
+    Returns
+    -------
+    xy : `~numpy.ndarray`
+        rotated offsets
+    """
+    theta = np.radians(pa_deg)
+    c, s = np.cos(theta), np.sin(theta)
+    rot = np.array([[c, -s], [s, c]])
+    return np.dot(xy, rot)
+
+
+def unrotate_offsets(x, y, pa_deg):
+    """
+    Rotate sky offsets back into the detector frame; the inverse of
+    `rotate_offsets`
+
+    Parameters
+    ----------
+    x, y : float or `~numpy.ndarray`
+        offsets to the East and North
+    pa_deg : float or `~numpy.ndarray`
+        rotation angle(s) in degrees, positive from North through East.
+        Must broadcast against `x` and `y`.
+
+    Returns
+    -------
+    x, y : `~numpy.ndarray`
+        offsets in the detector frame
+    """
+    theta = np.radians(pa_deg)
+    c, s = np.cos(theta), np.sin(theta)
+    return x * c - y * s, x * s + y * c
+
+
+class Footprint(object):
+    """
+    Instrument footprint, precomputed in a detector-fixed frame.
+
+    The footprint is a list of named parts, such as the chip outline,
+    windows and guide lines. The vertices of each part are stored as
+    tangent plane offsets in degrees from the rotator centre, for a PA of
+    zero. Placing the footprint on an image for a given pointing and PA
+    is then a single rotation and offset of all the vertices, followed by
+    one vectorised call to the image WCS.
+
+    Parameters
+    ----------
+    px_scale : float
+        pixel scale of the detector (arcsec/pix)
+    rotcen_x, rotcen_y : float
+        rotator centre on the detector (pix)
+    flipEW : bool
+        is the detector flipped E-W?
+    """
+
+    def __init__(self, px_scale, rotcen_x, rotcen_y, flipEW):
+        self.px_scale = px_scale
+        self.rotcen = np.array([rotcen_x, rotcen_y], dtype=float)
+        self.flipEW = flipEW
+        self.parts = []
+        # what the footprint was built from, so callers can spot changes
+        self.key = None
+        self._xy = None
+
+    def ccd_to_offsets(self, xy):
+        """
+        Convert detector pixel positions to offsets in degrees
+        """
+        xy = (np.asarray(xy, dtype=float) - self.rotcen) * self.px_scale / 3600
+        if not self.flipEW:
+            xy[..., 0] *= -1
+        return xy
+
+    def add(self, name, kind, xy_deg, **params):
+        """
+        Add a part to the footprint
+
+        Parameters
+        ----------
+        name : str
+            name of the part
+        kind : str
+            one of 'polygon', 'line', 'path' or 'circle'. Circles are
+            given by their centre and a point on the circumference.
+        xy_deg : array-like
+            vertices of the part as offsets in degrees, shape (N, 2)
+        params : dict
+            parameters passed straight through to the canvas object
+        """
+        xy = np.asarray(xy_deg, dtype=float).reshape(-1, 2)
+        self.parts.append(Bunch.Bunch(name=name, kind=kind, xy=xy, params=params))
+        self._xy = None
+
+    def add_window(self, name, win, **params):
+        """
+        Add a rectangular window, given as (xs, ys, nx, ny) in detector pixels
+        """
+        self.add(name, "polygon", self.ccd_to_offsets(rect_corners(*win)[0]), **params)
+
+    def add_line(self, name, start, end, **params):
+        """
+        Add a line between two positions in detector pixels
+        """
+        self.add(name, "line", self.ccd_to_offsets([start, end]), **params)
+
+    @property
+    def vertices(self):
+        """
+        All vertices of the footprint in one array, shape (N, 2)
+        """
+        if self._xy is None:
+            self._xy = np.concatenate([np.zeros((1, 2))] + [p.xy for p in self.parts])
+            self._splits = np.cumsum([1] + [len(p.xy) for p in self.parts])[:-1]
+        return self._xy
+
+    def place(self, image, ra_deg, dec_deg, pa_deg):
+        """
+        Find the image pixel positions of the footprint
+
+        Several pointings can be placed at once by passing arrays of
+        positions, in which case the outputs gain a leading dimension.
+
+        Parameters
+        ----------
+        image : `~ginga.AstroImage.AstroImage`
+            image to place the footprint on
+        ra_deg, dec_deg : float or `~numpy.ndarray`
+            pointing centre(s) (deg)
+        pa_deg : float
+            rotation, positive from North through East (deg)
+
+        Returns
+        -------
+        ctr : `~numpy.ndarray`
+            image pixel position of the pointing centre(s)
+        pix : list of `~numpy.ndarray`
+            image pixel positions of the vertices of each part
+        """
+        xy = rotate_offsets(self.vertices, pa_deg)
+        ra_deg = np.asarray(ra_deg, dtype=float)[..., np.newaxis]
+        dec_deg = np.asarray(dec_deg, dtype=float)[..., np.newaxis]
+        ra, dec = add_offsets_radec(ra_deg, dec_deg, xy[:, 0], xy[:, 1])
+        pix = np.split(radectopix(image, ra, dec), self._splits, axis=-2)
+        return pix[0][..., 0, :], pix[1:]
+
+    def make_shape(self, part, pts):
+        """
+        Make a ginga canvas object for one part, at the given pixel positions
+        """
+        if part.kind == "polygon":
+            shape = CCDWin(pts, **part.params)
+        elif part.kind == "line":
+            shape = Line(*pts.ravel(), **part.params)
+        elif part.kind == "path":
+            shape = Path([tuple(pt) for pt in pts], **part.params)
+        elif part.kind == "circle":
+            x, y = pts[0]
+            shape = Circle(x, y, np.hypot(*(pts[1] - pts[0])), **part.params)
+        else:
+            raise ValueError("unknown footprint part kind " + part.kind)
+        shape.name = part.name
+        return shape
+
+    def make_shapes(self, pix):
+        """
+        Make ginga canvas objects for each part, from `place` output
+        """
+        return [self.make_shape(part, pts) for part, pts in zip(self.parts, pix)]
+
+    def update_shape(self, shape, part, pts):
+        """
+        Move an existing canvas object, made by `make_shape`, to new positions
+        """
+        if part.kind in ("polygon", "path"):
+            shape.points = [tuple(pt) for pt in pts]
+        elif part.kind == "line":
+            (shape.x1, shape.y1), (shape.x2, shape.y2) = pts
+        elif part.kind == "circle":
+            shape.x, shape.y = pts[0]
+            shape.radius = np.hypot(*(pts[1] - pts[0]))
+
+    def update_shapes(self, shapes, pix):
+        """
+        Move existing canvas objects, made by `make_shapes`, to new positions
+        """
+        for shape, part, pts in zip(shapes, self.parts, pix):
+            self.update_shape(shape, part, pts)
+
+    def update_overlay(self, obj, pix):
+        """
+        Update a compound canvas object to show this footprint.
+
+        `obj` was made from this or an earlier footprint, recorded as its
+        ``footprint`` attribute. Parts are matched by name; unchanged parts
+        are just moved, and new canvas objects are only made for parts that
+        have been added or changed.
+
+        Parameters
+        ----------
+        obj : `~ginga.canvas.types.layer.CompoundObject`
+            overlay to update
+        pix : list of `~numpy.ndarray`
+            image pixel positions of each part, from `place`
+
+        Returns
+        -------
+        nchanged : int
+            number of parts added, changed or removed
+        """
+        old = obj.footprint
+        if old is self:
+            self.update_shapes(obj.objects, pix)
+            return 0
+
+        old_parts = dict(
+            (part.name, (part, shape)) for part, shape in zip(old.parts, obj.objects)
+        )
+        shapes = []
+        nchanged = 0
+        for part, pts in zip(self.parts, pix):
+            old_part, shape = old_parts.pop(part.name, (None, None))
+            if old_part is not None and same_part(old_part, part):
+                self.update_shape(shape, part, pts)
+            else:
+                shape = self.make_shape(part, pts)
+                shape.initialize(obj, obj.viewer, obj.logger)
+                nchanged += 1
+            shapes.append(shape)
+        obj.objects = shapes
+        obj.footprint = self
+        return nchanged + len(old_parts)
+
+
+def same_part(part1, part2):
+    """
+    Are two footprint parts identical?
+    """
+    return (
+        part1.name == part2.name
+        and part1.kind == part2.kind
+        and part1.params == part2.params
+        and np.array_equal(part1.xy, part2.xy)
+    )
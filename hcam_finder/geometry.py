@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+
+
+def add_offsets_radec(ra_deg, dec_deg, delta_deg_ra, delta_deg_dec):
+    """
+    Add tangent plane offsets to a base position, for arrays of offsets.
+
+    This is a vectorised version of `ginga.util.wcs.add_offset_radec`,
+    and gives the same results.
+
+    Parameters
+    ----------
+    ra_deg, dec_deg : float
+        base position (deg)
+    delta_deg_ra, delta_deg_dec : float or `~numpy.ndarray`
+        offsets in the tangent plane at the base position (deg)
+
+    Returns
+    -------
+    ra, dec : `~numpy.ndarray`
+        offset positions (deg), with the same shape as the offsets
+    """
+    x = np.radians(delta_deg_ra)
+    y = np.radians(delta_deg_dec)
+    raz = np.radians(ra_deg)
+    decz = np.radians(dec_deg)
+
+    sdecz = np.sin(decz)
+    cdecz = np.cos(decz)
+
+    d = cdecz - y * sdecz
+
+    ra2 = np.mod(np.arctan2(x, d) + raz, 2 * np.pi)
+    dec2 = np.arctan2(sdecz + y * cdecz, np.sqrt(x * x + d * d))
+    return np.degrees(ra2), np.degrees(dec2)
+
+
+def radec_offsets(ra_deg, dec_deg, ra, dec):
+    """
+    Tangent plane offsets of positions from a base position.
+
+    The inverse of `add_offsets_radec`.
+
+    Parameters
+    ----------
+    ra_deg, dec_deg : float
+        base position (deg)
+    ra, dec : float or `~numpy.ndarray`
+        positions to find the offsets of (deg)
+
+    Returns
+    -------
+    delta_deg_ra, delta_deg_dec : `~numpy.ndarray`
+        offsets in the tangent plane at the base position (deg)
+    """
+    raz = np.radians(ra_deg)
+    decz = np.radians(dec_deg)
+    dra = np.radians(ra) - raz
+    dec = np.radians(dec)
+
+    sdecz = np.sin(decz)
+    cdecz = np.cos(decz)
+    sdec = np.sin(dec)
+    cdec = np.cos(dec)
+
+    d = sdec * sdecz + cdec * cdecz * np.cos(dra)
+    x = cdec * np.sin(dra) / d
+    y = (sdec * cdecz - cdec * sdecz * np.cos(dra)) / d
+    return np.degrees(x), np.degrees(y)
+
+
+def radectopix(image, ra_deg, dec_deg):
+    """
+    Convert arrays of sky positions to image pixels in one WCS call.
+
+    Parameters
+    ----------
+    image : `~ginga.AstroImage.AstroImage`
+        image with a valid WCS
+    ra_deg, dec_deg : `~numpy.ndarray`
+        sky positions (deg)
+
+    Returns
+    -------
+    pix : `~numpy.ndarray`
+        data (0-based) pixel positions, with shape ``ra_deg.shape + (2,)``
+    """
+    ra_deg, dec_deg = np.broadcast_arrays(ra_deg, dec_deg)
+    wcspt = np.column_stack((ra_deg.ravel(), dec_deg.ravel()))
+    pix = np.asarray(image.wcs.wcspt_to_datapt(wcspt), dtype=float)
+    return pix[:, :2].reshape(ra_deg.shape + (2,))
+
+
+def rect_corners(xs, ys, nx, ny):
+    """
+    Corners of rectangles, anti-clockwise from the (xs, ys) corner.
+
+    Parameters
+    ----------
+    xs, ys, nx, ny : float or array-like
+        start position and size of each rectangle
+
+    Returns
+    -------
+    corners : `~numpy.ndarray`
+        array of shape (N, 4, 2)
+    """
+    xs, ys, nx, ny = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(v, dtype=float)) for v in (xs, ys, nx, ny)]
+    )
+    x = np.stack((xs, xs + nx, xs + nx, xs), axis=-1)
+    y = np.stack((ys, ys, ys + ny, ys + ny), axis=-1)
+    return np.stack((x, y), axis=-1)
+
+
+def points_in_polygon(x, y, poly):
+    """
+    Test which points lie inside a polygon, using the even-odd rule.
+
+    The loop is over polygon edges only, so many points, and many
+    polygons of the same number of vertices, are tested in one go.
+
+    Parameters
+    ----------
+    x, y : float or `~numpy.ndarray`
+        coordinates of the points
+    poly : array-like
+        polygon vertices, with shape (..., V, 2). Any leading dimensions
+        must broadcast against the shape of `x` and `y`.
+
+    Returns
+    -------
+    inside : `~numpy.ndarray`
+        boolean array, with the broadcast shape of the points and polygons
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    poly = np.asarray(poly, dtype=float)
+    px, py = poly[..., 0], poly[..., 1]
+    inside = False
+    xj, yj = px[..., -1], py[..., -1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for k in range(poly.shape[-2]):
+            xi, yi = px[..., k], py[..., k]
+            crosses = (yi > y) != (yj > y)
+            xcross = (xj - xi) * (y - yi) / (yj - yi) + xi
+            inside = inside ^ (crosses & (x < xcross))
+            xj, yj = xi, yi
+    return np.asarray(inside)
+
+
+def coverage_map(polygons, shape):
+    """
+    Count how many polygons cover each pixel of an image
+
+    Each polygon is only tested against the pixel centres inside its
+    bounding box.
+
+    Parameters
+    ----------
+    polygons : iterable of array-like
+        polygons in image pixel coordinates, each with shape (V, 2)
+    shape : tuple
+        (ny, nx) shape of the image
+
+    Returns
+    -------
+    counts : `~numpy.ndarray`
+        number of polygons covering each pixel
+    """
+    ny, nx = shape
+    counts = np.zeros(shape, dtype=np.int16)
+    for poly in polygons:
+        poly = np.asarray(poly, dtype=float)
+        x0 = max(0, int(np.floor(poly[:, 0].min())))
+        x1 = min(nx, int(np.ceil(poly[:, 0].max())) + 1)
+        y0 = max(0, int(np.floor(poly[:, 1].min())))
+        y1 = min(ny, int(np.ceil(poly[:, 1].max())) + 1)
+        if x1 <= x0 or y1 <= y0:
+            continue
+        yy, xx = np.mgrid[y0:y1, x0:x1]
+        counts[y0:y1, x0:x1] += points_in_polygon(xx, yy, poly)
+    return counts
+
+
+def true_runs(mask):
+    """
+    Find the runs of True values in a boolean array
+
+    Parameters
+    ----------
+    mask : array-like
+        1D boolean array
+
+    Returns
+    -------
+    runs : list of tuple
+        (first, last) index of each run
+    """
+    edges = np.diff(np.concatenate(([0], np.asarray(mask, dtype=int), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+    return list(zip(starts, ends))
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+
+from .footprint import unrotate_offsets
+from .geometry import points_in_polygon, radec_offsets, true_runs
+
+try:
+    from importlib import resources as importlib_resources
+except Exception:
+    # backport for python 3.6
+    import importlib_resources
+
+_outline = {}
+
+
+def guider_outline(flipEW=True):
+    """
+    Outline of the GTC guider hole, within which guide stars can be used
+
+    Read from the file bundled with the package the first time it is
+    needed, then cached. The file gives the outline with x along the
+    detector x axis, so it is turned into offsets to the East in the same
+    way as `~hcam_finder.footprint.Footprint.ccd_to_offsets`. On GTC,
+    where the image is flipped E-W, the two are the same.
+
+    Parameters
+    ----------
+    flipEW : bool
+        is the detector flipped E-W?
+
+    Returns
+    -------
+    xy : `~numpy.ndarray`
+        vertices as offsets (deg) from the rotator centre at a PA of zero,
+        shape (N, 2)
+    """
+    if "xy" not in _outline:
+        try:
+            fname = (
+                importlib_resources.files("hcam_finder")
+                / "data/guider_hole_arcseconds.txt"
+            )
+        except AttributeError:
+            # backport for Python <P3.9
+            import pkg_resources
+
+            fname = pkg_resources.resource_filename(
+                "hcam_finder", "data/guider_hole_arcseconds.txt"
+            )
+        xy = np.loadtxt(str(fname)) / 3600
+        # drop repeated vertices, including any closing vertex
+        keep = np.any(xy != np.roll(xy, 1, axis=0), axis=1)
+        _outline["xy"] = xy[keep]
+    if flipEW:
+        return _outline["xy"]
+    return _outline["xy"] * [-1, 1]
+
+
+def guide_star_availability(ra_deg, dec_deg, ra, dec, pa_deg, flipEW=True):
+    """
+    Which stars fall within the guider hole, for one or more PAs
+
+    All stars are checked at all PAs at once.
+
+    Parameters
+    ----------
+    ra_deg, dec_deg : float
+        pointing (deg)
+    ra, dec : array-like
+        positions of the stars (deg)
+    pa_deg : float or array-like
+        rotation(s), positive from North through East (deg)
+    flipEW : bool
+        is the detector flipped E-W?
+
+    Returns
+    -------
+    available : `~numpy.ndarray`
+        True where a star is within the guider hole, shape
+        pa_deg.shape + ra.shape
+    """
+    x, y = radec_offsets(ra_deg, dec_deg, np.asarray(ra), np.asarray(dec))
+    x, y = unrotate_offsets(x, y, np.asarray(pa_deg)[..., np.newaxis])
+    return points_in_polygon(x, y, guider_outline(flipEW))
+
+
+def guide_pa_ranges(ra_deg, dec_deg, ra, dec, step=1.0, flipEW=True):
+    """
+    Ranges of PA that leave at least one star within the guider hole
+
+    Parameters
+    ----------
+    ra_deg, dec_deg : float
+        pointing (deg)
+    ra, dec : array-like
+        positions of the stars (deg)
+    step : float
+        spacing of the PAs checked (deg)
+    flipEW : bool
+        is the detector flipped E-W?
+
+    Returns
+    -------
+    ranges : list of tuple
+        (start, end) of each range of PA, positive from North through East
+        (deg). A range that wraps through zero ends beyond 360.
+    nstars : `~numpy.ndarray`
+        number of stars available at each PA checked, starting from zero
+    """
+    pa = np.arange(0, 360, step)
+    available = guide_star_availability(ra_deg, dec_deg, ra, dec, pa, flipEW)
+    nstars = available.sum(axis=-1)
+    runs = true_runs(nstars > 0)
+    if len(runs) > 1 and runs[0][0] == 0 and runs[-1][1] == len(pa) - 1:
+        # join the runs either side of zero
+        runs = runs[1:-1] + [(runs[-1][0], runs[0][1] + len(pa))]
+    return [(i * step, j * step) for i, j in runs], nstars
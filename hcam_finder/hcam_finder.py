@@ -3,51 +3,183 @@ from __future__ import print_function, absolute_import, unicode_literals, divisi
 import six
 from os.path import expanduser
 import json
-import itertools
+from collections import OrderedDict
 
+import numpy as np
+from ginga import cmap
+from ginga.RGBImage import RGBImage
+from ginga.canvas.types.all import Circle, CompoundObject, Image
+from ginga.misc import Bunch
 from ginga.util import wcs
-from ginga.canvas.types.all import Line, CompoundObject
 from astropy import units as u
-from astropy.coordinates import SkyCoord
 
-from hcam_widgets.compo.utils import (
-    InjectionArm,
-    PickoffArm,
-    INJECTOR_THETA,
-    PARK_POSITION,
-)
+from hcam_widgets.compo.utils import INJECTOR_THETA, PARK_POSITION
 from hcam_widgets.tkutils import get_root
 
+from .detection import zero_point
+from .geometry import (
+    add_offsets_radec,
+    coverage_map,
+    points_in_polygon,
+    radec_offsets,
+    radectopix,
+)
+from .compo import (
+    MIRROR_RADIUS,
+    circle_points,
+    clear_ranges,
+    injector_geometry,
+    patrol_arc,
+    pickoff_angle_for,
+    pickoff_geometry,
+    vignetting,
+)
+from .footprint import unrotate_offsets
 from .finders import FovSetter
-from .shapes import CompoPatrolArc
+from .guider import guide_pa_ranges, guider_outline
+from .photometry import aperture_photometry, scale_peak_counts
 
 if not six.PY3:
+    import Tkinter as tk
     import tkFileDialog as filedialog
 else:
+    import tkinter as tk
     from tkinter import filedialog
 
 
+def _coverage_image(counts, alpha=0.5, cmap_name="rainbow3"):
+    """
+    Colour a coverage map for display, leaving uncovered pixels transparent
+    """
+    clst = np.asarray(cmap.get_cmap(cmap_name).clst)
+    nmax = max(1, counts.max())
+    idx = (counts * (len(clst) - 1) // nmax).astype(int)
+    rgba = np.zeros(counts.shape + (4,), dtype=np.uint8)
+    rgba[..., :3] = (255 * clst[idx]).astype(np.uint8)
+    rgba[..., 3] = np.where(counts > 0, int(255 * alpha), 0)
+    return RGBImage(data_np=rgba, order="RGBA")
+
+
+def ccd_windows(wframe, drift):
+    """
+    List of (xs, ys, nx, ny) in instr pixels for a set of windows
+
+    Parameters
+    ----------
+    wframe : iterable
+        window pairs (xsl, xsr, ys, nx, ny) in drift mode, or window quads
+        (xsll, xsul, xslr, xsur, ys, nx, ny) otherwise
+    drift : bool
+        are these drift mode window pairs?
+    """
+    wins = []
+    if drift:
+        for xsl, xsr, ys, nx, ny in wframe:
+            wins.append((xsl, ys, nx, ny))
+            wins.append((xsr, ys, nx, ny))
+    else:
+        for xsll, xsul, xslr, xsur, ys, nx, ny in wframe:
+            wins.append((xsll, ys, nx, ny))
+            wins.append((xsul, 1024 - ys, nx, -ny))
+            wins.append((xslr, ys, nx, ny))
+            wins.append((xsur, 1024 - ys, nx, -ny))
+    return wins
+
+
+def window_text(wframe, drift):
+    """
+    Describe a set of windows, one line per window pair or quad, for
+    finding charts
+    """
+    if drift:
+        winlist = [
+            "xsl: {}, xsr: {}, ys: {}, nx: {}, ny: {}".format(xsl, xsr, ys, nx, ny)
+            for (xsl, xsr, ys, nx, ny) in wframe
+        ]
+    else:
+        winlist = [
+            "xsll: {}, xslr: {}, xsul: {}, xsur: {}, ys: {}, nx: {}, ny: {}".format(
+                xsll, xslr, xsul, xsur, ys, nx, ny
+            )
+            for (xsll, xsul, xslr, xsur, ys, nx, ny) in wframe
+        ]
+    return "\n".join(winlist)
+
+
+def add_ccd_parts(footprint, nx, ny, windows):
+    """
+    Add the chip outline, quadrant lines and windows to a footprint
+
+    Parameters
+    ----------
+    footprint : `~hcam_finder.footprint.Footprint`
+        footprint to add to
+    nx, ny : int
+        size of the chip (pix)
+    windows : list
+        windows as (xs, ys, nx, ny) in instr pixels, from `ccd_windows`
+    """
+    footprint.add_window(
+        "mainCCD", (0, 0, nx, ny), fill=True, fillcolor="blue", fillalpha=0.3
+    )
+
+    # dashed lines to mark quadrants of CCD
+    params = dict(color="red", linestyle="dash", linewidth=2)
+    footprint.add_line("hline", (nx / 2, 0), (nx / 2, ny), **params)
+    footprint.add_line("vline", (0, ny / 2), (nx, ny / 2), **params)
+
+    params = dict(fill=True, fillcolor="red", fillalpha=0.3)
+    for n, win in enumerate(windows):
+        footprint.add_window("window{}".format(n), win, **params)
+
+
 class HCAMFovSetter(FovSetter):
-    overlay_names = ["ccd_overlay", "compo_overlay"]
+    overlay_names = ["ccd_overlay", "compo_overlay", "guider_overlay"]
+    # show how many nod positions cover each pixel?
+    show_coverage = False
+    _coverage_key = None
+    _vignetting_key = None
+    # stars the COMPO pickoff can reach, from `find_pickoff_stars`
+    pickoff_options = []
+    pickoff_choice = -1
+    _pickoff_key = None
+    # aperture radius and sky annulus for survey photometry (arcsec)
+    aperture_radius = 3.0
+    sky_annulus = (5.0, 8.0)
+    _saturation_key = None
+
+    def __init__(self, master, fitsimage, logger):
+        super(HCAMFovSetter, self).__init__(master, fitsimage, logger)
+        g = get_root(self).globals
+        # below the other buttons
+        info = self.optimizeButton.grid_info()
+        self.pickoffButton = tk.Button(
+            self,
+            width=14,
+            fg="black",
+            text="COMPO Star",
+            bg=g.COL["main"],
+            command=self.pickoff_star_cb,
+        )
+        self.pickoffButton.grid(
+            row=int(info["row"]) + 1, column=info["column"], sticky=tk.W
+        )
+        self.guideButton = tk.Button(
+            self,
+            width=14,
+            fg="black",
+            text="Guide Stars",
+            bg=g.COL["main"],
+            command=self.guide_star_cb,
+        )
+        self.guideButton.grid(
+            row=int(info["row"]) + 2, column=info["column"], sticky=tk.W
+        )
 
     def window_string(self):
         g = get_root(self).globals
-        wframe = g.ipars.wframe
-        if g.ipars.isFF():
-            winlist = []
-        if g.ipars.isDrift():
-            winlist = [
-                "xsl: {}, xsr: {}, ys: {}, nx: {}, ny: {}".format(xsl, xsr, ys, nx, ny)
-                for (xsl, xsr, ys, nx, ny) in wframe
-            ]
-        else:
-            winlist = [
-                "xsll: {}, xslr: {}, xsul: {}, xsur: {}, ys: {}, nx: {}, ny: {}".format(
-                    xsll, xslr, xsul, xsur, ys, nx, ny
-                )
-                for (xsll, xsul, xslr, xsur, ys, nx, ny) in wframe
-            ]
-        return "\n".join(winlist)
+        wframe = [] if g.ipars.isFF() else g.ipars.wframe
+        return window_text(wframe, g.ipars.isDrift())
 
     def saveconf(self):
         fname = filedialog.asksaveasfilename(
@@ -77,10 +209,7 @@ class HCAMFovSetter(FovSetter):
         # target info
         target = dict()
         target["target"] = self.targName.value()
-        if self.have_decimal_coords():
-            targ_coord = SkyCoord(self.targCoords.value(), unit=(u.deg, u.deg))
-        else:
-            targ_coord = SkyCoord(self.targCoords.value(), unit=(u.hour, u.deg))
+        targ_coord = self.target_coords()
         target["TARG_RA"] = targ_coord.ra.to_string(
             sep=":", unit=u.hour, pad=True, precision=2
         )
@@ -96,6 +225,20 @@ class HCAMFovSetter(FovSetter):
         target["PA"] = self.pa.value()
         data["target"] = target
 
+        # comparison stars, if they have been looked for, for this setup
+        comparisons = self.current_comparisons()
+        if comparisons is not None:
+            data["comparisons"] = [
+                dict(
+                    RA=wcs.ra_deg_to_str(star.ra),
+                    DEC=wcs.dec_deg_to_str(star.dec),
+                    mag=float(star.mag),
+                    dmag=None if np.isnan(star.dmag) else float(star.dmag),
+                    window=star.window,
+                )
+                for star in comparisons
+            ]
+
         # write file
         with open(fname, "w") as of:
             of.write(json.dumps(data, sort_keys=True, indent=4, separators=(",", ": ")))
@@ -108,13 +251,13 @@ class HCAMFovSetter(FovSetter):
         """
         g = get_root(self).globals
         try:
-            np = g.ipars.nodPattern
-            if not np:
+            nods = g.ipars.nodPattern
+            if not nods:
                 raise ValueError("no nod pattern defined")
-            nd = len(np["ra"])
+            nd = len(nods["ra"])
             di = self.dither_index % nd
-            raoff = np["ra"][di]
-            decoff = np["dec"][di]
+            raoff = nods["ra"][di]
+            decoff = nods["dec"][di]
             self.dither_index += 1
         except Exception as err:
             self.logger.warn(
@@ -130,190 +273,593 @@ class HCAMFovSetter(FovSetter):
         ra, dec = wcs.add_offset_radec(
             self.ctr_ra_deg, self.ctr_dec_deg, raoff / 3600.0, decoff / 3600.0
         )
-        image = self.fitsimage.get_image()
-        xc, yc = image.radectopix(self.ra_as_drawn, self.dec_as_drawn)
-        xn, yn = image.radectopix(ra, dec)
-        # update latest dither centre
-        self.ra_as_drawn, self.dec_as_drawn = ra, dec
+        self.redraw.request(ra, dec)
+
+    def nod_coverage(self, image, pa_deg, offsets):
+        """
+        Count how many nod positions cover each pixel of the image.
+
+        The footprint is placed at every nod position in one go, then the
+        windows (or the whole chip, in full frame mode) are filled in.
+
+        Parameters
+        ----------
+        image : `~ginga.AstroImage.AstroImage`
+            image to compute the coverage on
+        pa_deg : float
+            rotation, positive from North through East (deg)
+        offsets : `~np.ndarray`
+            nod offsets (arcsec), from `nod_offsets`
+
+        Returns
+        -------
+        counts : `~np.ndarray`
+            coverage count for each image pixel
+        """
+        footprint = self.get_footprint()
+        ra, dec = add_offsets_radec(
+            self.ctr_ra_deg,
+            self.ctr_dec_deg,
+            offsets[:, 0] / 3600,
+            offsets[:, 1] / 3600,
+        )
+        ctr, pix = footprint.place(image, ra, dec, pa_deg)
+        windows = [
+            pts
+            for part, pts in zip(footprint.parts, pix)
+            if part.name.startswith("window")
+        ]
+        if not windows:
+            windows = [pix[0]]
+        polygons = np.concatenate(windows)
+        return coverage_map(polygons, image.get_data().shape[:2])
 
-        obj = self.canvas.get_object_by_tag("ccd_overlay")
-        obj.move_delta(xn - xc, yn - yc)
+    def toggle_coverage(self):
+        """
+        Show or hide the coverage map of the nod pattern
+        """
+        self.show_coverage = not self.show_coverage
+        self.redraw.request()
 
-        obj = self.canvas.get_object_by_tag("compo_overlay")
-        obj.move_delta(xn - xc, yn - yc)
+    def place_extras(self, image, pa_deg):
+        changed = super(HCAMFovSetter, self).place_extras(image, pa_deg)
+        changed = self.place_coverage(image, pa_deg) or changed
+        return self.check_saturation(image, pa_deg) or changed
 
-        self.canvas.update_canvas()
+    def window_photometry(self, image, pa_deg):
+        """
+        Measure the stars in every window on the survey image.
+
+        Stars from `get_catalog` that fall in a window are found in one
+        array operation, and aperture photometry done on all of them at
+        once. Without a zero point for the image, catalog magnitudes are
+        used instead, if there is a catalog.
+
+        Parameters
+        ----------
+        image : `~ginga.AstroImage.AstroImage`
+            survey image
+        pa_deg : float
+            rotation, positive from North through East (deg)
+
+        Returns
+        -------
+        stars : dict or None
+            ra, dec, mag and name of the window of each star found, or None
+            if magnitudes cannot be measured
+        """
+        zp = zero_point(image)
+        if zp is None and self.star_catalog is None:
+            return None
+        windows, polygons = self._window_polygons()
+        ra0, dec0 = self.ctr_ra_deg, self.ctr_dec_deg
+        reach = np.max(np.hypot(*polygons.reshape(-1, 2).T))
+        stars = self.get_catalog().cone(ra0, dec0, reach, epoch=self.observing_epoch)
+
+        x, y = radec_offsets(ra0, dec0, stars["ra"], stars["dec"])
+        x, y = unrotate_offsets(x, y, pa_deg)
+        inside = points_in_polygon(x[:, np.newaxis], y[:, np.newaxis], polygons)
+        found = np.flatnonzero(inside.any(axis=1))
+        ra, dec, mag = stars["ra"][found], stars["dec"][found], stars["mag"][found]
+
+        if zp is not None and len(found):
+            # measured where the stars are on the image
+            ra_img, dec_img = self.positions_at(stars, image.get("epoch", None))
+            pix = radectopix(image, ra_img[found], dec_img[found])
+            ny, nx = image.get_data().shape[:2]
+            scale = wcs.calc_radius_xy(image, nx / 2, ny / 2, 1 / 3600)
+            flux, _ = aperture_photometry(
+                image.get_data(),
+                pix[:, 0],
+                pix[:, 1],
+                radius=scale * self.aperture_radius,
+                annulus=[scale * r for r in self.sky_annulus],
+            )
+            flux *= image.get("bscale", 1.0)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                measured = zp - 2.5 * np.log10(flux)
+            if self.star_catalog is None:
+                mag = measured
+            else:
+                mag = np.where(np.isfinite(measured), measured, mag)
+        names = [windows[i].name for i in np.argmax(inside[found], axis=1)]
+        return dict(ra=ra, dec=dec, mag=mag, window=names)
 
-    def _make_ccd(self, image):
+    def check_saturation(self, image, pa_deg):
         """
-        Converts the current instrument settings to a ginga canvas object
+        Warn about, and mark, stars that would saturate in any window.
+
+        Survey magnitudes are taken to be in the filter of the count rate
+        estimator, and counts scaled from its estimate for the target, so
+        they follow the current exposure settings. Rerun on every redraw,
+        but only recomputed if the pointing, windows or counts change.
         """
-        # get window pair object from top widget
+        tag = "saturation_overlay"
         g = get_root(self).globals
-        wframe = g.ipars.wframe
+        try:
+            expTime, deadTime, cycleTime, dutyCycle, frameRate = g.ipars.timing()
+            peak = g.count.counts(expTime, cycleTime)[1]
+            ref_mag = g.count.mag.value()
+        except Exception as err:
+            self.logger.debug("cannot estimate counts: {}".format(str(err)))
+            return False
+        key = (
+            image,
+            self.ctr_ra_deg,
+            self.ctr_dec_deg,
+            pa_deg,
+            self.get_footprint(),
+            peak,
+            ref_mag,
+        )
+        if key == self._saturation_key:
+            return False
+        self._saturation_key = key
+
+        try:
+            stars = self.window_photometry(image, pa_deg)
+        except Exception as err:
+            self.logger.debug("cannot measure stars in windows: {}".format(str(err)))
+            stars = None
+        self.canvas.delete_object_by_tag(tag, redraw=False)
+        if stars is None or len(stars["mag"]) == 0:
+            return True
+        peaks, levels = scale_peak_counts(stars["mag"], ref_mag, peak)
+        flagged = np.flatnonzero(levels > 0)
+        if len(flagged) == 0:
+            return True
+
+        pix = radectopix(image, stars["ra"][flagged], stars["dec"][flagged])
+        ny, nx = image.get_data().shape[:2]
+        size = wcs.calc_radius_xy(image, nx / 2, ny / 2, 5 / 3600)
+        shapes = []
+        msg = "{} stars in windows near saturation".format(len(flagged))
+        for (x, y), i in zip(pix, flagged):
+            state = "saturated" if levels[i] > 1 else "near saturation"
+            shape = Circle(
+                x, y, size, color="red" if levels[i] > 1 else "orange", linewidth=2
+            )
+            shape.name = "{:.1f} mag, {:.0f} cts peak, {}".format(
+                stars["mag"][i], peaks[i], state
+            )
+            shapes.append(shape)
+            msg += "\n{} {} {:.1f} mag in {}: {:.0f} cts peak, {}".format(
+                wcs.ra_deg_to_str(stars["ra"][i]),
+                wcs.dec_deg_to_str(stars["dec"][i]),
+                stars["mag"][i],
+                stars["window"][i],
+                peaks[i],
+                state,
+            )
+        self.canvas.add(CompoundObject(*shapes), tag=tag, redraw=False)
+        self.logger.warn(msg)
+        self.fitsimage.onscreen_message(msg, delay=5.0)
+        return True
 
-        # all values in pixel coords of the FITS frame
-        # get centre
-        ctr_x, ctr_y = image.radectopix(self.ctr_ra_deg, self.ctr_dec_deg)
-        self.ctr_x, self.ctr_y = ctr_x, ctr_y
+    def place_coverage(self, image, pa_deg):
+        """
+        Draw the nod coverage map, if enabled and anything has changed
+        """
+        tag = "coverage_overlay"
+        if not self.show_coverage:
+            self._coverage_key = None
+            if tag not in self.canvas.tags:
+                return False
+            self.canvas.delete_object_by_tag(tag, redraw=False)
+            return True
 
-        nx, ny = self.nxtot.value, self.nytot.value
-        mainCCD = self._make_win(
-            0,
-            0,
-            nx,
-            ny,
+        g = get_root(self).globals
+        offsets = self.nod_offsets(g)
+        key = (
             image,
-            fill=True,
-            fillcolor="blue",
-            fillalpha=0.3,
-            name="mainCCD",
+            self.ctr_ra_deg,
+            self.ctr_dec_deg,
+            pa_deg,
+            self.get_footprint(),
+            offsets.tobytes(),
         )
+        if key == self._coverage_key and tag in self.canvas.tags:
+            return False
+        self._coverage_key = key
 
-        # dashed lines to mark quadrants of CCD
-        chip_ctr_ra, chip_ctr_dec = self._chip_cen()
-        xright, ytop = wcs.add_offset_radec(
-            chip_ctr_ra, chip_ctr_dec, self.fov_x / 2, self.fov_y / 2
+        counts = self.nod_coverage(image, pa_deg, offsets)
+        self.logger.info(
+            "{} nod positions, up to {} covering one pixel".format(
+                len(offsets), counts.max()
+            )
         )
-        xleft, ybot = wcs.add_offset_radec(
-            chip_ctr_ra, chip_ctr_dec, -self.fov_x / 2, -self.fov_y / 2
+        self.canvas.delete_object_by_tag(tag, redraw=False)
+        self.canvas.add(Image(0, 0, _coverage_image(counts)), tag=tag, redraw=False)
+        return True
+
+    def _ccd_windows(self, g):
+        """
+        Current windows in ccd pixel values
+        """
+        if g.ipars.isFF():
+            return []
+        return ccd_windows(g.ipars.wframe, g.ipars.isDrift())
+
+    def _make_footprint(self, windows):
+        """
+        Converts the chip layout and windows to a footprint
+        """
+        footprint = self._new_footprint()
+        add_ccd_parts(footprint, self.nxtot.value, self.nytot.value, windows)
+        return footprint
+
+    def get_footprints(self):
+        footprints = super(HCAMFovSetter, self).get_footprints()
+        g = get_root(self).globals
+        if g.ipars.compo():
+            footprints["compo_overlay"] = self.get_compo_footprint(g)
+            self.check_vignetting(footprints["ccd_overlay"], g)
+        if g.cpars["telins_name"] == "GTC":
+            footprints["guider_overlay"] = self._cached_footprint(
+                "guider_overlay", "GTC", self._make_guider
+            )
+        return footprints
+
+    def _make_guider(self):
+        """
+        Footprint of the GTC guider hole
+        """
+        footprint = self._new_footprint()
+        footprint.add(
+            "guider_hole",
+            "polygon",
+            guider_outline(self.flipEW),
+            color="green",
+            linestyle="dash",
         )
-        points = [
-            image.radectopix(ra, dec)
-            for (ra, dec) in ((chip_ctr_ra, ybot), (chip_ctr_ra, ytop))
-        ]
-        points = list(itertools.chain.from_iterable(points))
-        hline = Line(*points, color="red", linestyle="dash", linewidth=2)
+        return footprint
 
-        points = [
-            image.radectopix(ra, dec)
-            for (ra, dec) in ((xleft, chip_ctr_dec), (xright, chip_ctr_dec))
+    def guide_star_pas(self, ra, dec, step=1.0):
+        """
+        Find the PAs at which at least one of a set of stars can guide.
+
+        Every PA is checked in one go, for the current pointing.
+
+        Parameters
+        ----------
+        ra, dec : array-like
+            positions of candidate guide stars (deg)
+        step : float
+            spacing of the PAs checked (deg)
+
+        Returns
+        -------
+        ranges : list of tuple
+            (start, end) of each range of rotator PA (deg)
+        """
+        ranges, nstars = guide_pa_ranges(
+            self.ctr_ra_deg, self.ctr_dec_deg, ra, dec, step, self.flipEW
+        )
+        # convert from sky PA to rotator PA, as in `pa_deg`
+        sign = 1 if self.EofN else -1
+        ranges = [
+            tuple(sorted((self.paOff + sign * start, self.paOff + sign * end)))
+            for start, end in ranges
         ]
-        points = list(itertools.chain.from_iterable(points))
-        vline = Line(*points, color="red", linestyle="dash", linewidth=2)
-
-        # list of objects for compound object
-        obl = [mainCCD, hline, vline]
-
-        # iterate over window pairs
-        # these coords in ccd pixel vaues
-        params = dict(fill=True, fillcolor="red", fillalpha=0.3)
-        if not g.ipars.isFF():
-            if g.ipars.isDrift():
-                for xsl, xsr, ys, nx, ny in wframe:
-                    obl.append(self._make_win(xsl, ys, nx, ny, image, **params))
-                    obl.append(self._make_win(xsr, ys, nx, ny, image, **params))
-            else:
-                for xsll, xsul, xslr, xsur, ys, nx, ny in wframe:
-                    obl.append(self._make_win(xsll, ys, nx, ny, image, **params))
-                    obl.append(
-                        self._make_win(xsul, 1024 - ys, nx, -ny, image, **params)
-                    )
-                    obl.append(self._make_win(xslr, ys, nx, ny, image, **params))
-                    obl.append(
-                        self._make_win(xsur, 1024 - ys, nx, -ny, image, **params)
-                    )
-
-        obj = CompoundObject(*obl)
-        obj.editable = True
-        return obj
-
-    def _make_compo(self, image):
-        # get COMPO widget from main GUI
-        g = get_root(self).globals
+        return [(start % 360, start % 360 + end - start) for start, end in ranges]
 
-        compo_angle = g.compo_hw.setup_frame.pickoff_angle.value()
-        compo_side = g.compo_hw.setup_frame.injection_side.value()
+    def guide_star_cb(self):
+        """
+        Check the catalog for guide stars, and find the PAs that have one.
 
-        # get chip coordinates - COMPO is aligned to chip
-        chip_ctr_ra, chip_ctr_dec = self._chip_cen()
+        The allowed rotator PAs are reported. If the current PA has no
+        guide star, the PA is moved to the middle of the widest range that
+        does.
+        """
+        g = get_root(self).globals
+        if g.cpars["telins_name"] != "GTC":
+            msg = "guide star check is only available for GTC"
+            self.logger.info(msg)
+            self.fitsimage.onscreen_message(msg, delay=5.0)
+            return
+        self.redraw.flush()
+        try:
+            catalog = self.get_catalog()
+            reach = np.max(np.hypot(*guider_outline(self.flipEW).T))
+            stars = catalog.cone(
+                self.ctr_ra_deg, self.ctr_dec_deg, reach, epoch=self.observing_epoch
+            )
+            ranges = self.guide_star_pas(stars["ra"], stars["dec"])
+        except Exception as err:
+            errmsg = "failed to check guide stars: {}".format(str(err))
+            self.logger.error(msg=errmsg)
+            return
 
+        if not ranges:
+            msg = "no guide stars available at any PA"
+            self.logger.info(msg)
+            self.fitsimage.onscreen_message(msg, delay=5.0)
+            return
+        msg = "guide stars available at PA " + ", ".join(
+            "{:.0f} to {:.0f}".format(start, end % 360) for start, end in ranges
+        )
+        pa = self.pa.value() % 360
+        allowed = [
+            start <= pa <= end or start <= pa + 360 <= end for start, end in ranges
+        ]
+        if not any(allowed):
+            start, end = max(ranges, key=lambda r: r[1] - r[0])
+            pa = (start + end) / 2 % 360
+            self.pa.set(round(pa, 2))
+            self.redraw.request()
+            msg += "\nno guide star at the current PA; PA set to {:.1f}".format(pa)
+        self.logger.info(msg)
+        self.fitsimage.onscreen_message(msg, delay=10.0)
+
+    def _compo_angles(self, g):
+        """
+        Pickoff and injection arm angles (deg) from the COMPO setup
+        """
+        setup = g.compo_hw.setup_frame
+        compo_side = setup.injection_side.value()
         if compo_side == "R":
             ia = INJECTOR_THETA
         elif compo_side == "L":
             ia = -INJECTOR_THETA
         else:
             ia = PARK_POSITION
+        return setup.pickoff_angle.value(), ia.to_value(u.deg)
 
-        # add COMPO components
-        compo_arc = CompoPatrolArc(
-            chip_ctr_ra,
-            chip_ctr_dec,
-            image,
-            linewidth=10,
-            color="black",
-            linestyle="dash",
-            name="COMPO_Arc",
-        )
+    def compo_vignetting(self, footprint, g):
+        """
+        Fraction of each window vignetted by the COMPO arms
+
+        Parameters
+        ----------
+        footprint : `~hcam_finder.footprint.Footprint`
+            CCD footprint, from `get_footprint`
+        g : globals
+
+        Returns
+        -------
+        fractions : OrderedDict
+            vignetted fraction, keyed by window name
+        clear : list of tuple
+            (start, end) of pickoff angle ranges that leave all windows clear
+            of the pickoff arm
+        """
+        windows = [part for part in footprint.parts if part.name.startswith("window")]
+        if not windows:
+            # full frame; check the whole chip
+            windows = footprint.parts[:1]
+        nx, ny = self.nxtot.value, self.nytot.value
+        chip_ctr = footprint.ccd_to_offsets((nx / 2, ny / 2))
+        xy = np.array([part.xy for part in windows]) - chip_ctr
+
+        pickoff_angle, injector_angle = self._compo_angles(g)
+        fractions = vignetting(xy, pickoff_angle, injector_angle)
+        clear = clear_ranges(xy)
+        return OrderedDict(zip([part.name for part in windows], fractions)), clear
+
+    def check_vignetting(self, footprint, g):
+        """
+        Warn if COMPO vignettes any window, and suggest clear pickoff angles
+
+        Only recomputed when the windows or arm positions change.
+        """
+        key = (footprint, self._compo_angles(g))
+        if key == self._vignetting_key:
+            return
+        self._vignetting_key = key
+        try:
+            fractions, clear = self.compo_vignetting(footprint, g)
+        except Exception as err:
+            self.logger.error(msg="failed to check vignetting: {}".format(str(err)))
+            return
 
-        compo_pickoff = PickoffArm().to_ginga_object(
-            compo_angle * u.deg,
-            chip_ctr_ra * u.deg,
-            chip_ctr_dec * u.deg,
-            fill=True,
-            fillcolor="yellow",
-            fillalpha=0.3,
-            name="COMPO_pickoff",
+        vignetted = [
+            "{} {:.0%}".format(name, frac)
+            for name, frac in fractions.items()
+            if frac > 0
+        ]
+        if not vignetted:
+            return
+        if clear:
+            ranges = ", ".join("{:.1f} to {:.1f}".format(*r) for r in clear)
+        else:
+            ranges = "none"
+        msg = "COMPO vignettes {}; pickoff clear of all windows at: {}".format(
+            ", ".join(vignetted), ranges
         )
+        self.logger.warn(msg)
+        self.fitsimage.onscreen_message(msg, delay=5.0)
 
-        compo_injector = InjectionArm().to_ginga_object(
-            ia,
-            chip_ctr_ra * u.deg,
-            chip_ctr_dec * u.deg,
-            color="yellow",
-            fillalpha=0.3,
-            fill=True,
-            name="COMPO_injector",
+    def find_pickoff_stars(self, max_stars=5):
+        """
+        Find catalog stars that the COMPO pickoff can reach.
+
+        The pickoff mirror moves on a fixed arc in the chip frame, so the
+        arm angle that brings it closest to each star near the pointing
+        follows directly from the star's position in that frame; see
+        `pickoff_angle_for`. Stars whose angle leaves every window clear
+        of the pickoff arm are preferred, then the brightest.
+
+        Parameters
+        ----------
+        max_stars : int
+            the most candidates to return
+
+        Returns
+        -------
+        stars : list of `~ginga.misc.Bunch.Bunch`
+            ra, dec, mag, pickoff_angle (deg) and the largest fraction of
+            any window vignetted by the pickoff arm at that angle, for each
+            candidate
+        """
+        catalog = self.get_catalog()
+        footprint = self.get_footprint()
+        windows, polygons = self._window_polygons()
+        nx, ny = self.nxtot.value, self.nytot.value
+        chip_ctr = footprint.ccd_to_offsets((nx / 2, ny / 2))
+
+        ra0, dec0 = self.ctr_ra_deg, self.ctr_dec_deg
+        reach = np.hypot(*chip_ctr) + np.max(np.hypot(*patrol_arc().T))
+        stars = catalog.cone(
+            ra0, dec0, reach + MIRROR_RADIUS, epoch=self.observing_epoch
         )
 
-        obl = [compo_arc, compo_pickoff, compo_injector]
-        obj = CompoundObject(*obl)
-        obj.editable = True
-        return obj
+        # every star in the chip frame at once
+        x, y = radec_offsets(ra0, dec0, stars["ra"], stars["dec"])
+        x, y = unrotate_offsets(x, y, self.pa_deg)
+        theta, miss = pickoff_angle_for(np.column_stack((x, y)) - chip_ctr)
+        _, is_target, _ = self._match_target(stars)
+        found = np.flatnonzero((miss <= MIRROR_RADIUS) & ~is_target)
+
+        # vignetting by the pickoff arm alone, as that is what moves
+        fractions = vignetting(polygons - chip_ctr, theta[found]).max(axis=-1)
+        order = np.lexsort((stars["mag"][found], fractions > 0))[:max_stars]
+        return [
+            Bunch.Bunch(
+                ra=stars["ra"][found[i]],
+                dec=stars["dec"][found[i]],
+                mag=stars["mag"][found[i]],
+                pickoff_angle=theta[found[i]],
+                vignetted=fractions[i],
+            )
+            for i in order
+        ]
 
-    def draw_ccd(self, *args):
-        image = self.fitsimage.get_image()
-        if image is None:
-            return
+    def pickoff_star_cb(self):
+        """
+        Point the COMPO pickoff at the best reachable star.
 
-        try:
-            pa = self.pa.value() - self.paOff
-            if not self.EofN:
-                pa *= -1
-        except Exception as err:
-            errmsg = "failed to find rotation: {}".format(str(err))
-            self.logger.error(errmsg)
+        Pressing again without changing the setup moves on to the next
+        candidate.
+        """
+        g = get_root(self).globals
+        if not g.ipars.compo():
+            msg = "COMPO is not in use, so there is no pickoff to place"
+            self.logger.warn(msg)
+            self.fitsimage.onscreen_message(msg, delay=5.0)
+            return
+        self.redraw.flush()
+        key = (
+            self.ctr_ra_deg,
+            self.ctr_dec_deg,
+            self.pa_deg,
+            self.get_footprint(),
+            self._compo_angles(g)[1],
+        )
+        if key == self._pickoff_key and self.pickoff_options:
+            n = (self.pickoff_choice + 1) % len(self.pickoff_options)
+            self.apply_pickoff_star(n)
+            return
 
         try:
-            obj = self._make_ccd(image)
-            obj.showcap = True
-
-            self.canvas.delete_object_by_tag("ccd_overlay")
-            self.canvas.add(obj, tag="ccd_overlay", redraw=False)
-            # rotate
-            obj.rotate_deg([pa], (self.ctr_x, self.ctr_y))
-            obj.color = "red"
-
-            # save old values so we don't have to recompute FOV if we're just moving
-            self.pa_as_drawn = pa
-            self.ra_as_drawn, self.dec_as_drawn = self.ctr_ra_deg, self.ctr_dec_deg
+            self.pickoff_options = self.find_pickoff_stars()
         except Exception as err:
-            errmsg = "failed to draw CCD: {}".format(str(err))
+            errmsg = "failed to find COMPO pickoff stars: {}".format(str(err))
             self.logger.error(msg=errmsg)
+            return
+        self._pickoff_key = key
+        if not self.pickoff_options:
+            msg = "no catalog stars within reach of the COMPO pickoff"
+            self.logger.info(msg)
+            self.fitsimage.onscreen_message(msg, delay=5.0)
+            return
 
-        try:
-            g = get_root(self).globals
-            if g.ipars.compo():
-                obj = self._make_compo(image)
-                obj.showcap = True
-                self.canvas.delete_object_by_tag("compo_overlay")
-                self.canvas.add(obj, tag="compo_overlay", redraw=False)
-                # rotate
-                obj.rotate_deg([pa], (self.ctr_x, self.ctr_y))
-            else:
-                self.canvas.delete_object_by_tag("compo_overlay")
-        except Exception as err:
-            errmsg = "failed to draw COMPO: {}".format(str(err))
-            self.logger.error(msg=errmsg)
+        msg = "COMPO pickoff stars (press COMPO Star again for the next)"
+        for n, star in enumerate(self.pickoff_options):
+            msg += "\n{}: {} {} {:.1f} mag at pickoff angle {:.1f}".format(
+                n + 1,
+                wcs.ra_deg_to_str(star.ra),
+                wcs.dec_deg_to_str(star.dec),
+                star.mag,
+                star.pickoff_angle,
+            )
+            if star.vignetted > 0:
+                msg += ", vignetting {:.0%}".format(star.vignetted)
+        self.logger.info(msg)
+        self.fitsimage.onscreen_message(msg, delay=10.0)
+        self.apply_pickoff_star(0)
+
+    def apply_pickoff_star(self, n):
+        """
+        Set the pickoff angle for one of the stars found by `pickoff_star_cb`
+        """
+        g = get_root(self).globals
+        star = self.pickoff_options[n]
+        g.compo_hw.setup_frame.pickoff_angle.set(round(star.pickoff_angle, 2))
+        self.pickoff_choice = n
+        self.redraw.request()
+
+    def get_compo_footprint(self, g):
+        """
+        Return the COMPO footprint, rebuilding it only if the arms have moved
+        """
+        key = self._compo_angles(g)
+        return self._cached_footprint(
+            "compo_overlay", key, lambda: self._make_compo(*key)
+        )
+
+    def _make_compo(self, compo_angle, injector_angle):
+        """
+        Converts the COMPO arm positions to a footprint
+
+        Parameters
+        ----------
+        compo_angle : float
+            pickoff arm angle in degrees
+        injector_angle : float
+            injection arm angle in degrees
+        """
+        # get chip centre - COMPO is aligned to chip
+        footprint = self._new_footprint()
+        nx, ny = self.nxtot.value, self.nytot.value
+        chip_ctr = footprint.ccd_to_offsets((nx / 2, ny / 2))
+
+        # add COMPO components
+        footprint.add(
+            "COMPO_Arc",
+            "path",
+            chip_ctr + patrol_arc(),
+            linewidth=10,
+            color="black",
+            linestyle="dash",
+        )
 
-        self.canvas.update_canvas()
+        params = dict(fill=True, fillcolor="yellow", fillalpha=0.3)
+        baffle, mirror = pickoff_geometry(compo_angle)
+        footprint.add("COMPO_pickoff_baffle", "polygon", chip_ctr + baffle, **params)
+        footprint.add(
+            "COMPO_pickoff",
+            "circle",
+            chip_ctr + circle_points(mirror, MIRROR_RADIUS),
+            **params
+        )
+
+        params = dict(fill=True, color="yellow", fillalpha=0.3)
+        baffle, mirror = injector_geometry(injector_angle)
+        footprint.add("COMPO_injector_baffle", "polygon", chip_ctr + baffle, **params)
+        footprint.add(
+            "COMPO_injector",
+            "circle",
+            chip_ctr + circle_points(mirror, MIRROR_RADIUS),
+            **params
+        )
+        return footprint
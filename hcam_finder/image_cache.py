@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from astropy.io import fits
+from astropy.time import Time
+from astropy.visualization import ZScaleInterval
+from ginga import AstroImage
+from ginga.misc import Bunch
+from ginga.util.io import io_fits
+
+from .detection import image_sources
+from .pyramid import build_pyramid
+from .wcsgrid import GridWCS
+
+
+def load_fits(filepath, logger):
+    """
+    Load the first image HDU of a FITS file, memory-mapping the pixel data
+
+    The data are left as the raw on-disk array. Any BSCALE/BZERO scaling
+    is *not* applied, since that would force the whole array to be read
+    and converted to floating point. The scaling is stored in the image
+    metadata instead, see `scaled_value`. Display is unaffected because
+    the scaling is linear and cut levels are computed on the same values.
+
+    Parameters
+    ----------
+    filepath : str
+        FITS file to load
+    logger : `logging.Logger`
+        logger passed to the ginga image
+
+    Returns
+    -------
+    image : `~ginga.AstroImage.AstroImage`
+        image wrapping a memory-mapped data array
+    """
+    hdul = fits.open(filepath, memmap=True, do_not_scale_image_data=True)
+    for hdu in hdul:
+        if hdu.is_image and hdu.header.get("NAXIS", 0) >= 2:
+            break
+    else:
+        hdul.close()
+        raise ValueError("no image data in {}".format(filepath))
+
+    bscale = hdu.header.get("BSCALE", 1.0)
+    bzero = hdu.header.get("BZERO", 0.0)
+
+    image = AstroImage.AstroImage(logger=logger)
+    opener = io_fits.AstropyFitsFileHandler(logger)
+    opener.load_hdu(hdu, dstobj=image, fobj=hdul)
+    image.set(path=filepath, bscale=bscale, bzero=bzero, hdulist=hdul)
+    return image
+
+
+def scaled_value(image, value):
+    """
+    Apply the deferred BSCALE/BZERO scaling to a raw data value
+    """
+    if value is None:
+        return None
+    bscale = image.get("bscale", 1.0)
+    bzero = image.get("bzero", 0.0)
+    if bscale == 1.0 and bzero == 0.0:
+        return value
+    return bscale * value + bzero
+
+
+def image_epoch(image):
+    """
+    Epoch of an image (yr), from the date of observation in its header
+
+    Returns None if the header gives no date.
+    """
+    header = image.get_header()
+    for key, fmt in (("MJD-OBS", "mjd"), ("DATE-OBS", None)):
+        try:
+            return float(Time(header[key], format=fmt).decimalyear)
+        except Exception:
+            continue
+    return None
+
+
+def sample_pixels(data, nsample=100000):
+    """
+    Return a sample of roughly `nsample` finite pixels from an image.
+
+    Whole rows are sampled at a regular stride, so on a memory-mapped
+    array only the pages holding those rows are read from disk.
+    """
+    ny, nx = data.shape[-2:]
+    nrows = max(1, min(ny, int(np.sqrt(nsample * ny / nx))))
+    ncols = max(1, min(nx, nsample // nrows))
+    rows = np.linspace(0, ny - 1, nrows).astype(int)
+    cols = np.linspace(0, nx - 1, ncols).astype(int)
+    sample = np.asarray(data[..., rows, :][..., cols], dtype=float).ravel()
+    return sample[np.isfinite(sample)]
+
+
+def calc_cut_levels(data, nsample=20000, contrast=0.25):
+    """
+    Robust zscale cut levels from a sample of the image pixels
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        image data, possibly memory-mapped
+    nsample : int
+        approximate number of pixels to sample
+    contrast : float
+        zscale contrast parameter, as used by ginga's autocuts
+
+    Returns
+    -------
+    lo, hi : float
+        lower and upper cut levels
+    """
+    sample = sample_pixels(data, nsample)
+    if sample.size == 0:
+        return 0.0, 1.0
+    interval = ZScaleInterval(n_samples=sample.size, contrast=contrast)
+    lo, hi = interval.get_limits(sample)
+    return float(lo), float(hi)
+
+
+class ImageCache(object):
+    """
+    Cache of loaded survey images, keyed by file path.
+
+    Images are memory-mapped, so holding several in the cache costs
+    address space rather than process memory, and switching back to a
+    survey already on disk just hits the OS page cache.
+
+    Display cut levels, a pyramid of downsampled copies for zoomed-out
+    display, a gridded approximation to the WCS for the cursor readout,
+    the sources detected on the image and its epoch are computed once,
+    when the image is first loaded, and stored with the entry. Loading
+    should therefore be done from a worker thread where possible, so the
+    GUI thread only ever picks up finished entries.
+    """
+
+    def __init__(self, logger, maxsize=8):
+        self.logger = logger
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _key(self, filepath):
+        return os.path.abspath(filepath)
+
+    def get_entry(self, filepath):
+        """
+        Return the cache entry for a file, loading it if needed.
+
+        Entries are invalidated if the file on disk has been modified
+        since it was loaded.
+        """
+        key = self._key(filepath)
+        mtime = os.path.getmtime(filepath)
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None and entry.mtime == mtime:
+                self._entries.move_to_end(key)
+                return entry
+
+        self.logger.debug(msg="loading {} into image cache".format(filepath))
+        image = load_fits(filepath, self.logger)
+        entry = Bunch.Bunch(
+            path=key,
+            mtime=mtime,
+            image=image,
+            cuts=calc_cut_levels(image.get_data()),
+            pyramid=build_pyramid(image.get_data()),
+        )
+        entry.wcsgrid = None
+        entry.sources = None
+        if image.has_valid_wcs():
+            try:
+                entry.wcsgrid = GridWCS(image)
+            except Exception as err:
+                self.logger.debug("cannot grid WCS: {}".format(str(err)))
+            try:
+                entry.sources = image_sources(image, bscale=image.get("bscale", 1.0))
+            except Exception as err:
+                self.logger.debug("cannot detect sources: {}".format(str(err)))
+        # the viewer finds these through the image metadata
+        image.set(
+            pyramid=entry.pyramid,
+            wcsgrid=entry.wcsgrid,
+            sources=entry.sources,
+            epoch=image_epoch(image),
+        )
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.maxsize:
+                _, old = self._entries.popitem(last=False)
+                self._release(old)
+        return entry
+
+    def load(self, filepath):
+        """
+        Return the (possibly cached) image for a file
+        """
+        return self.get_entry(filepath).image
+
+    def _release(self, entry):
+        hdul = entry.image.get("hdulist", None)
+        if hdul is not None:
+            try:
+                hdul.close()
+            except Exception:
+                pass
+
+    def clear(self):
+        with self._lock:
+            for entry in self._entries.values():
+                self._release(entry)
+            self._entries.clear()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
+import threading
+
+import numpy as np
+from ginga.misc import Bunch
+
+from .footprint import unrotate_offsets
+from .geometry import add_offsets_radec
+
+# star-in-window tests below which a grid is scored in this process. One
+# process scores about 2e7 tests/s; handing blocks to a running pool costs
+# a few ms, so smaller grids gain nothing from it
+MIN_PARALLEL_TESTS = 2e6
+
+# pools of worker processes by size, started on first use and kept, as
+# starting fresh interpreters takes seconds
+_pools = dict()
+_pools_lock = threading.Lock()
+
+
+def score_configurations(stars, target, windows, nods, pas, offsets):
+    """
+    Count the comparison stars kept in the windows, for each PA and offset
+
+    Windows are rectangles aligned with the detector, so a star stays in
+    a window at every nod position if it is inside the window shrunk by
+    the spread of the nod offsets. Offsets are added in the tangent plane
+    at the current pointing, which is accurate enough for offsets and
+    fields of a few arcminutes.
+
+    Parameters
+    ----------
+    stars : `~numpy.ndarray`
+        offsets (deg) of candidate comparison stars from the current
+        pointing, shape (S, 2)
+    target : `~numpy.ndarray` or None
+        offset (deg) of the target from the current pointing
+    windows : `~numpy.ndarray`
+        windows in the detector frame as (xmin, ymin, xmax, ymax) in deg,
+        shape (W, 4)
+    nods : `~numpy.ndarray`
+        nod offsets (deg), shape (N, 2)
+    pas : `~numpy.ndarray`
+        rotations to try, positive from North through East (deg), shape (P,)
+    offsets : `~numpy.ndarray`
+        pointing offsets to try (deg), shape (O, 2)
+
+    Returns
+    -------
+    ncomps : `~numpy.ndarray`
+        number of stars that stay inside a window at every nod position,
+        or -1 if the target does not, shape (P, O)
+    """
+    xy = stars if target is None else np.vstack((stars, target))
+    ncomps = np.empty((len(pas), len(offsets)), dtype=int)
+    for n, pa in enumerate(pas):
+        # everything in the detector frame
+        sx, sy = unrotate_offsets(xy[:, 0], xy[:, 1], pa)
+        ox, oy = unrotate_offsets(offsets[:, 0], offsets[:, 1], pa)
+        nx, ny = unrotate_offsets(nods[:, 0], nods[:, 1], pa)
+        x0 = windows[:, 0] + nx.max()
+        y0 = windows[:, 1] + ny.max()
+        x1 = windows[:, 2] + nx.min()
+        y1 = windows[:, 3] + ny.min()
+
+        # star positions for each offset, tested against each window:
+        # shape (O, stars + target, W)
+        u = sx[np.newaxis, :, np.newaxis] - ox[:, np.newaxis, np.newaxis]
+        v = sy[np.newaxis, :, np.newaxis] - oy[:, np.newaxis, np.newaxis]
+        kept = ((u >= x0) & (u <= x1) & (v >= y0) & (v <= y1)).any(axis=-1)
+        if target is None:
+            ncomps[n] = kept.sum(axis=-1)
+        else:
+            ncomps[n] = np.where(kept[:, -1], kept[:, :-1].sum(axis=-1), -1)
+    return ncomps
+
+
+def _score_block(args):
+    return score_configurations(*args)
+
+
+def _get_pool(processes):
+    """
+    A pool of ``processes`` workers, shared by every search.
+
+    The workers are started afresh rather than forked, as searches may
+    run in a thread of the GUI, and forking a process that is running
+    threads can deadlock the child.
+    """
+    with _pools_lock:
+        if processes not in _pools:
+            context = multiprocessing.get_context("spawn")
+            _pools[processes] = ProcessPoolExecutor(processes, mp_context=context)
+        return _pools[processes]
+
+
+def optimize_pointing(
+    stars,
+    target,
+    windows,
+    nods,
+    pa_step=2.0,
+    offset_max=30 / 3600,
+    offset_step=5 / 3600,
+    ntop=5,
+    processes=None,
+):
+    """
+    Grid search PA and pointing offset for the most comparison stars.
+
+    Large grids of PAs are split into blocks that are scored in parallel
+    in a pool of processes, which is started by the first such search and
+    then kept for later ones.
+
+    Parameters
+    ----------
+    stars, target, windows, nods : `~numpy.ndarray`
+        as for `score_configurations`
+    pa_step : float
+        spacing of the PAs tried (deg)
+    offset_max : float
+        largest pointing offset tried in RA or Dec (deg)
+    offset_step : float
+        spacing of the pointing offsets tried (deg)
+    ntop : int
+        number of configurations to return
+    processes : int, optional
+        number of processes to use; by default one per CPU. With one
+        process, or a grid of fewer than `MIN_PARALLEL_TESTS` tests, no
+        pool is started.
+
+    Returns
+    -------
+    best : list of `~ginga.misc.Bunch.Bunch`
+        pa, dx, dy (offsets in deg to the East and North) and ncomps of
+        the best configurations, best first. Among configurations with
+        equal numbers of stars, the smallest offsets are preferred.
+    """
+    pas = np.arange(0, 360, pa_step)
+    steps = np.arange(-offset_max, offset_max + 0.5 * offset_step, offset_step)
+    dx, dy = np.meshgrid(steps, steps)
+    offsets = np.column_stack((dx.ravel(), dy.ravel()))
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    ntests = len(pas) * len(offsets) * (len(stars) + 1) * len(windows)
+    if processes == 1 or ntests < MIN_PARALLEL_TESTS:
+        ncomps = score_configurations(stars, target, windows, nods, pas, offsets)
+    else:
+        blocks = [
+            (stars, target, windows, nods, block, offsets)
+            for block in np.array_split(pas, 4 * processes)
+            if len(block)
+        ]
+        pool = _get_pool(processes)
+        ncomps = np.vstack(list(pool.map(_score_block, blocks)))
+
+    # most stars first, then smallest offset
+    ipa, ioff = np.meshgrid(np.arange(len(pas)), np.arange(len(offsets)), indexing="ij")
+    size = np.hypot(offsets[:, 0], offsets[:, 1])[ioff]
+    order = np.lexsort((size.ravel(), -ncomps.ravel()))
+    best = []
+    for i in order[:ntop]:
+        if ncomps.flat[i] < 0:
+            break
+        best.append(
+            Bunch.Bunch(
+                pa=pas[ipa.flat[i]],
+                dx=offsets[ioff.flat[i], 0],
+                dy=offsets[ioff.flat[i], 1],
+                ncomps=int(ncomps.flat[i]),
+            )
+        )
+    return best
+
+
+def search_pointings(setup, processes=None):
+    """
+    Find the pointings and rotator PAs that keep the most comparison stars.
+
+    Touches nothing but its arguments, so it is safe to run in a worker
+    thread of the GUI.
+
+    Parameters
+    ----------
+    setup : `~ginga.misc.Bunch.Bunch`
+        ra, dec (deg) of the current pointing; stars, target, windows,
+        nods, pa_step, offset_max and offset_step as for
+        `optimize_pointing`; pa_offset, the rotator PA (deg) at which the
+        detector y axis points North, and EofN, True if East is
+        anticlockwise of North on the detector
+    processes : int, optional
+        as for `optimize_pointing`
+
+    Returns
+    -------
+    best : list of `~ginga.misc.Bunch.Bunch`
+        as for `optimize_pointing`, plus ra, dec and rotator_pa (deg)
+    """
+    best = optimize_pointing(
+        setup.stars,
+        setup.target,
+        setup.windows,
+        setup.nods,
+        pa_step=setup.pa_step,
+        offset_max=setup.offset_max,
+        offset_step=setup.offset_step,
+        processes=processes,
+    )
+    # back to pointing and rotator PA, undoing `FovSetter.pa_deg`
+    sign = 1 if setup.EofN else -1
+    for config in best:
+        config.ra, config.dec = add_offsets_radec(
+            setup.ra, setup.dec, config.dx, config.dy
+        )
+        config.rotator_pa = (setup.pa_offset + sign * config.pa) % 360
+    return best
@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import io
+
+from PIL import Image
+
+# PDF colour spaces of JPEG images, by PIL mode
+COLOUR_SPACES = {"L": "/DeviceGray", "RGB": "/DeviceRGB", "CMYK": "/DeviceCMYK"}
+# objects written last, but numbered first so pages can refer to them
+CATALOG, PAGES, INFO = 1, 2, 3
+
+
+def _pdf_string(text):
+    """
+    PDF literal string for ASCII text
+    """
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return "(" + text + ")"
+
+
+class PDFWriter(object):
+    """
+    Write a PDF of full page JPEG images, one page at a time
+
+    Each page is written to the file as it is added and never read back,
+    so pages cost the same however many came before, and only the offsets
+    of the objects are kept. The cross-reference table and the page list
+    follow the last page, when the writer is closed.
+
+    Parameters
+    ----------
+    fp : file
+        binary file to write to
+    page_width : float
+        width of the pages (inches); their heights follow the images
+    title : str, optional
+        title of the document
+    """
+
+    def __init__(self, fp, page_width, title=None):
+        self.fp = fp
+        self.page_width = 72 * page_width
+        self.title = title
+        self.offsets = dict()
+        self.pages = []
+        self._pos = 0
+        self._next = INFO + 1
+        # the binary comment marks the file as binary to transfer programs
+        self._write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.fp.write(data)
+        self._pos += len(data)
+
+    def _object(self, num, body, stream=None):
+        self.offsets[num] = self._pos
+        self._write("{} 0 obj\n{}\n".format(num, body).encode("latin-1"))
+        if stream is not None:
+            self._write(b"stream\n" + stream + b"\nendstream\n")
+        self._write(b"endobj\n")
+
+    def _reserve(self, n):
+        first = self._next
+        self._next += n
+        return range(first, first + n)
+
+    def add_jpeg(self, data, size, mode="RGB"):
+        """
+        Add a page showing a JPEG image
+
+        Parameters
+        ----------
+        data : bytes
+            the JPEG file, which is copied into the PDF as it is
+        size : tuple
+            width and height of the image (pix)
+        mode : str
+            PIL mode of the image: L, RGB or CMYK
+        """
+        image, contents, page = self._reserve(3)
+        width, height = size
+        self._object(
+            image,
+            "<< /Type /XObject /Subtype /Image /Width {} /Height {} "
+            "/ColorSpace {} /BitsPerComponent 8 /Filter /DCTDecode "
+            "/Length {} >>".format(width, height, COLOUR_SPACES[mode], len(data)),
+            data,
+        )
+        pw, ph = self.page_width, self.page_width * height / width
+        draw = "q {:.2f} 0 0 {:.2f} 0 0 cm /Im Do Q".format(pw, ph).encode("ascii")
+        self._object(contents, "<< /Length {} >>".format(len(draw)), draw)
+        self._object(
+            page,
+            "<< /Type /Page /Parent {} 0 R /MediaBox [0 0 {:.2f} {:.2f}] "
+            "/Resources << /XObject << /Im {} 0 R >> >> "
+            "/Contents {} 0 R >>".format(PAGES, pw, ph, image, contents),
+        )
+        self.pages.append(page)
+
+    def add_jpeg_file(self, fname):
+        """
+        Add a page showing a JPEG file
+        """
+        with Image.open(fname) as image:
+            if image.format != "JPEG":
+                raise ValueError("{} is not a JPEG file".format(fname))
+            size, mode = image.size, image.mode
+        with open(fname, "rb") as fp:
+            self.add_jpeg(fp.read(), size, mode)
+
+    def add_image(self, image, quality=90):
+        """
+        Add a page showing a `~PIL.Image.Image`, compressed as a JPEG
+        """
+        if image.mode not in COLOUR_SPACES:
+            image = image.convert("RGB")
+        buf = io.BytesIO()
+        image.save(buf, "JPEG", quality=quality)
+        self.add_jpeg(buf.getvalue(), image.size, image.mode)
+
+    def close(self):
+        """
+        Finish the document with its page list and cross-reference table
+
+        The file itself is left open.
+        """
+        kids = " ".join("{} 0 R".format(page) for page in self.pages)
+        self._object(
+            PAGES,
+            "<< /Type /Pages /Kids [{}] /Count {} >>".format(kids, len(self.pages)),
+        )
+        self._object(CATALOG, "<< /Type /Catalog /Pages {} 0 R >>".format(PAGES))
+        info = ""
+        if self.title:
+            info = "/Title " + _pdf_string(self.title) + " "
+        self._object(INFO, "<< {}/Producer (hcam_finder) >>".format(info))
+
+        xref = self._pos
+        lines = ["xref", "0 {}".format(self._next), "0000000000 65535 f "]
+        lines += [
+            "{:010d} 00000 n ".format(self.offsets[n]) for n in range(1, self._next)
+        ]
+        lines += [
+            "trailer",
+            "<< /Size {} /Root {} 0 R /Info {} 0 R >>".format(
+                self._next, CATALOG, INFO
+            ),
+            "startxref",
+            str(xref),
+            "%%EOF",
+        ]
+        self._write(("\n".join(lines) + "\n").encode("ascii"))
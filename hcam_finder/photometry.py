@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+
+# peak counts at which HiPERCAM pixels near saturation, and saturate; as
+# used by the count rate estimator in hcam_widgets
+PEAK_WARN = 25000
+PEAK_SATURATED = 60000
+
+
+def aperture_photometry(data, x, y, radius=3.0, annulus=(5.0, 8.0)):
+    """
+    Background subtracted aperture sums for many positions at once
+
+    A stamp is cut out around every position with one fancy-indexing
+    operation, and the aperture and sky annulus masks are applied to all
+    of them together. Pixels are counted in the aperture if their centres
+    fall within it.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        2D image data
+    x, y : array-like
+        positions (pix, zero-based)
+    radius : float
+        aperture radius (pix)
+    annulus : tuple
+        inner and outer radii of the sky annulus (pix)
+
+    Returns
+    -------
+    flux : `~numpy.ndarray`
+        sky subtracted sum in the aperture, in data units; NaN for
+        apertures that run off the image
+    sky : `~numpy.ndarray`
+        median sky level per pixel in the annulus
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    ny, nx = data.shape
+    half = int(np.ceil(annulus[1]))
+    offsets = np.arange(-half, half + 1)
+    oy, ox = [o.ravel() for o in np.meshgrid(offsets, offsets, indexing="ij")]
+
+    # stamps centred on the nearest pixel; off-image pixels are clipped,
+    # and the apertures flagged below
+    ix = np.round(x).astype(int)
+    iy = np.round(y).astype(int)
+    px = ix[:, np.newaxis] + ox
+    py = iy[:, np.newaxis] + oy
+    stamps = np.asarray(
+        data[np.clip(py, 0, ny - 1), np.clip(px, 0, nx - 1)], dtype=float
+    )
+    r = np.hypot(px - x[:, np.newaxis], py - y[:, np.newaxis])
+
+    sky = np.where((r >= annulus[0]) & (r <= annulus[1]), stamps, np.nan)
+    sky = np.nanmedian(sky, axis=-1)
+    in_aperture = r <= radius
+    flux = np.sum(np.where(in_aperture, stamps - sky[:, np.newaxis], 0), axis=-1)
+    on_image = (ix >= half) & (ix < nx - half) & (iy >= half) & (iy < ny - half)
+    flux[~on_image] = np.nan
+    return flux, sky
+
+
+def scale_peak_counts(mag, ref_mag, ref_peak):
+    """
+    Peak counts of stars, scaled from those of a reference star
+
+    Counts are proportional to flux, so the estimate for the target from
+    the count rate estimator can be scaled to every other star.
+
+    Parameters
+    ----------
+    mag : array-like
+        magnitudes of the stars
+    ref_mag, ref_peak : float
+        magnitude and peak counts of the reference star
+
+    Returns
+    -------
+    peak : `~numpy.ndarray`
+        peak counts of each star
+    level : `~numpy.ndarray`
+        0 if safe, 1 if near saturation and 2 if saturated
+    """
+    peak = ref_peak * 10 ** (-0.4 * (np.asarray(mag, dtype=float) - ref_mag))
+    level = (peak > PEAK_WARN).astype(int) + (peak > PEAK_SATURATED)
+    return peak, level
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import math
+
+import numpy as np
+from ginga.BaseImage import BaseImage
+
+
+def _downsample(data, chunk_rows=512):
+    """
+    2x2 block average of a 2D array, in float32.
+
+    Works through the input a block of rows at a time, so a memory-mapped
+    array is never converted to floating point in one go.
+    """
+    ny, nx = data.shape
+    ny2, nx2 = ny // 2, nx // 2
+    out = np.empty((ny2, nx2), dtype=np.float32)
+    step = 2 * (chunk_rows // 2)
+    for y in range(0, 2 * ny2, step):
+        block = np.asarray(data[y : min(y + step, 2 * ny2), : 2 * nx2], np.float32)
+        block = block.reshape(block.shape[0] // 2, 2, nx2, 2)
+        out[y // 2 : y // 2 + block.shape[0]] = block.mean(axis=(1, 3))
+    return out
+
+
+def build_pyramid(data, min_size=128):
+    """
+    Build power-of-two downsampled copies of an image
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        2D image data, possibly memory-mapped
+    min_size : int
+        stop once the shortest side of a level would fall below this
+
+    Returns
+    -------
+    levels : list of `~numpy.ndarray`
+        ``levels[i]`` is the image binned by a factor ``2**(i+1)``
+    """
+    levels = []
+    level = data
+    while min(level.shape[-2:]) // 2 >= min_size:
+        level = _downsample(level)
+        levels.append(level)
+    return levels
+
+
+def pyramid_level(scale, nlevels):
+    """
+    Coarsest pyramid level that still has at least one pixel per screen pixel
+
+    Parameters
+    ----------
+    scale : float
+        viewer scale, in screen pixels per data pixel
+    nlevels : int
+        number of levels available
+
+    Returns
+    -------
+    level : int
+        0 for the full-resolution image, otherwise a binning of ``2**level``
+    """
+    if scale <= 0 or scale > 0.5:
+        return 0
+    return min(int(math.floor(math.log(1.0 / scale, 2))), nlevels)
+
+
+class _PyramidCanvasImage(object):
+    """
+    Stand-in for the viewer's canvas image, showing part of a pyramid level.
+
+    The ginga renderer only needs the image data, its position and its
+    scale, so we wrap the visible part of a binned level and place it
+    scaled up by the binning factor. Everything else is taken from the
+    real canvas image, including its render cache.
+    """
+
+    def __init__(self, cvs_img, data, factor, x0, y0, logger):
+        self._cvs_img = cvs_img
+        self._image = BaseImage(data_np=data, logger=logger)
+        self.x, self.y = x0, y0
+        self.scale_x = cvs_img.scale_x * factor
+        self.scale_y = cvs_img.scale_y * factor
+
+    def __getattr__(self, name):
+        return getattr(self._cvs_img, name)
+
+    def get_image(self):
+        return self._image
+
+
+class PyramidViewMixin(object):
+    """
+    Mixin for a ginga viewer that draws zoomed-out images from a pyramid
+
+    Images carrying a ``pyramid`` metadata item (a list from `build_pyramid`)
+    are drawn from the coarsest level matching the current zoom, so
+    zoomed-out redraws only touch a small array.
+    """
+
+    def prepare_image(self, cvs_img, cache, whence):
+        image = cvs_img.get_image()
+        levels = None if image is None else image.get("pyramid", None)
+        if levels and getattr(cvs_img, "is_data", False):
+            try:
+                cvs_img = self._pyramid_canvas_image(cvs_img, levels)
+            except Exception as err:
+                self.logger.debug("not drawing from pyramid: {}".format(str(err)))
+        super(PyramidViewMixin, self).prepare_image(cvs_img, cache, whence)
+
+    def _pyramid_canvas_image(self, cvs_img, levels):
+        level = pyramid_level(min(self.get_scale_xy()), len(levels))
+        if level == 0:
+            return cvs_img
+        data = levels[level - 1]
+        factor = 2**level
+
+        # visible region in data coords, as used by the renderer
+        pts = np.asarray(self.get_draw_bbox()).T
+        xmin, ymin = np.nanmin(pts[0]) - 1, np.nanmin(pts[1]) - 1
+        xmax, ymax = np.nanmax(pts[0]) + 1, np.nanmax(pts[1]) + 1
+
+        # cut out just the visible part of the level. The renderer clips in
+        # unscaled data coordinates, so start on the first binned pixel
+        # inside the visible region; it then has nothing left to clip.
+        off = 0.5 * (factor - 1)
+        ny, nx = data.shape
+        x1 = max(0, int(np.ceil((xmin - off) / factor)))
+        y1 = max(0, int(np.ceil((ymin - off) / factor)))
+        x2 = min(nx, int(np.floor((xmax - off) / factor)) + 1)
+        y2 = min(ny, int(np.floor((ymax - off) / factor)) + 1)
+        if x2 <= x1 or y2 <= y1:
+            return cvs_img
+
+        return _PyramidCanvasImage(
+            cvs_img,
+            data[y1:y2, x1:x2],
+            factor,
+            cvs_img.x + x1 * factor + off,
+            cvs_img.y + y1 * factor + off,
+            self.logger,
+        )
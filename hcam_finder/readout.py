@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import six
+
+from ginga.util import wcs
+
+from .image_cache import scaled_value
+
+if not six.PY3:
+    import Tkinter as tk
+else:
+    import tkinter as tk
+
+
+class CursorReadout(tk.Label):
+    """
+    Label showing the sky position and pixel value under the cursor.
+
+    Mouse motion events only record the cursor position. The label is
+    refreshed at most once per display frame, using the approximate
+    `~hcam_finder.wcsgrid.GridWCS` stored with the image if there is one.
+    Once the cursor comes to rest the exact WCS transform is used.
+
+    If `describe` is set, it is called with the data coordinates of the
+    cursor and any text it returns, such as the names of the overlays
+    under the cursor, is added to the readout.
+    """
+
+    # refresh interval while moving, and delay before an exact update (ms)
+    frame_ms = 16
+    rest_ms = 150
+
+    def __init__(self, master, logger, **kwargs):
+        tk.Label.__init__(self, master, text="", **kwargs)
+        self.logger = logger
+        self._cursor = None
+        self._frame_job = None
+        self._rest_job = None
+        self.describe = None
+
+    def motion(self, fitsimage, button, data_x, data_y):
+        """
+        Callback for ginga 'none-move' events
+        """
+        self._cursor = (fitsimage, data_x, data_y)
+        if self._frame_job is None:
+            self._frame_job = self.after(self.frame_ms, self._update_moving)
+        if self._rest_job is not None:
+            self.after_cancel(self._rest_job)
+        self._rest_job = self.after(self.rest_ms, self._update_at_rest)
+
+    def _update_moving(self):
+        self._frame_job = None
+        self._update(exact=False)
+
+    def _update_at_rest(self):
+        self._rest_job = None
+        self._update(exact=True)
+
+    def _update(self, exact):
+        if self._cursor is None:
+            return
+        text = self.readout_text(*self._cursor, exact=exact)
+        if text is not None:
+            self.config(text=text)
+
+    def readout_text(self, fitsimage, data_x, data_y, exact=True):
+        # Get the value under the data coordinates
+        try:
+            # We report the value across the pixel, even though the coords
+            # change halfway across the pixel
+            value = fitsimage.get_data(int(data_x + 0.5), int(data_y + 0.5))
+            # data are memory-mapped unscaled, so apply BSCALE/BZERO here
+            value = scaled_value(fitsimage.get_image(), value)
+        except Exception:
+            value = None
+
+        fits_x, fits_y = data_x + 1, data_y + 1
+        # Calculate WCS RA
+        try:
+            # NOTE: image function operates on DATA space coords
+            image = fitsimage.get_image()
+            if image is None:
+                # No image loaded
+                return None
+            grid = image.get("wcsgrid", None)
+            if not exact and grid is not None and grid.valid:
+                ra_deg, dec_deg = grid.pixtoradec(data_x, data_y)
+                ra_txt, dec_txt = wcs.deg2fmt(float(ra_deg), float(dec_deg), "str")
+            else:
+                ra_txt, dec_txt = image.pixtoradec(
+                    fits_x, fits_y, format="str", coords="fits"
+                )
+        except Exception as e:
+            self.logger.warning("Bad coordinate conversion: %s" % (str(e)))
+            ra_txt = "BAD WCS"
+            dec_txt = "BAD WCS"
+
+        text = "RA: %s  DEC: %s  X: %.2f  Y: %.2f  Value: %s" % (
+            ra_txt,
+            dec_txt,
+            fits_x,
+            fits_y,
+            value,
+        )
+        if self.describe is not None:
+            try:
+                over = self.describe(data_x, data_y)
+            except Exception:
+                over = None
+            if over:
+                text += "  Over: %s" % over
+        return text
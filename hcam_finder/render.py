@@ -0,0 +1,586 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+from PIL import Image, ImageDraw
+from ginga import cmap, colors, imap
+from ginga.misc import Bunch
+
+from .finding_chart import get_font
+from .geometry import radectopix
+from .pyramid import pyramid_level
+
+# size of the viewer (pix) that line widths and font sizes are chosen for;
+# charts of other sizes scale them to match
+VIEWER_SIZE = 600
+# colour outside the image, as in the viewer
+BACKGROUND = (51, 51, 51)
+# style attributes copied from ginga canvas objects
+STYLE_ATTRS = (
+    "color",
+    "alpha",
+    "fill",
+    "fillcolor",
+    "fillalpha",
+    "linestyle",
+    "linewidth",
+    "fontsize",
+    "text",
+)
+
+_luts = {}
+
+
+def colour_lut(cmap_name="gray", imap_name="neg"):
+    """
+    RGB colour of each of the 256 display levels, as shown by ginga
+
+    Returns
+    -------
+    lut : `~numpy.ndarray`
+        shape (256, 3), dtype uint8
+    """
+    key = (cmap_name, imap_name)
+    if key not in _luts:
+        clst = np.asarray(cmap.get_cmap(cmap_name).clst)
+        ilst = np.asarray(imap.get_imap(imap_name).ilst)
+        idx = np.round(ilst * (len(clst) - 1)).astype(int)
+        _luts[key] = np.round(255 * clst[idx]).astype(np.uint8)
+    return _luts[key]
+
+
+def stretch(data, lo, hi):
+    """
+    Linear stretch of image data between cut levels to display levels 0-255
+    """
+    levels = np.asarray(data, dtype=np.float32) - lo
+    levels *= 255 / max(hi - lo, 1e-30)
+    np.clip(levels, 0, 255, out=levels)
+    np.nan_to_num(levels, copy=False)
+    return levels.astype(np.uint8)
+
+
+class ChartTransform(object):
+    """
+    Mapping between image data pixels and chart pixels
+
+    Data pixel centres are at integer positions, as in ginga. The chart
+    can show the image at any rotation and either way round, so the
+    mapping is affine; use `from_rect` for a chart with North up.
+
+    Parameters
+    ----------
+    corners : array-like
+        data positions of the top left, top right and bottom left corners
+        of the chart, shape (3, 2)
+    width, height : int
+        size of the chart (pix)
+    """
+
+    def __init__(self, corners, width, height):
+        origin, right, down = np.asarray(corners, dtype=float)
+        self.width, self.height = int(width), int(height)
+        self.origin = origin
+        # data pixels per chart pixel along the chart rows and columns
+        self.matrix = np.column_stack(
+            ((right - origin) / self.width, (down - origin) / self.height)
+        )
+        self.inverse = np.linalg.inv(self.matrix)
+        # chart pixels per data pixel
+        self.scale = 1 / np.sqrt(abs(np.linalg.det(self.matrix)))
+
+    @classmethod
+    def from_rect(cls, rect, size, flip_x=False):
+        """
+        Transform for a chart of a region of the image, North up
+
+        Parameters
+        ----------
+        rect : tuple
+            edges (x1, y1, x2, y2) of the region of the image to show, in
+            data pixels
+        size : int
+            length of the longer side of the chart (pix)
+        flip_x : bool
+            flip the image E-W?
+        """
+        x1, y1, x2, y2 = [float(val) for val in rect]
+        scale = size / max(x2 - x1, y2 - y1)
+        width = max(1, int(round((x2 - x1) * scale)))
+        height = max(1, int(round((y2 - y1) * scale)))
+        left, right = (x2, x1) if flip_x else (x1, x2)
+        return cls([(left, y2), (right, y2), (left, y1)], width, height)
+
+    @classmethod
+    def from_viewer(cls, viewer, size):
+        """
+        Transform for a chart of what a ginga viewer shows
+
+        Follows the pan, zoom, rotation, flips and swap of axes of the
+        viewer, so the chart looks like the view, at any resolution.
+
+        Parameters
+        ----------
+        viewer : `~ginga.ImageView.ImageViewBase`
+            viewer to copy
+        size : int
+            length of the longer side of the chart (pix)
+        """
+        wd, ht = viewer.get_window_size()
+        scale = size / max(wd, ht)
+        # data positions of the window corners, clockwise from top left
+        corners = viewer.get_pan_bbox()
+        return cls(
+            corners[[0, 1, 3], :2],
+            max(1, int(round(wd * scale))),
+            max(1, int(round(ht * scale))),
+        )
+
+    def to_chart(self, xy):
+        """
+        Chart positions of data pixel positions, shape (..., 2)
+        """
+        xy = np.asarray(xy, dtype=float)
+        return np.dot(xy - self.origin, self.inverse.T)
+
+    def to_data(self, uv):
+        """
+        Data pixel positions of chart positions, shape (..., 2)
+        """
+        uv = np.asarray(uv, dtype=float)
+        return self.origin + np.dot(uv, self.matrix.T)
+
+    def data_grid(self):
+        """
+        Data x and y of the centres of the chart pixels
+
+        Returns
+        -------
+        x, y : `~numpy.ndarray`
+            broadcastable to shape (height, width); if the chart rows run
+            along data x, x has one row and y one column
+        """
+        u = (np.arange(self.width) + 0.5)[np.newaxis]
+        v = (np.arange(self.height) + 0.5)[:, np.newaxis]
+        (a, b), (c, d) = self.matrix
+        x = self.origin[0] + a * u
+        if b != 0:
+            x = x + b * v
+        y = self.origin[1] + d * v
+        if c != 0:
+            y = y + c * u
+        return x, y
+
+
+def _nearest_pixels(x, y, origin, step, shape):
+    """
+    Nearest pixels of an array to data positions
+
+    Parameters
+    ----------
+    x, y : `~numpy.ndarray`
+        data positions, from `ChartTransform.data_grid`
+    origin : tuple
+        data position of the centre of array pixel (0, 0)
+    step : tuple
+        data pixels per array pixel in x and y
+    shape : tuple
+        shape of the array
+
+    Returns
+    -------
+    ix, iy : `~numpy.ndarray`
+        array indices, clipped to the array
+    inside : `~numpy.ndarray`
+        which positions are on the array
+    """
+    ix = np.floor((x - origin[0]) / step[0] + 0.5).astype(int)
+    iy = np.floor((y - origin[1]) / step[1] + 0.5).astype(int)
+    ny, nx = shape[:2]
+    inside = (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny)
+    return np.clip(ix, 0, nx - 1), np.clip(iy, 0, ny - 1), inside
+
+
+def _take(arr, iy, ix):
+    """
+    arr[iy, ix], for indices from `_nearest_pixels`
+    """
+    if iy.shape[-1] == 1 and ix.shape[0] == 1:
+        # np.take is much faster than fancy indexing for big lookups
+        return arr.take(iy[:, 0], axis=0).take(ix[0], axis=1)
+    return arr[iy, ix]
+
+
+def render_image(data, cuts, transform, lut, pyramid=None):
+    """
+    Resample and colour an image for a chart
+
+    Every chart pixel takes the value of the nearest data pixel, from
+    the coarsest level of the image pyramid (if given) that still has a
+    pixel per chart pixel, so zoomed-out charts average over the pixels
+    they cover. The stretch is done on the data or on the chart grid,
+    whichever is smaller, and the colours looked up in one step.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        2D image data, possibly memory-mapped
+    cuts : tuple
+        display cut levels
+    transform : `ChartTransform`
+        region shown and chart size
+    lut : `~numpy.ndarray`
+        colours of the display levels, from `colour_lut`
+    pyramid : list of `~numpy.ndarray`, optional
+        downsampled copies of the data, from
+        `~hcam_finder.pyramid.build_pyramid`
+
+    Returns
+    -------
+    rgb : `~numpy.ndarray`
+        the chart, shape (height, width, 3), dtype uint8
+    """
+    factor = 1
+    level = pyramid_level(transform.scale, len(pyramid)) if pyramid else 0
+    if level:
+        data = pyramid[level - 1]
+        factor = 2**level
+    off = 0.5 * (factor - 1)
+
+    x, y = transform.data_grid()
+    ix, iy, inside = _nearest_pixels(x, y, (off, off), (factor, factor), data.shape)
+    shape = (transform.height, transform.width)
+    inside = np.broadcast_to(inside, shape)
+    if not inside.any():
+        rgb = np.empty(shape + (3,), dtype=np.uint8)
+        rgb[...] = BACKGROUND
+        return rgb
+
+    x0, x1 = ix.min(), ix.max() + 1
+    y0, y1 = iy.min(), iy.max() + 1
+    if (x1 - x0) * (y1 - y0) < inside.size:
+        # zoomed in: stretch the data, then resample
+        levels = _take(stretch(data[y0:y1, x0:x1], *cuts), iy - y0, ix - x0)
+    else:
+        levels = stretch(_take(data, iy, ix), *cuts)
+    rgb = np.take(lut, levels, axis=0)
+    rgb[~inside] = BACKGROUND
+    return rgb
+
+
+def footprint_shapes(footprint, pix):
+    """
+    Shapes to draw for the parts of a footprint
+
+    Parameters
+    ----------
+    footprint : `~hcam_finder.footprint.Footprint`
+        footprint to draw
+    pix : list of `~numpy.ndarray`
+        image pixel positions of each part, from
+        `~hcam_finder.footprint.Footprint.place`
+
+    Returns
+    -------
+    shapes : list of `~ginga.misc.Bunch.Bunch`
+        kind, xy (data pixel positions) and params of each shape; as for
+        footprint parts, circles are given by their centre and a point on
+        the circumference
+    """
+    return [
+        Bunch.Bunch(kind=part.kind, xy=pts, params=part.params)
+        for part, pts in zip(footprint.parts, pix)
+    ]
+
+
+def circle_shape(x, y, radius, **params):
+    """
+    Shape for a circle, from its centre and radius in data pixels
+    """
+    xy = np.array([(x, y), (x + radius, y)], dtype=float)
+    return Bunch.Bunch(kind="circle", xy=xy, params=params)
+
+
+def canvas_shapes(objects):
+    """
+    Shapes to draw for ginga canvas objects
+
+    Compound objects are expanded, and objects that are not placed in
+    data coordinates, or are not simple shapes or images, are skipped.
+
+    Parameters
+    ----------
+    objects : list
+        ginga canvas objects
+
+    Returns
+    -------
+    shapes : list of `~ginga.misc.Bunch.Bunch`
+        as for `footprint_shapes`; images, such as the nod coverage map,
+        are placed by their pixel (0, 0), and have the RGBA array and
+        data pixels per image pixel among their params
+    """
+    shapes = []
+    for obj in objects:
+        kind = getattr(obj, "kind", None)
+        if hasattr(obj, "objects"):
+            shapes.extend(canvas_shapes(obj.objects))
+            continue
+        if getattr(obj, "coord", None) not in (None, "data"):
+            continue
+        if kind in ("polygon", "path"):
+            xy = obj.points
+        elif kind == "line":
+            xy = [(obj.x1, obj.y1), (obj.x2, obj.y2)]
+        elif kind == "circle":
+            xy = [(obj.x, obj.y), (obj.x + obj.radius, obj.y)]
+        elif kind == "text":
+            xy = [(obj.x, obj.y)]
+        elif kind == "image":
+            xy = [(obj.x, obj.y)]
+        else:
+            continue
+        params = dict(
+            (name, getattr(obj, name)) for name in STYLE_ATTRS if hasattr(obj, name)
+        )
+        if kind == "image":
+            params.update(
+                rgba=obj.get_image().get_array("RGBA"),
+                step=(obj.scale_x, obj.scale_y),
+                flipy=obj.flipy,
+            )
+        shapes.append(Bunch.Bunch(kind=kind, xy=np.asarray(xy, float), params=params))
+    return shapes
+
+
+def compass_shapes(image, transform, xfrac=0.85, yfrac=0.85, size=0.085):
+    """
+    Shapes for a compass showing North and East, like the viewer's
+
+    Parameters
+    ----------
+    image : `~ginga.AstroImage.AstroImage`
+        image with a WCS
+    transform : `ChartTransform`
+        region shown and chart size
+    xfrac, yfrac : float
+        position of the compass, as fractions of the chart width and
+        height from the top left
+    size : float
+        length of the arrows, as a fraction of the chart size
+
+    Returns
+    -------
+    shapes : list of `~ginga.misc.Bunch.Bunch`
+        as for `footprint_shapes`
+    """
+    length = size * max(transform.width, transform.height) / transform.scale
+    ctr = transform.to_data((xfrac * transform.width, yfrac * transform.height))
+    ra, dec = image.pixtoradec(*ctr)
+    step = 1 / 3600
+    ends = radectopix(
+        image,
+        np.array([ra, ra + step / np.cos(np.radians(dec))]),
+        np.array([dec + step, dec]),
+    )
+    params = dict(color="red", linewidth=1)
+    shapes = []
+    for end, label in zip(ends, "NE"):
+        direction = (end - ctr) / np.hypot(*(end - ctr))
+        tip = ctr + length * direction
+        normal = np.array([-direction[1], direction[0]])
+        head = 0.15 * length
+        barb1, barb2 = [
+            tip - head * direction + sgn * 0.5 * head * normal for sgn in (1, -1)
+        ]
+        shapes.append(Bunch.Bunch(kind="line", xy=np.array([ctr, tip]), params=params))
+        shapes.append(
+            Bunch.Bunch(kind="path", xy=np.array([barb1, tip, barb2]), params=params)
+        )
+        shapes.append(
+            Bunch.Bunch(
+                kind="text",
+                xy=(tip + 0.2 * length * direction)[np.newaxis],
+                params=dict(color="red", fontsize=14, text=label, anchor="mm"),
+            )
+        )
+    return shapes
+
+
+def _rgba(name, alpha=1.0):
+    r, g, b = colors.lookup_color(name)
+    return (int(255 * r), int(255 * g), int(255 * b), int(round(255 * alpha)))
+
+
+def _dashes(pts, dash):
+    """
+    Segments of a dashed line through some points
+
+    The pattern runs on along the line, dash on and dash off, as it is
+    drawn by the viewer.
+    """
+    segments = []
+    start = 0.0
+    for p0, p1 in zip(pts[:-1], pts[1:]):
+        length = np.hypot(*(p1 - p0))
+        if length == 0:
+            continue
+        t0 = np.arange(-start, length, 2 * dash)
+        t1 = np.minimum(t0 + dash, length)
+        t0 = np.maximum(t0, 0)
+        keep = t1 > t0
+        direction = (p1 - p0) / length
+        for a, b in zip(t0[keep], t1[keep]):
+            segments.append((tuple(p0 + a * direction), tuple(p0 + b * direction)))
+        start = (start + length) % (2 * dash)
+    return segments
+
+
+def _draw_image(chart, shape, transform):
+    """
+    Blend an image overlay into a chart, by nearest pixel as in the viewer
+    """
+    rgba = shape.params["rgba"]
+    if shape.params.get("flipy", False):
+        rgba = rgba[::-1]
+    # as in ginga, the image's edge is half a data pixel before its position
+    step = np.asarray(shape.params["step"], dtype=float)
+    origin = shape.xy[0] - 0.5 + 0.5 * step
+    x, y = transform.data_grid()
+    ix, iy, inside = _nearest_pixels(x, y, origin, step, rgba.shape)
+    inside = np.broadcast_to(inside, (transform.height, transform.width))
+    if not inside.any():
+        return
+    overlay = _take(rgba, iy, ix).astype(np.float32)
+    weight = overlay[..., 3:] * (inside[..., np.newaxis] / 255.0)
+    weight *= shape.params.get("alpha", 1.0)
+    rgb = np.asarray(chart, dtype=np.float32)
+    rgb += weight * (overlay[..., :3] - rgb)
+    chart.paste(Image.fromarray(np.round(rgb).astype(np.uint8)))
+
+
+def draw_shapes(chart, shapes, transform, linescale=1.0):
+    """
+    Draw vector shapes and image overlays on a chart
+
+    Parameters
+    ----------
+    chart : `~PIL.Image.Image`
+        RGB chart to draw on
+    shapes : list of `~ginga.misc.Bunch.Bunch`
+        shapes to draw, from `footprint_shapes`, `canvas_shapes` or
+        `compass_shapes`
+    transform : `ChartTransform`
+        region shown and chart size
+    linescale : float
+        scaling of line widths, dash lengths and font sizes
+    """
+    draw = ImageDraw.Draw(chart, "RGBA")
+    for shape in shapes:
+        params = shape.params
+        kind = shape.kind
+        alpha = params.get("alpha", 1.0)
+        color = _rgba(params.get("color", None) or "red", alpha)
+        width = max(1, int(round((params.get("linewidth", None) or 1) * linescale)))
+        if kind == "image":
+            _draw_image(chart, shape, transform)
+            continue
+        pts = transform.to_chart(shape.xy)
+
+        fill = None
+        if params.get("fill", False) and kind in ("polygon", "circle"):
+            # as in ginga, fills are the line colour unless given
+            fillcolor = params.get("fillcolor", None) or params.get("color", None)
+            fill = _rgba(fillcolor or "red", alpha * params.get("fillalpha", 1.0))
+
+        if kind == "text":
+            font = get_font((params.get("fontsize", None) or 12) * linescale)
+            draw.text(
+                tuple(pts[0]),
+                params.get("text", ""),
+                fill=color,
+                font=font,
+                anchor=params.get("anchor", "ls"),
+            )
+            continue
+        if kind == "circle":
+            (u, v), radius = pts[0], np.hypot(*(pts[1] - pts[0]))
+            box = [u - radius, v - radius, u + radius, v + radius]
+            draw.ellipse(box, fill=fill, outline=color, width=width)
+            continue
+
+        if kind == "polygon":
+            if fill is not None:
+                draw.polygon([tuple(pt) for pt in pts], fill=fill)
+            pts = np.vstack((pts, pts[:1]))
+        if params.get("linestyle", "solid") == "dash":
+            for segment in _dashes(pts, 5 * linescale):
+                draw.line(segment, fill=color, width=width)
+        else:
+            draw.line([tuple(pt) for pt in pts], fill=color, width=width, joint="curve")
+
+
+def render_chart(
+    image,
+    cuts,
+    shapes=(),
+    size=2000,
+    rect=None,
+    flip_x=False,
+    cmap_name="gray",
+    imap_name="neg",
+    compass=True,
+    transform=None,
+):
+    """
+    Render a finding chart straight from the image data
+
+    The chart can be any size, regardless of the size of the viewer. Line
+    widths and font sizes are scaled with the chart, so it looks the same
+    as the viewer at any resolution.
+
+    Parameters
+    ----------
+    image : `~ginga.AstroImage.AstroImage`
+        image to show
+    cuts : tuple
+        display cut levels
+    shapes : list of `~ginga.misc.Bunch.Bunch`
+        overlays to draw, from `footprint_shapes` or `canvas_shapes`
+    size : int
+        length of the longer side of the chart (pix)
+    rect : tuple, optional
+        edges (x1, y1, x2, y2) of the region to show, in data pixels; the
+        whole image by default
+    flip_x : bool
+        flip the image E-W?
+    cmap_name, imap_name : str
+        ginga colour and intensity maps
+    compass : bool
+        draw a compass?
+    transform : `ChartTransform`, optional
+        region shown and chart size, for a chart that is not North up,
+        such as from `ChartTransform.from_viewer`; overrides rect and
+        flip_x
+
+    Returns
+    -------
+    chart : `~PIL.Image.Image`
+        the RGB chart
+    """
+    if transform is None:
+        if rect is None:
+            rect = (-0.5, -0.5, image.width - 0.5, image.height - 0.5)
+        transform = ChartTransform.from_rect(rect, size, flip_x)
+    rgb = render_image(
+        image.get_data(),
+        cuts,
+        transform,
+        colour_lut(cmap_name, imap_name),
+        image.get("pyramid", None),
+    )
+    chart = Image.fromarray(rgb)
+    shapes = list(shapes)
+    if compass:
+        shapes.extend(compass_shapes(image, transform))
+    draw_shapes(chart, shapes, transform, size / VIEWER_SIZE)
+    return chart
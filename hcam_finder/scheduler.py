@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import math
+import time
+
+
+class RedrawScheduler(object):
+    """
+    Merges bursts of redraw requests into at most one redraw per frame.
+
+    Requests only record that a redraw is needed, together with the
+    arguments of the latest request. The redraw itself runs from the Tk
+    idle loop, no sooner than one frame after the previous redraw, so a
+    burst of widget, drag or rotation events costs a single redraw with
+    the most recent state.
+
+    Parameters
+    ----------
+    widget : tk.Widget
+        any widget, used for access to the Tk event loop
+    callback : callable
+        function that does the redraw
+    frame_ms : int
+        minimum interval between redraws (ms)
+    """
+
+    def __init__(self, widget, callback, frame_ms=16):
+        self.widget = widget
+        self.callback = callback
+        self.frame_ms = frame_ms
+        self._args = ()
+        self._job = None
+        self._last = None
+
+    @property
+    def pending(self):
+        return self._job is not None
+
+    def request(self, *args):
+        """
+        Ask for a redraw. Arguments replace those of any pending request.
+        """
+        self._args = args
+        if self._job is not None:
+            return
+        delay = 0
+        if self._last is not None:
+            elapsed = 1000 * (time.time() - self._last)
+            # round up, so redraws are never closer than a frame
+            delay = int(math.ceil(max(0, self.frame_ms - elapsed)))
+        if delay:
+            self._job = self.widget.after(delay, self._idle)
+        else:
+            self._job = self.widget.after_idle(self._run)
+
+    def _idle(self):
+        self._job = self.widget.after_idle(self._run)
+
+    def _run(self):
+        self._job = None
+        self._last = time.time()
+        args, self._args = self._args, ()
+        self.callback(*args)
+
+    def cancel(self):
+        """
+        Drop any pending redraw
+        """
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._job = None
+        self._args = ()
+
+    def flush(self):
+        """
+        Run any pending redraw now
+        """
+        if self._job is not None:
+            self.widget.after_cancel(self._job)
+            self._run()
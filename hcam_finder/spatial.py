@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import numpy as np
+
+
+def _str_order(boxes, node_size):
+    """
+    Sort-Tile-Recursive ordering of boxes, so consecutive runs of
+    `node_size` boxes are spatially compact
+    """
+    n = len(boxes)
+    cx = 0.5 * (boxes[:, 0] + boxes[:, 2])
+    cy = 0.5 * (boxes[:, 1] + boxes[:, 3])
+    nslab = max(1, int(np.ceil(np.sqrt(np.ceil(n / node_size)))))
+    slab_size = nslab * node_size
+    order = np.argsort(cx, kind="stable")
+    for start in range(0, n, slab_size):
+        slab = order[start : start + slab_size]
+        order[start : start + slab_size] = slab[np.argsort(cy[slab], kind="stable")]
+    return order
+
+
+class BoxTree(object):
+    """
+    Static R-tree of bounding boxes, for fast hit-testing.
+
+    The tree is bulk loaded with Sort-Tile-Recursive packing, so finding
+    the boxes that contain a point only tests the boxes in a few nodes at
+    each level, rather than every box. It cannot be updated; build a new
+    one when the boxes change.
+
+    Parameters
+    ----------
+    boxes : array-like
+        bounding boxes as (xmin, ymin, xmax, ymax), shape (N, 4)
+    items : list
+        object to return for each box
+    node_size : int
+        maximum number of children of each node
+    """
+
+    def __init__(self, boxes, items, node_size=8):
+        boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.node_size = node_size
+        self.items = list(items)
+        self._order = _str_order(boxes, node_size)
+
+        # bounds[0] holds the boxes themselves and bounds[k] the nodes of
+        # level k. ranges[k - 1] gives the entries of level k - 1 that
+        # belong to each node of level k.
+        bounds = boxes[self._order]
+        self.bounds = [bounds]
+        self.ranges = []
+        while len(bounds) > node_size:
+            lo = np.arange(0, len(bounds), node_size)
+            hi = np.minimum(lo + node_size, len(bounds))
+            nodes = np.column_stack(
+                (
+                    np.minimum.reduceat(bounds[:, 0], lo),
+                    np.minimum.reduceat(bounds[:, 1], lo),
+                    np.maximum.reduceat(bounds[:, 2], lo),
+                    np.maximum.reduceat(bounds[:, 3], lo),
+                )
+            )
+            order = _str_order(nodes, node_size)
+            bounds = nodes[order]
+            self.bounds.append(bounds)
+            self.ranges.append((lo[order], hi[order]))
+
+    def __len__(self):
+        return len(self.items)
+
+    def query(self, x, y, tol=0.0):
+        """
+        Items whose boxes contain a point
+
+        Parameters
+        ----------
+        x, y : float
+            position to test
+        tol : float
+            boxes are grown by this amount on all sides
+
+        Returns
+        -------
+        items : list
+            matching items, in the order they were given
+        """
+
+        def hits(bounds, idx):
+            b = bounds[idx]
+            inside = (
+                (b[:, 0] - tol <= x)
+                & (x <= b[:, 2] + tol)
+                & (b[:, 1] - tol <= y)
+                & (y <= b[:, 3] + tol)
+            )
+            return idx[inside]
+
+        top = self.bounds[-1]
+        idx = hits(top, np.arange(len(top)))
+        for level in range(len(self.ranges), 0, -1):
+            if len(idx) == 0:
+                break
+            # all children of the nodes hit so far
+            lo, hi = self.ranges[level - 1]
+            counts = hi[idx] - lo[idx]
+            offsets = np.cumsum(counts) - counts
+            children = np.repeat(lo[idx] - offsets, counts) + np.arange(counts.sum())
+            idx = hits(self.bounds[level - 1], children)
+        return [self.items[i] for i in np.sort(self._order[idx])]
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .geometry import add_offsets_radec
+
+# a catalog is a directory holding one .npy file per column, an index and
+# this description of them
+META_FILE = "catalog.json"
+INDEX_FILE = "index.npy"
+# epoch of catalog positions if not given, that of Gaia DR3
+DEFAULT_EPOCH = 2016.0
+# largest proper motion of any star (arcsec/yr), that of Barnard's star
+MAX_PROPER_MOTION = 10.4
+
+
+def _spread_bits(v):
+    """
+    Spread the bits of integers out, so bit n moves to bit 2n
+    """
+    v = np.asarray(v, dtype=np.int64)
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    v = (v | (v << 1)) & 0x5555555555555555
+    return v
+
+
+def healpix_index(ra_deg, dec_deg, order):
+    """
+    HEALPix cell of sky positions, in the NESTED scheme
+
+    Parameters
+    ----------
+    ra_deg, dec_deg : float or array-like
+        sky positions (deg)
+    order : int
+        HEALPix order; there are 12 * 4**order cells
+
+    Returns
+    -------
+    cell : `~numpy.ndarray`
+        cell numbers
+    """
+    nside = 1 << order
+    z = np.sin(np.radians(dec_deg))
+    za = np.abs(z)
+    tt = np.mod(np.radians(ra_deg), 2 * np.pi) * 2 / np.pi
+
+    # equatorial region
+    temp1 = nside * (0.5 + tt)
+    temp2 = nside * z * 0.75
+    jp = (temp1 - temp2).astype(np.int64)
+    jm = (temp1 + temp2).astype(np.int64)
+    ifp = jp // nside
+    ifm = jm // nside
+    face_eq = np.where(ifp == ifm, ifp | 4, np.where(ifp < ifm, ifp, ifm + 8))
+    ix_eq = jm & (nside - 1)
+    iy_eq = nside - (jp & (nside - 1)) - 1
+
+    # polar caps
+    ntt = np.minimum(tt.astype(np.int64), 3)
+    tp = tt - ntt
+    tmp = nside * np.sqrt(3 * (1 - za))
+    jp = np.minimum((tp * tmp).astype(np.int64), nside - 1)
+    jm = np.minimum(((1 - tp) * tmp).astype(np.int64), nside - 1)
+    north = z >= 0
+    face_pol = np.where(north, ntt, ntt + 8)
+    ix_pol = np.where(north, nside - jm - 1, jp)
+    iy_pol = np.where(north, nside - jp - 1, jm)
+
+    equatorial = za <= 2 / 3
+    face = np.where(equatorial, face_eq, face_pol) % 12
+    ix = np.where(equatorial, ix_eq, ix_pol)
+    iy = np.where(equatorial, iy_eq, iy_pol)
+    return face * nside * nside + _spread_bits(ix) + 2 * _spread_bits(iy)
+
+
+def cell_size(order):
+    """
+    Typical width of a HEALPix cell (deg)
+    """
+    return np.degrees(np.sqrt(4 * np.pi / 12)) / (1 << order)
+
+
+def cone_cells(ra_deg, dec_deg, radius_deg, order, max_samples=300):
+    """
+    HEALPix cells that may hold sources within a cone
+
+    The cone, grown by two cells, is sampled on a grid much finer than the
+    cells, so every cell that overlaps it is found. Some cells just
+    outside the cone are also returned. Large cones are sampled at a
+    coarser order, and the cells found split into their children.
+
+    Parameters
+    ----------
+    ra_deg, dec_deg : float
+        centre of the cone (deg)
+    radius_deg : float
+        radius of the cone (deg)
+    order : int
+        HEALPix order of the cells
+    max_samples : int
+        maximum number of samples across the cone
+
+    Returns
+    -------
+    cells : `~numpy.ndarray`
+        sorted, unique cell numbers
+    """
+    query_order = order
+    while query_order > 0:
+        size = cell_size(query_order)
+        if 2 * (radius_deg + 2 * size) / (0.25 * size) <= max_samples:
+            break
+        query_order -= 1
+    size = cell_size(query_order)
+    extent = min(radius_deg + 2 * size, 90.0)
+
+    offsets = np.arange(-extent, extent + 0.125 * size, 0.25 * size)
+    dx, dy = np.meshgrid(offsets, offsets)
+    keep = np.hypot(dx, dy) <= extent
+    ra, dec = add_offsets_radec(ra_deg, dec_deg, dx[keep], dy[keep])
+    cells = np.unique(healpix_index(ra, dec, query_order))
+
+    shift = 2 * (order - query_order)
+    if shift:
+        children = np.arange(1 << shift)
+        cells = ((cells[:, np.newaxis] << shift) + children).ravel()
+    return cells
+
+
+def angular_separation(ra1, dec1, ra2, dec2):
+    """
+    Angular separation between sky positions (deg), by the haversine formula
+    """
+    ra1, dec1, ra2, dec2 = [np.radians(v) for v in (ra1, dec1, ra2, dec2)]
+    sdec = np.sin(0.5 * (dec2 - dec1))
+    sra = np.sin(0.5 * (ra2 - ra1))
+    a = sdec * sdec + np.cos(dec1) * np.cos(dec2) * sra * sra
+    return np.degrees(2 * np.arcsin(np.sqrt(np.minimum(a, 1))))
+
+
+def propagate_positions(ra, dec, pmra, pmdec, dt):
+    """
+    Move sky positions by their proper motions
+
+    The motion is added as a tangent plane offset, ignoring parallax and
+    radial velocity. Over a few decades this is good to well under 0.1
+    arcsec even for the fastest moving stars.
+
+    Parameters
+    ----------
+    ra, dec : array-like
+        positions (deg)
+    pmra, pmdec : array-like
+        proper motions (mas/yr), with the RA motion including the factor
+        cos(dec), as in Gaia. Missing values (NaN) are taken as zero.
+    dt : float or array-like
+        time to move the positions on by (yr)
+
+    Returns
+    -------
+    ra, dec : `~numpy.ndarray`
+        new positions (deg)
+    """
+    scale = np.asarray(dt) / 3.6e6
+    dx = np.nan_to_num(np.asarray(pmra, dtype=float)) * scale
+    dy = np.nan_to_num(np.asarray(pmdec, dtype=float)) * scale
+    return add_offsets_radec(np.asarray(ra), np.asarray(dec), dx, dy)
+
+
+def write_catalog(
+    path, ra, dec, mag, order=8, name="stars", epoch=DEFAULT_EPOCH, **columns
+):
+    """
+    Write a star catalog in the format read by `StarCatalog`
+
+    Parameters
+    ----------
+    path : str
+        directory to write to; created if needed
+    ra, dec : array-like
+        positions (deg)
+    mag : array-like
+        magnitudes
+    order : int
+        HEALPix order of the index. Higher orders suit denser catalogs.
+    name : str
+        name of the catalog, used to label the stars
+    epoch : float
+        epoch of the positions (yr)
+    columns : dict
+        any other columns to store. Proper motions, if given, should be
+        ``pmra`` and ``pmdec`` in mas/yr, as for `propagate_positions`.
+    """
+    columns.update(ra=ra, dec=dec, mag=mag)
+    columns = dict((key, np.asarray(val)) for key, val in columns.items())
+    cells = healpix_index(columns["ra"], columns["dec"], order)
+    order_rows = np.argsort(cells, kind="stable")
+    index = np.searchsorted(cells[order_rows], np.arange(12 * 4 ** order + 1))
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    np.save(os.path.join(path, INDEX_FILE), index.astype(np.int64))
+    for key, val in columns.items():
+        np.save(os.path.join(path, key + ".npy"), val[order_rows])
+    meta = dict(
+        name=name, order=order, columns=sorted(columns), nrows=len(cells), epoch=epoch
+    )
+    if "pmra" in columns and "pmdec" in columns:
+        pm = np.hypot(columns["pmra"], columns["pmdec"])
+        meta["max_pm"] = float(np.nanmax(pm, initial=0)) / 1000
+    with open(os.path.join(path, META_FILE), "w") as of:
+        json.dump(meta, of, indent=4)
+
+
+class StarCatalog(object):
+    """
+    Local star catalog, memory-mapped from disk.
+
+    Each column is stored as a NumPy array, sorted by NESTED HEALPix
+    cell. An index gives the first row of each cell, so a cone query
+    only reads the rows of the few cells covering the cone, however
+    large the catalog is. Use `write_catalog` to make one.
+
+    If the catalog has proper motions, cone queries can return positions
+    moved to any epoch, in one pass over all the stars found. The most
+    recent queries are cached, since the same field is asked for again
+    and again as overlays are redrawn.
+
+    Parameters
+    ----------
+    path : str
+        directory holding the catalog
+    """
+
+    # number of cone queries to cache
+    cache_size = 16
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as source:
+            meta = json.load(source)
+        self.name = meta["name"]
+        self.order = meta["order"]
+        self.columns = meta["columns"]
+        self.epoch = meta.get("epoch", DEFAULT_EPOCH)
+        self.has_proper_motions = "pmra" in self.columns and "pmdec" in self.columns
+        self.max_pm = meta.get("max_pm", MAX_PROPER_MOTION)
+        self.index = np.load(os.path.join(path, INDEX_FILE), mmap_mode="r")
+        self.data = dict(
+            (key, np.load(os.path.join(path, key + ".npy"), mmap_mode="r"))
+            for key in self.columns
+        )
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return int(self.index[-1])
+
+    def rows_in_cells(self, cells):
+        """
+        Row numbers of all the sources in a set of sorted cells
+        """
+        starts = np.asarray(self.index[cells], dtype=np.int64)
+        ends = np.asarray(self.index[cells + 1], dtype=np.int64)
+        counts = ends - starts
+        offsets = np.cumsum(counts) - counts
+        return np.repeat(starts - offsets, counts) + np.arange(counts.sum())
+
+    def cone(self, ra_deg, dec_deg, radius_deg, mag_limit=None, epoch=None):
+        """
+        Find the sources within a cone
+
+        Parameters
+        ----------
+        ra_deg, dec_deg : float
+            centre of the cone (deg)
+        radius_deg : float
+            radius of the cone (deg)
+        mag_limit : float, optional
+            only return sources brighter than this
+        epoch : float, optional
+            epoch (yr) to move the positions to, if the catalog has proper
+            motions. Sources are selected by their positions at this epoch.
+
+        Returns
+        -------
+        sources : dict
+            array of values of each column for the sources found, sorted
+            from brightest to faintest. The result is shared with later
+            identical queries, so should not be modified.
+        """
+        if epoch is None or not self.has_proper_motions:
+            epoch = self.epoch
+        key = (ra_deg, dec_deg, radius_deg, mag_limit, epoch)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        # search far enough to catch stars moving into the cone
+        dt = epoch - self.epoch
+        search = radius_deg + self.max_pm * abs(dt) / 3600 if dt else radius_deg
+        cells = cone_cells(ra_deg, dec_deg, search, self.order)
+        rows = self.rows_in_cells(cells)
+        ra, dec = self.data["ra"][rows], self.data["dec"][rows]
+        if dt:
+            ra, dec = propagate_positions(
+                ra, dec, self.data["pmra"][rows], self.data["pmdec"][rows], dt
+            )
+        keep = angular_separation(ra_deg, dec_deg, ra, dec) <= radius_deg
+        if mag_limit is not None:
+            keep &= self.data["mag"][rows] <= mag_limit
+        order = np.argsort(self.data["mag"][rows[keep]], kind="stable")
+        rows = rows[keep][order]
+        sources = dict((key, np.asarray(col[rows])) for key, col in self.data.items())
+        sources["ra"] = np.asarray(ra[keep][order])
+        sources["dec"] = np.asarray(dec[keep][order])
+
+        with self._lock:
+            self._cache[key] = sources
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return sources
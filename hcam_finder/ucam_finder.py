@@ -1,9 +1,5 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, absolute_import, unicode_literals, division
-import itertools
-
-from ginga.canvas.types.all import Line, CompoundObject
-from ginga.util import wcs
 
 from hcam_widgets.tkutils import get_root
 
@@ -25,58 +21,34 @@ class UCAMFovSetter(FovSetter):
             retval = '\n'.join(winlist)
         return retval
 
-    def _make_ccd(self, image):
+    def _ccd_windows(self, g):
         """
-        Converts the current instrument settings to a ginga canvas object
+        Current windows in ccd pixel values
         """
-        # get window pair object from top widget
-        g = get_root(self).globals
-        wframe = g.ipars.wframe
-
-        # all values in pixel coords of the FITS frame
-        # get centre
-        ctr_x, ctr_y = image.radectopix(self.ctr_ra_deg, self.ctr_dec_deg)
-        self.ctr_x, self.ctr_y = ctr_x, ctr_y
+        wins = []
+        if not g.ipars.isFF:
+            for xsl, xsr, ys, nx, ny in g.ipars.wframe:
+                wins.append((xsl, ys, nx, ny))
+                wins.append((xsr, ys, nx, ny))
+        return wins
 
+    def _make_footprint(self, windows):
+        """
+        Converts the chip layout and windows to a footprint
+        """
+        footprint = self._new_footprint()
         nx, ny = self.nxtot.value, self.nytot.value
-        mainCCD = self._make_win(0, 0, nx, ny, image,
-                                 fill=True, color='red',
-                                 fillalpha=0.1, name='mainCCD')
+        footprint.add_window('mainCCD', (0, 0, nx, ny),
+                             fill=True, color='red', fillalpha=0.1)
 
         # dashed lines to mark quadrants of CCD
-        chip_ctr_ra, chip_ctr_dec = self._chip_cen()
-        x1, y1 = wcs.add_offset_radec(chip_ctr_ra, chip_ctr_dec,
-                                      0, self.fov_y/2)
-        x2, y2 = wcs.add_offset_radec(chip_ctr_ra, chip_ctr_dec,
-                                      0, -self.fov_y/2)
-        points = [image.radectopix(ra, dec) for (ra, dec) in (
-            (x1, y1), (x2, y2)
-        )]
-        points = list(itertools.chain.from_iterable(points))
-        vline = Line(*points, color='red', linestyle='dash', linewidth=2)
+        footprint.add_line('vline', (nx/2, 0), (nx/2, ny),
+                           color='red', linestyle='dash', linewidth=2)
 
         # emphasis on bottom of CCD
-        x1, y1 = wcs.add_offset_radec(chip_ctr_ra, chip_ctr_dec,
-                                      -self.fov_x/2, -self.fov_y/2)
-        x2, y2 = wcs.add_offset_radec(chip_ctr_ra, chip_ctr_dec,
-                                      self.fov_x/2, -self.fov_y/2)
-        points = [image.radectopix(ra, dec) for (ra, dec) in (
-            (x1, y1), (x2, y2)
-        )]
-        points = list(itertools.chain.from_iterable(points))
-        eline = Line(*points, color='red', linewidth=4)
-
-        # list of objects for compound object
-        obl = [mainCCD, vline, eline]
-
-        # iterate over window pairs
-        # these coords in ccd pixel vaues
-        if not g.ipars.isFF:
-            params = dict(fill=True, fillcolor='blue', fillalpha=0.3)
-            for xsl, xsr, ys, nx, ny in wframe:
-                obl.append(self._make_win(xsl, ys, nx, ny, image, **params))
-                obl.append(self._make_win(xsr, ys, nx, ny, image, **params))
+        footprint.add_line('eline', (0, 0), (nx, 0), color='red', linewidth=4)
 
-        obj = CompoundObject(*obl)
-        obj.editable = True
-        return obj
+        params = dict(fill=True, fillcolor='blue', fillalpha=0.3)
+        for n, win in enumerate(windows):
+            footprint.add_window('window{}'.format(n), win, **params)
+        return footprint
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function, absolute_import, unicode_literals, division
+import math
+
+import numpy as np
+
+
+def _wrap_deg(angle):
+    """
+    wrap an angle difference into the range [-180, 180)
+    """
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+class GridWCS(object):
+    """
+    Fast approximation to the pixel to sky transform of an image.
+
+    The exact WCS is evaluated once on a regular grid of nodes covering
+    the image, and positions are then found by bilinear interpolation
+    between the four surrounding nodes. The grid spacing is halved until
+    the interpolation error, measured at the centre of every cell, is
+    below `tol` arcseconds. If that cannot be achieved the grid is marked
+    invalid and callers should fall back to the exact transform.
+
+    Parameters
+    ----------
+    image : `~ginga.AstroImage.AstroImage`
+        image with a valid WCS
+    spacing : int
+        initial grid spacing in pixels
+    tol : float
+        maximum allowed interpolation error in arcseconds
+    min_spacing : int
+        smallest grid spacing to try
+    """
+
+    def __init__(self, image, spacing=128, tol=0.05, min_spacing=8):
+        self.valid = False
+        self.error = np.inf
+        ny, nx = image.height, image.width
+        while spacing >= min_spacing:
+            self._build(image, nx, ny, spacing)
+            if self.error <= tol:
+                self.valid = True
+                break
+            spacing //= 2
+
+    def _exact(self, image, x, y):
+        pts = np.column_stack((np.ravel(x), np.ravel(y)))
+        sky = np.asarray(image.wcs.datapt_to_wcspt(pts))
+        return sky[:, 0].reshape(np.shape(x)), sky[:, 1].reshape(np.shape(x))
+
+    def _build(self, image, nx, ny, spacing):
+        self.spacing = float(spacing)
+        # nodes run from the outer edge of the first pixel past the last one
+        self.x0 = self.y0 = -0.5
+        nxn = int(math.ceil(nx / spacing)) + 1
+        nyn = int(math.ceil(ny / spacing)) + 1
+        xn = self.x0 + spacing * np.arange(nxn)
+        yn = self.y0 + spacing * np.arange(nyn)
+        ra, dec = self._exact(image, *np.meshgrid(xn, yn))
+
+        # interpolate RA as an offset from a reference so 0/360 is harmless
+        self.ra0 = ra[nyn // 2, nxn // 2]
+        self.dra = _wrap_deg(ra - self.ra0)
+        self.dec = dec
+        self.nxn, self.nyn = nxn, nyn
+        # plain lists are much quicker to index for single positions
+        self._dra_list = self.dra.tolist()
+        self._dec_list = self.dec.tolist()
+
+        # check the error at every cell centre
+        xc, yc = np.meshgrid(xn[:-1] + 0.5 * spacing, yn[:-1] + 0.5 * spacing)
+        ra_true, dec_true = self._exact(image, xc, yc)
+        ra_est, dec_est = self.pixtoradec(xc, yc)
+        cosd = np.cos(np.radians(dec_true))
+        err = np.hypot(_wrap_deg(ra_est - ra_true) * cosd, dec_est - dec_true)
+        self.error = 3600.0 * np.nanmax(err)
+
+    def pixtoradec(self, x, y):
+        """
+        Approximate sky position of a data (0-based) pixel position
+
+        Parameters
+        ----------
+        x, y : float or `~numpy.ndarray`
+            pixel coordinates
+
+        Returns
+        -------
+        ra, dec : float or `~numpy.ndarray`
+            sky position in degrees
+        """
+        if np.isscalar(x) and np.isscalar(y):
+            return self._pixtoradec_scalar(x, y)
+
+        fx = (np.asarray(x, dtype=float) - self.x0) / self.spacing
+        fy = (np.asarray(y, dtype=float) - self.y0) / self.spacing
+        ix = np.clip(np.floor(fx).astype(int), 0, self.nxn - 2)
+        iy = np.clip(np.floor(fy).astype(int), 0, self.nyn - 2)
+        fx -= ix
+        fy -= iy
+
+        def interp(grid):
+            return (
+                grid[iy, ix] * (1 - fx) * (1 - fy)
+                + grid[iy, ix + 1] * fx * (1 - fy)
+                + grid[iy + 1, ix] * (1 - fx) * fy
+                + grid[iy + 1, ix + 1] * fx * fy
+            )
+
+        ra = (self.ra0 + interp(self.dra)) % 360.0
+        return ra, interp(self.dec)
+
+    def _pixtoradec_scalar(self, x, y):
+        # same as the array version, in pure python for the cursor readout
+        fx = (x - self.x0) / self.spacing
+        fy = (y - self.y0) / self.spacing
+        ix = min(max(int(math.floor(fx)), 0), self.nxn - 2)
+        iy = min(max(int(math.floor(fy)), 0), self.nyn - 2)
+        fx -= ix
+        fy -= iy
+        w00, w01 = (1 - fx) * (1 - fy), fx * (1 - fy)
+        w10, w11 = (1 - fx) * fy, fx * fy
+
+        def interp(grid):
+            row0, row1 = grid[iy], grid[iy + 1]
+            return (
+                row0[ix] * w00 + row0[ix + 1] * w01 + row1[ix] * w10 + row1[ix + 1] * w11
+            )
+
+        ra = (self.ra0 + interp(self._dra_list)) % 360.0
+        return ra, interp(self._dec_list)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.batch`.
+"""
+import json
+
+import pytest
+from astropy import units as u
+from astropy.coordinates import Angle, SkyCoord
+from ginga.misc import Bunch
+
+from hcam_finder import hcam_finder
+from hcam_finder.batch import read_setup, read_targets, setup_windows
+
+QUADS = [(100, 120, 600, 620, 10, 200, 100), (300, 300, 800, 800, 400, 50, 50)]
+PAIRS = [(100, 600, 10, 200, 100)]
+NODS = {"ra": [0.0, 5.0, -5.0], "dec": [0.0, 2.5, -2.5]}
+
+
+def appdata(wframe, drift, nods=None):
+    """
+    Windows and nods as saved by `hcam_widgets.hcam.InstPars.dumpJSON`
+    """
+    data = dict(numexp=-1, xbin=1, ybin=1)
+    if nods:
+        data["nodpattern"] = nods
+    for iw, win in enumerate(wframe, 1):
+        if drift:
+            names = ("x{}start_left", "x{}start_right")
+        else:
+            names = (
+                "x{}start_lowerleft",
+                "x{}start_upperleft",
+                "x{}start_lowerright",
+                "x{}start_upperright",
+            )
+        names += ("y{}start", "x{}size", "y{}size")
+        data.update((name.format(iw), val) for name, val in zip(names, win))
+    return data
+
+
+class Value(object):
+    def __init__(self, value):
+        self._value = value
+
+    def value(self):
+        return self._value
+
+
+def saved_setup(path, monkeypatch, wframe, drift, nods=None):
+    """
+    Write a setup file with `HCAMFovSetter.saveconf`
+    """
+    g = Bunch.Bunch(
+        ipars=Bunch.Bunch(
+            dumpJSON=lambda: appdata(wframe, drift, nods), compo=lambda: False
+        )
+    )
+    monkeypatch.setattr(hcam_finder, "get_root", lambda w: Bunch.Bunch(globals=g))
+    monkeypatch.setattr(
+        hcam_finder.filedialog, "asksaveasfilename", lambda **kw: str(path)
+    )
+    fov = hcam_finder.HCAMFovSetter.__new__(hcam_finder.HCAMFovSetter)
+    fov.targName = Value("AR Sco")
+    fov.target_coords = lambda: SkyCoord(245.447, -22.886, unit=u.deg)
+    fov.ra = Value(Angle(245.45, u.deg))
+    fov.dec = Value(Angle(-22.89, u.deg))
+    fov.pa = Value(30.0)
+    fov.current_comparisons = lambda: None
+    assert fov.saveconf()
+    return path
+
+
+@pytest.mark.parametrize("wframe, drift", [(QUADS, False), (PAIRS, True), ([], False)])
+def test_setup_windows(wframe, drift):
+    assert setup_windows(appdata(wframe, drift)) == dict(wframe=wframe, drift=drift)
+
+
+def test_read_setup_saved_by_hfinder(tmp_path, monkeypatch):
+    path = saved_setup(tmp_path / "arsco.json", monkeypatch, QUADS, False, NODS)
+    target = read_setup(str(path))
+    assert target.name == "AR Sco"
+    assert target.ra == pytest.approx(245.45, abs=1e-5)
+    assert target.dec == pytest.approx(-22.89, abs=1e-4)
+    assert target.targ_ra == pytest.approx(245.447, abs=1e-5)
+    assert target.targ_dec == pytest.approx(-22.886, abs=1e-4)
+    assert target.pa == 30.0
+    assert target.wframe == QUADS and not target.drift
+    assert target.nods == list(zip(NODS["ra"], NODS["dec"]))
+
+    # a setup without a target or nods
+    path.write_text(json.dumps(dict(appdata=appdata(PAIRS, True))))
+    target = read_setup(str(path))
+    assert "ra" not in target and target.pa == 0.0
+    assert target.wframe == PAIRS and target.drift and target.nods == []
+
+
+def test_read_targets(tmp_path, monkeypatch):
+    saved_setup(tmp_path / "arsco.json", monkeypatch, PAIRS, True, NODS)
+    path = tmp_path / "targets.txt"
+    path.write_text(
+        "# name ra dec pa setup\n"
+        '"AR Sco"  16:21:47.28  -22:53:10.4  45.0  arsco.json\n'
+        "J1234+5678  188.5  56.9  # no setup\n"
+        "\n"
+        "arsco.json\n"
+    )
+    targets = read_targets(str(path))
+    assert [target.name for target in targets] == ["AR Sco", "J1234+5678", "AR Sco"]
+
+    first, second, third = targets
+    assert first.ra == pytest.approx(15 * (16 + 21 / 60 + 47.28 / 3600))
+    assert first.dec == pytest.approx(-(22 + 53 / 60 + 10.4 / 3600))
+    assert (first.targ_ra, first.targ_dec) == (first.ra, first.dec)
+    assert first.pa == 45.0
+    assert first.wframe == PAIRS and first.drift
+    assert first.nods == list(zip(NODS["ra"], NODS["dec"]))
+
+    assert (second.ra, second.dec, second.pa) == (188.5, 56.9, 0.0)
+    assert second.wframe == [] and not second.drift and second.nods == []
+
+    # everything from the setup file
+    assert third.ra == pytest.approx(245.45, abs=1e-5) and third.pa == 30.0
+    assert third.wframe == PAIRS
+
+
+def test_read_targets_reports_line(tmp_path):
+    path = tmp_path / "targets.txt"
+    path.write_text("J1234  188.5  56.9\nJ5678  nonsense  56.9\n")
+    with pytest.raises(ValueError, match="line 2"):
+        read_targets(str(path))
+    path.write_text("missing.json\n")
+    with pytest.raises(ValueError, match="line 1"):
+        read_targets(str(path))
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.compo`.
+"""
+import numpy as np
+from astropy import units as u
+from hcam_widgets.compo.utils import PickoffArm
+
+from hcam_finder.compo import (
+    MIRROR_RADIUS,
+    PICKOFF_MAX_ANGLE,
+    clear_ranges,
+    focal_plane_to_offsets,
+    pickoff_angle_for,
+    pickoff_geometry,
+    pickoff_position,
+    vignetting,
+)
+from hcam_finder.geometry import rect_corners
+
+
+def square(centre, half):
+    return rect_corners(centre[0] - half, centre[1] - half, 2 * half, 2 * half)[0]
+
+
+def test_pickoff_position_matches_hcam_widgets():
+    angles = np.linspace(-PICKOFF_MAX_ANGLE, PICKOFF_MAX_ANGLE, 7)
+    expected = [
+        PickoffArm().position(angle * u.deg).xyz[:2].to_value(u.mm) for angle in angles
+    ]
+    np.testing.assert_allclose(pickoff_position(angles), expected, atol=1e-9)
+
+
+def test_pickoff_angle_for_mirror_positions():
+    angles = np.linspace(-0.9 * PICKOFF_MAX_ANGLE, 0.9 * PICKOFF_MAX_ANGLE, 11)
+    _, mirror = pickoff_geometry(angles)
+    theta, miss = pickoff_angle_for(mirror)
+    np.testing.assert_allclose(theta, angles, atol=1e-9)
+    np.testing.assert_allclose(miss, 0, atol=1e-12)
+
+
+def test_pickoff_angle_for_is_limited_to_travel():
+    beyond = focal_plane_to_offsets(pickoff_position(PICKOFF_MAX_ANGLE + 10))
+    theta, miss = pickoff_angle_for(beyond)
+    assert theta == PICKOFF_MAX_ANGLE
+    assert miss > MIRROR_RADIUS
+
+
+def test_vignetting_by_pickoff_mirror():
+    angle = 20.0
+    _, mirror = pickoff_geometry(angle)
+    windows = np.array(
+        [square(mirror, 0.3 * MIRROR_RADIUS), square(-mirror, 0.3 * MIRROR_RADIUS)]
+    )
+    fraction = vignetting(windows, angle)
+    np.testing.assert_allclose(fraction, [1, 0])
+    # many angles at once
+    assert vignetting(windows, [angle, -angle]).shape == (2, 2)
+
+
+def test_clear_ranges_are_clear():
+    _, mirror = pickoff_geometry(0.0)
+    windows = np.array([square(mirror, 0.5 * MIRROR_RADIUS)])
+    ranges = clear_ranges(windows, step=1.0)
+    assert len(ranges) == 2
+    assert ranges[0][0] == -PICKOFF_MAX_ANGLE
+    assert ranges[-1][1] == PICKOFF_MAX_ANGLE
+    for start, end in ranges:
+        assert np.all(vignetting(windows, np.linspace(start, end, 10)) == 0)
+    assert np.all(vignetting(windows, [ranges[0][1] + 1, ranges[1][0] - 1]) > 0)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.detection`.
+"""
+import numpy as np
+from ginga.AstroImage import AstroImage
+
+from hcam_finder.detection import SourceList, detect_sources, zero_point
+
+
+def star_field(shape=(512, 600), sigma=1.5, seed=5):
+    """
+    Gaussian stars on a jittered grid, on a sloping, noisy background
+    """
+    rng = np.random.default_rng(seed)
+    ny, nx = shape
+    y, x = np.mgrid[40 : ny - 20 : 80, 40 : nx - 20 : 80].astype(float)
+    x = x.ravel() + rng.uniform(-10, 10, x.size)
+    y = y.ravel() + rng.uniform(-10, 10, y.size)
+    flux = rng.uniform(2000, 20000, x.size)
+    yy, xx = np.mgrid[:ny, :nx]
+    data = 100 + 0.02 * xx + rng.normal(0, 5, shape)
+    for xs, ys, fs in zip(x, y, flux):
+        r2 = (xx - xs) ** 2 + (yy - ys) ** 2
+        data += fs / (2 * np.pi * sigma**2) * np.exp(-0.5 * r2 / sigma**2)
+    return data, x, y, flux
+
+
+def test_detect_sources_finds_injected_stars():
+    data, x, y, flux = star_field()
+    dx, dy, dflux = detect_sources(data)
+    # every injected star is found; noise peaks are rare at 5 sigma
+    sep = np.hypot(x[:, np.newaxis] - dx, y[:, np.newaxis] - dy)
+    nearest = np.argmin(sep, axis=1)
+    assert np.all(sep[np.arange(len(x)), nearest] < 0.3)
+    assert len(np.unique(nearest)) == len(x)
+    assert len(dx) <= len(x) + 1
+    # brightest first; the box holds the same fraction of every star
+    assert np.all(np.diff(dflux) <= 0)
+    ratio = dflux[nearest] / flux
+    assert np.std(ratio) < 0.03 * np.mean(ratio)
+
+
+def test_detect_sources_blank_image():
+    data = np.random.default_rng(6).normal(100, 5, (256, 256))
+    x, y, flux = detect_sources(data)
+    assert len(x) == len(y) == len(flux) == 0
+
+
+def test_detect_sources_max_sources():
+    data = star_field()[0]
+    x, y, flux = detect_sources(data, max_sources=5)
+    assert len(x) == 5
+    np.testing.assert_array_equal(flux, detect_sources(data)[2][:5])
+
+
+def test_zero_point_from_header():
+    image = AstroImage()
+    image.load_data(np.zeros((10, 10)))
+    assert zero_point(image) is None
+    image.update_keywords({"PHOTZP": 27.5})
+    assert zero_point(image) == 27.5
+
+
+def test_source_list_cone():
+    sources = SourceList([10.0, 10.0, 10.5], [0.0, 0.01, 0.0], [15.0, 12.0, 10.0])
+    assert len(sources) == 3
+    found = sources.cone(10.0, 0.0, 0.1)
+    np.testing.assert_array_equal(found["mag"], [12.0, 15.0])
+    found = sources.cone(10.0, 0.0, 0.1, mag_limit=13)
+    np.testing.assert_array_equal(found["dec"], [0.01])
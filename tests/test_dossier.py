@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.dossier` and `hcam_finder.pdf`.
+"""
+import io
+import re
+
+import pytest
+from ginga.misc import Bunch
+from PIL import Image
+
+from hcam_finder import dossier
+from hcam_finder.dossier import page_key, write_dossier
+
+COLOURS = ["red", "green", "blue", "yellow", "cyan", "magenta", "white"]
+
+
+def make_target(n):
+    return Bunch.Bunch(
+        name="target {}".format(n),
+        ra=10.0 * n,
+        dec=-20.0,
+        targ_ra=10.0 * n,
+        targ_dec=-20.0,
+        pa=30.0,
+        wframe=[(100, 100, 600, 600, 1, 200, 200)],
+        drift=False,
+        nods=[(0.0, 0.0), (5.0, -5.0)],
+    )
+
+
+@pytest.fixture
+def options(tmp_path):
+    return Bunch.Bunch(
+        telescope="WHT",
+        tel={"paOff": 0.0, "EofN": True},
+        survey="DSS",
+        size=200,
+        page_dir=str(tmp_path),
+    )
+
+
+@pytest.fixture
+def charts(monkeypatch):
+    """
+    Charts in one colour per target, in place of fetching and drawing them
+    """
+    drawn = []
+
+    def render_target(target, options):
+        n = int(target.name.split()[1])
+        if COLOURS[n] == "white":
+            raise ValueError("no image")
+        drawn.append(n)
+        return Image.new("RGB", (options.size, options.size), COLOURS[n])
+
+    monkeypatch.setattr(dossier, "render_target", render_target)
+    return drawn
+
+
+def read_pages(fname):
+    """
+    The images on the pages of a PDF written by `~hcam_finder.pdf.PDFWriter`,
+    in order, checking the cross-reference table on the way
+    """
+    with open(fname, "rb") as fp:
+        data = fp.read()
+    assert data.startswith(b"%PDF-1.4\n")
+    xref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    table = data[xref:].split(b"trailer")[0].splitlines()
+    assert table[0] == b"xref"
+    count = int(table[1].split()[1])
+    entries = table[2 : 2 + count]
+    assert all(len(entry) == 19 for entry in entries)
+    offsets = [int(entry[:10]) for entry in entries]
+
+    def body(num):
+        start = offsets[num]
+        assert data[start:].startswith(b"%d 0 obj\n" % num)
+        return data[start : data.index(b"endobj", start)]
+
+    root = int(re.search(rb"/Root (\d+) 0 R", data[xref:]).group(1))
+    pages = int(re.search(rb"/Pages (\d+) 0 R", body(root)).group(1))
+    match = re.search(rb"/Kids \[([^\]]*)\] /Count (\d+)", body(pages))
+    kids = [int(kid) for kid in re.findall(rb"(\d+) 0 R", match.group(1))]
+    assert int(match.group(2)) == len(kids)
+
+    images = []
+    for kid in kids:
+        image = int(re.search(rb"/Im (\d+) 0 R", body(kid)).group(1))
+        obj = body(image)
+        length = int(re.search(rb"/Length (\d+)", obj).group(1))
+        start = obj.index(b"stream\n") + 7
+        images.append(Image.open(io.BytesIO(obj[start : start + length])))
+    return images
+
+
+def colour_of(image):
+    return image.convert("RGB").getpixel((image.size[0] // 2, 10))
+
+
+def test_page_key(options):
+    target = make_target(1)
+    key = page_key(target, options)
+    assert key == page_key(make_target(1), options)
+    assert key != page_key(make_target(2), options)
+    target.pa = 31.0
+    assert key != page_key(target, options)
+    options.size = 400
+    assert page_key(make_target(1), options) != key
+
+
+def test_write_dossier_pages_in_order(tmp_path, options, charts):
+    targets = [make_target(n) for n in range(len(COLOURS))]
+    fname = str(tmp_path / "dossier.pdf")
+    results = write_dossier(targets, options, fname, processes=1)
+    assert [result.name for result in results] == [t.name for t in targets]
+    assert [result.error is None for result in results] == [True] * 6 + [False]
+
+    pages = read_pages(fname)
+    assert len(pages) == len(targets)
+    for page, colour in zip(pages[:-1], COLOURS):
+        expected = Image.new("RGB", (1, 1), colour).getpixel((0, 0))
+        assert all(abs(a - b) < 10 for a, b in zip(colour_of(page), expected))
+    # the page for the failed target still has its notes
+    assert pages[-1].size[0] == options.size
+    assert pages[0].size[1] > options.size
+
+
+def test_write_dossier_reuses_pages(tmp_path, options, charts):
+    targets = [make_target(n) for n in range(3)]
+    fname = str(tmp_path / "dossier.pdf")
+    write_dossier(targets, options, fname, processes=1)
+    assert charts == [0, 1, 2]
+
+    targets[1].pa = 45.0
+    results = write_dossier(targets, options, fname, processes=1)
+    assert [result.reused for result in results] == [True, False, True]
+    assert charts == [0, 1, 2, 1]
+    assert len(read_pages(fname)) == 3
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.ephemeris`.
+"""
+import numpy as np
+import pytest
+from astropy.coordinates import get_body_barycentric
+from astropy.time import Time
+from ginga.misc import Bunch
+
+from hcam_finder.ephemeris import (
+    C_AU_PER_DAY,
+    K_GAUSS,
+    OBLIQUITY_J2000,
+    ephemeris,
+    heliocentric_positions,
+    read_elements,
+)
+
+
+def orbit(q, e):
+    return Bunch.Bunch(name="test", q=q, e=e, i=25.0, node=80.0, peri=130.0, tp=6e4)
+
+
+# elliptic, parabolic and hyperbolic
+ORBITS = [orbit(1.2, 0.4), orbit(0.9, 1.0), orbit(1.5, 1.8)]
+
+
+@pytest.mark.parametrize("elements", ORBITS)
+def test_perihelion_distance(elements):
+    mjd = elements.tp + np.array([-5.0, 0.0, 5.0])
+    xyz = heliocentric_positions(elements, mjd)
+    r = np.sqrt(np.sum(xyz * xyz, axis=-1))
+    assert r[1] == pytest.approx(elements.q, rel=1e-10)
+    assert np.all(r[[0, 2]] > elements.q)
+
+
+@pytest.mark.parametrize("elements", ORBITS)
+def test_two_body_motion(elements):
+    # energy and angular momentum, from velocities by finite differences
+    mjd = elements.tp + np.linspace(-200, 200, 9)
+    h = 1e-3
+    pos = heliocentric_positions(elements, mjd)
+    vel = (
+        heliocentric_positions(elements, mjd + h)
+        - heliocentric_positions(elements, mjd - h)
+    ) / (2 * h)
+    r = np.sqrt(np.sum(pos * pos, axis=-1))
+    v2 = np.sum(vel * vel, axis=-1)
+    inv_a = (1 - elements.e) / elements.q
+    np.testing.assert_allclose(v2, K_GAUSS**2 * (2 / r - inv_a), rtol=1e-6)
+
+    ang = np.cross(pos, vel)
+    np.testing.assert_allclose(
+        np.sqrt(np.sum(ang * ang, axis=-1)),
+        K_GAUSS * np.sqrt(elements.q * (1 + elements.e)),
+        rtol=1e-6,
+    )
+    # the orbit pole, back in ecliptic coordinates
+    obl = np.radians(OBLIQUITY_J2000)
+    x, y, z = ang[0] / np.sqrt(np.sum(ang[0] ** 2))
+    pole = [x, np.cos(obl) * y + np.sin(obl) * z, -np.sin(obl) * y + np.cos(obl) * z]
+    inc, node = np.radians(elements.i), np.radians(elements.node)
+    expected = [np.sin(inc) * np.sin(node), -np.sin(inc) * np.cos(node), np.cos(inc)]
+    np.testing.assert_allclose(pole, expected, atol=1e-9)
+
+
+def test_near_parabolic_orbits_agree():
+    mjd = 60000.0 + np.linspace(-50, 50, 5)
+    xyz = [
+        heliocentric_positions(orbit(0.9, e), mjd) for e in (1 - 1e-5, 1.0, 1 + 1e-5)
+    ]
+    np.testing.assert_allclose(xyz[0], xyz[1], atol=1e-5)
+    np.testing.assert_allclose(xyz[2], xyz[1], atol=1e-5)
+
+
+def test_read_elements(tmp_path):
+    path = tmp_path / "orbit.txt"
+    path.write_text(
+        "name = test\nepoch = 60000.0\na = 2.0\ne = 0.5\n"
+        "i = 10.0\nnode = 30.0\nperi = 60.0\nM = 0.0\n"
+    )
+    elements = read_elements(str(path))
+    assert elements.name == "test"
+    assert elements.q == pytest.approx(1.0)
+    assert elements.tp == pytest.approx(60000.0)
+
+    path.write_text("epoch = 60000.0\na = 2.0\ne = 0.5\n")
+    with pytest.raises(ValueError):
+        read_elements(str(path))
+
+
+def test_ephemeris_allows_for_light_time():
+    elements = orbit(1.2, 0.4)
+    times = Time(60000.0 + np.arange(0, 100, 25), format="mjd", scale="tt")
+    ra, dec, delta = ephemeris(elements, times)
+    assert np.all((ra >= 0) & (ra < 360)) and np.all(np.abs(dec) <= 90)
+
+    # the body where it was when the light left it, seen from the Earth now
+    earth = get_body_barycentric("earth", times) - get_body_barycentric("sun", times)
+    earth = np.moveaxis(earth.xyz.to_value("AU"), 0, -1)
+    body = heliocentric_positions(elements, times.tt.mjd - delta / C_AU_PER_DAY)
+    rho = body - earth
+    np.testing.assert_allclose(np.sqrt(np.sum(rho * rho, axis=-1)), delta, rtol=1e-9)
+    ra_rho = np.degrees(np.arctan2(rho[:, 1], rho[:, 0])) % 360
+    dec_rho = np.degrees(np.arcsin(rho[:, 2] / delta))
+    np.testing.assert_allclose(ra, ra_rho, atol=1e-7)
+    np.testing.assert_allclose(dec, dec_rho, atol=1e-7)
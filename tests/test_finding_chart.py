@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.finding_chart`.
+"""
+import pytest
+
+from hcam_finder.finding_chart import fit_font, get_font
+
+LINES = ["AR Sco", "RA 16:21:47.28 Dec -22:53:10.4", "PA 30.0"]
+
+
+def text_width(font):
+    return max(font.getbbox(line)[2] for line in LINES)
+
+
+@pytest.mark.parametrize("width", [150, 400, 1200])
+def test_fit_font(width):
+    font = fit_font(LINES, width)
+    # glyph widths are rounded, so text is not quite proportional to size
+    assert text_width(font) >= width * 0.98
+    # not much bigger than needed
+    assert text_width(get_font(font.size - 2)) < width
+
+
+def test_get_font_cached():
+    assert get_font(20) is get_font(20.7)
+    assert get_font(0).size == 1
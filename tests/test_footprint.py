@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.footprint`.
+"""
+import logging
+
+import numpy as np
+import pytest
+from ginga.canvas.types.all import CompoundObject
+from ginga.pilw.ImageViewPil import CanvasView
+from ginga.util import dp
+
+from hcam_finder.footprint import Footprint, rotate_offsets, unrotate_offsets
+from hcam_finder.geometry import add_offsets_radec, radectopix
+
+PX_SCALE = 0.3
+
+
+def make_image():
+    return dp.create_blank_image(
+        150.0, -30.0, 0.25, 1 / 3600, 0.0, cdbase=[-1, 1], logger=logging.getLogger()
+    )
+
+
+def make_footprint(flipEW=False, windows=((100, 200, 300, 100),)):
+    footprint = Footprint(PX_SCALE, 1024, 512, flipEW)
+    footprint.add_window("chip", (0, 0, 2048, 1024), color="red")
+    for n, win in enumerate(windows):
+        footprint.add_window("win{}".format(n), win, color="green")
+    footprint.add_line("split", (1024, 0), (1024, 1024), color="red")
+    footprint.add("mark", "circle", [(0, 0), (10 / 3600, 0)], color="blue")
+    return footprint
+
+
+@pytest.mark.parametrize("pa", [0.0, 35.0, 270.0])
+def test_rotate_offsets(pa):
+    xy = np.random.default_rng(1).uniform(-1, 1, (5, 2))
+    rotated = rotate_offsets(xy, pa)
+    np.testing.assert_allclose(np.hypot(*rotated.T), np.hypot(*xy.T))
+    np.testing.assert_allclose(np.column_stack(unrotate_offsets(*rotated.T, pa)), xy)
+    # positive from North through East: North goes East at 90
+    north = np.array([0.0, 1.0])
+    np.testing.assert_allclose(rotate_offsets(north, 90), [1, 0], atol=1e-12)
+
+
+@pytest.mark.parametrize("flipEW", [False, True])
+def test_ccd_to_offsets(flipEW):
+    footprint = Footprint(PX_SCALE, 1024, 512, flipEW)
+    xy = footprint.ccd_to_offsets([(1024, 512), (1124, 612)])
+    np.testing.assert_allclose(xy[0], 0)
+    # offsets are East and North; detector x runs West unless flipped
+    sign = 1 if flipEW else -1
+    np.testing.assert_allclose(xy[1] * 3600, [sign * 30, 30])
+
+
+@pytest.mark.parametrize("pa", [0.0, 35.0])
+def test_place_matches_vertex_by_vertex(pa):
+    image = make_image()
+    footprint = make_footprint()
+    ctr, pix = footprint.place(image, 150.01, -30.02, pa)
+    np.testing.assert_allclose(ctr, radectopix(image, 150.01, -30.02))
+    assert [len(pts) for pts in pix] == [4, 4, 2, 2]
+    for part, pts in zip(footprint.parts, pix):
+        for xy, pt in zip(part.xy, pts):
+            dx, dy = rotate_offsets(xy, pa)
+            ra, dec = add_offsets_radec(150.01, -30.02, dx, dy)
+            np.testing.assert_allclose(pt, radectopix(image, ra, dec), atol=1e-6)
+
+
+def test_place_many_pointings():
+    image = make_image()
+    footprint = make_footprint()
+    ras, decs = np.array([150.0, 150.02, 149.98]), np.array([-30.0, -30.01, -29.99])
+    ctr, pix = footprint.place(image, ras, decs, 20.0)
+    assert ctr.shape == (3, 2)
+    for n in range(3):
+        ctr1, pix1 = footprint.place(image, ras[n], decs[n], 20.0)
+        np.testing.assert_allclose(ctr[n], ctr1)
+        for pts, pts1 in zip(pix, pix1):
+            np.testing.assert_allclose(pts[n], pts1)
+
+
+def test_vertices_follow_added_parts():
+    footprint = make_footprint()
+    assert len(footprint.vertices) == 1 + 4 + 4 + 2 + 2
+    footprint.add_window("win9", (10, 10, 20, 20))
+    assert len(footprint.vertices) == 1 + 4 + 4 + 2 + 2 + 4
+    _, pix = footprint.place(make_image(), 150.0, -30.0, 0.0)
+    assert len(pix) == 5
+
+
+def test_make_and_update_shapes():
+    image = make_image()
+    footprint = make_footprint()
+    _, pix = footprint.place(image, 150.0, -30.0, 0.0)
+    shapes = footprint.make_shapes(pix)
+    assert [shape.kind for shape in shapes] == ["polygon", "polygon", "line", "circle"]
+    assert [shape.name for shape in shapes] == ["chip", "win0", "split", "mark"]
+    assert shapes[3].radius == pytest.approx(10, rel=1e-3)
+
+    _, pix = footprint.place(image, 150.0, -30.0, 90.0)
+    footprint.update_shapes(shapes, pix)
+    np.testing.assert_allclose(shapes[0].points, pix[0])
+    np.testing.assert_allclose([shapes[2].x1, shapes[2].y1], pix[2][0])
+    np.testing.assert_allclose([shapes[3].x, shapes[3].y], pix[3][0])
+
+
+def drawn_overlay(footprint, pix):
+    """
+    Overlay for a footprint on the canvas of a headless viewer
+    """
+    viewer = CanvasView(logging.getLogger())
+    viewer.configure_surface(200, 200)
+    obj = CompoundObject(*footprint.make_shapes(pix))
+    obj.footprint = footprint
+    viewer.get_canvas().add(obj)
+    return obj
+
+
+def test_update_overlay_same_footprint():
+    image = make_image()
+    footprint = make_footprint()
+    obj = drawn_overlay(footprint, footprint.place(image, 150.0, -30.0, 0.0)[1])
+    shapes = list(obj.objects)
+
+    _, pix = footprint.place(image, 150.0, -30.0, 45.0)
+    assert footprint.update_overlay(obj, pix) == 0
+    assert all(new is old for new, old in zip(obj.objects, shapes))
+    np.testing.assert_allclose(obj.objects[1].points, pix[1])
+
+
+def test_update_overlay_diffs_parts():
+    image = make_image()
+    old = make_footprint(windows=[(100, 200, 300, 100), (600, 200, 300, 100)])
+    obj = drawn_overlay(old, old.place(image, 150.0, -30.0, 0.0)[1])
+    shapes = dict((shape.name, shape) for shape in obj.objects)
+
+    # one window moved, one removed and one added; the rest is unchanged
+    new = make_footprint(windows=[(120, 200, 300, 100)])
+    new.add_window("win5", (900, 300, 50, 50), color="green")
+    _, pix = new.place(image, 150.0, -30.0, 10.0)
+    assert new.update_overlay(obj, pix) == 3
+    assert obj.footprint is new
+    names = [shape.name for shape in obj.objects]
+    assert names == ["chip", "win0", "split", "mark", "win5"]
+    for name in ("chip", "split", "mark"):
+        assert any(shape is shapes[name] for shape in obj.objects)
+    assert not any(shape is shapes["win0"] for shape in obj.objects)
+    # every part is where the new footprint puts it, and ready to draw
+    for shape, pts in zip(obj.objects, pix):
+        if shape.kind == "polygon":
+            np.testing.assert_allclose(shape.points, pts)
+        assert shape.viewer is obj.viewer
+
+    # a change of style alone counts as a change
+    restyled = make_footprint(windows=[(120, 200, 300, 100)])
+    restyled.parts[0].params["color"] = "yellow"
+    restyled.add_window("win5", (900, 300, 50, 50), color="green")
+    assert restyled.update_overlay(obj, pix) == 1
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.geometry`.
+"""
+import logging
+
+import numpy as np
+import pytest
+from ginga.util import dp, wcs
+
+from hcam_finder.geometry import (
+    add_offsets_radec,
+    coverage_map,
+    points_in_polygon,
+    radec_offsets,
+    radectopix,
+    rect_corners,
+    true_runs,
+)
+from hcam_finder.star_catalog import angular_separation
+
+
+@pytest.mark.parametrize(
+    "ra0, dec0",
+    [(0.0, 0.0), (359.99, 10.0), (0.01, -45.0), (120.0, 89.9), (0.0, -89.9)],
+)
+def test_radec_offsets_inverts_add_offsets(ra0, dec0):
+    rng = np.random.default_rng(1)
+    dx, dy = rng.uniform(-0.2, 0.2, (2, 100))
+    ra, dec = add_offsets_radec(ra0, dec0, dx, dy)
+    assert np.all((ra >= 0) & (ra < 360))
+    x, y = radec_offsets(ra0, dec0, ra, dec)
+    np.testing.assert_allclose(x, dx, atol=1e-10)
+    np.testing.assert_allclose(y, dy, atol=1e-10)
+
+
+def test_offsets_are_east_and_north():
+    ra, dec = add_offsets_radec(10.0, 0.0, [0.1, 0.0], [0.0, 0.1])
+    np.testing.assert_allclose(ra, [10.1, 10.0], atol=1e-6)
+    np.testing.assert_allclose(dec, [0.0, 0.1], atol=1e-6)
+
+
+def test_add_offsets_matches_ginga():
+    rng = np.random.default_rng(2)
+    dx, dy = rng.uniform(-0.5, 0.5, (2, 20))
+    ra, dec = add_offsets_radec(200.0, -60.0, dx, dy)
+    for n in range(20):
+        expected = wcs.add_offset_radec(200.0, -60.0, dx[n], dy[n])
+        np.testing.assert_allclose((ra[n], dec[n]), expected, atol=1e-10)
+
+
+def test_radectopix_matches_one_at_a_time():
+    image = dp.create_blank_image(
+        150.0, -30.0, 0.1, 1 / 3600, 15.0, cdbase=[-1, 1], logger=logging.getLogger()
+    )
+    ra, dec = add_offsets_radec(150.0, -30.0, *np.full((2, 3, 4), 0.01))
+    pix = radectopix(image, ra, dec)
+    assert pix.shape == (3, 4, 2)
+    for n in range(3):
+        x, y = image.radectopix(ra[n, 0], dec[n, 0], coords="data")
+        np.testing.assert_allclose(pix[n, 0], (x, y), atol=1e-8)
+
+
+def test_rect_corners():
+    corners = rect_corners([0, 10], 5, [2, 4], 3)
+    assert corners.shape == (2, 4, 2)
+    np.testing.assert_array_equal(corners[1], [[10, 5], [14, 5], [14, 8], [10, 8]])
+    assert rect_corners(1, 2, 3, 4).shape == (1, 4, 2)
+
+
+def test_small_offsets_match_separation():
+    ra0, dec0 = 0.0, 60.0
+    ra, dec = add_offsets_radec(ra0, dec0, 0.03, -0.04)
+    sep = angular_separation(ra0, dec0, ra, dec)
+    assert sep == pytest.approx(0.05, rel=1e-6)
+
+
+def test_points_in_polygon_square():
+    square = rect_corners(0, 0, 2, 2)[0]
+    x = np.array([1.0, -0.5, 2.5, 1.0, 1.99])
+    y = np.array([1.0, 1.0, 1.0, 3.0, 0.01])
+    np.testing.assert_array_equal(
+        points_in_polygon(x, y, square), [True, False, False, False, True]
+    )
+
+
+def test_points_in_polygon_concave():
+    # an L shape, missing the top right quarter of a 2 x 2 square
+    poly = [(0, 0), (2, 0), (2, 1), (1, 1), (1, 2), (0, 2)]
+    inside = points_in_polygon([0.5, 1.5, 0.5, 1.5], [0.5, 0.5, 1.5, 1.5], poly)
+    np.testing.assert_array_equal(inside, [True, True, True, False])
+
+
+def test_points_in_polygon_broadcasts_over_polygons():
+    polys = rect_corners([0, 10], [0, 0], 2, 2)
+    x = np.array([1.0, 11.0, 5.0])
+    inside = points_in_polygon(x[:, np.newaxis], 1.0, polys)
+    assert inside.shape == (3, 2)
+    np.testing.assert_array_equal(
+        inside, [[True, False], [False, True], [False, False]]
+    )
+
+
+def test_coverage_map():
+    rects = rect_corners([2, 5], [3, 4], 6, 5)
+    counts = coverage_map(rects, (12, 15))
+    assert counts.shape == (12, 15)
+    # pixel centres inside each rectangle
+    expected = np.zeros((12, 15), dtype=int)
+    expected[3:8, 2:8] += 1
+    expected[4:9, 5:11] += 1
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_coverage_map_matches_every_pixel():
+    rng = np.random.default_rng(7)
+    # rotated squares, some hanging off the image or entirely off it
+    angles = rng.uniform(0, np.pi, 6)
+    centres = np.vstack((rng.uniform(-5, 45, (5, 2)), [[100.0, 100.0]]))
+    corners = np.array([[1, 1], [-1, 1], [-1, -1], [1, -1]]) * 8.0
+    polygons = []
+    for angle, centre in zip(angles, centres):
+        c, s = np.cos(angle), np.sin(angle)
+        polygons.append(centre + np.dot(corners, [[c, s], [-s, c]]))
+
+    counts = coverage_map(polygons, (40, 50))
+    yy, xx = np.mgrid[:40, :50]
+    expected = sum(points_in_polygon(xx, yy, poly).astype(int) for poly in polygons)
+    np.testing.assert_array_equal(counts, expected)
+    assert counts.max() >= 2
+
+
+def test_true_runs():
+    mask = [True, True, False, True, False, False, True]
+    assert true_runs(mask) == [(0, 1), (3, 3), (6, 6)]
+    assert true_runs([False, False]) == []
+    assert true_runs([True] * 3) == [(0, 2)]
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.guider`.
+"""
+import numpy as np
+
+from hcam_finder.footprint import unrotate_offsets
+from hcam_finder.geometry import add_offsets_radec, points_in_polygon
+from hcam_finder.guider import (
+    guide_pa_ranges,
+    guide_star_availability,
+    guider_outline,
+)
+
+RA, DEC = 150.0, -30.0
+
+
+def star_at(x, y):
+    """
+    Position of a star offset East and North (arcsec) of the pointing
+    """
+    return add_offsets_radec(RA, DEC, x / 3600, y / 3600)
+
+
+def test_guider_outline():
+    xy = guider_outline()
+    assert xy.ndim == 2 and xy.shape[1] == 2
+    # no closing vertex, and read only once
+    assert np.any(xy[0] != xy[-1])
+    assert guider_outline() is xy
+    np.testing.assert_array_equal(guider_outline(flipEW=False), xy * [-1, 1])
+
+
+def test_guide_star_availability():
+    rng = np.random.default_rng(6)
+    x, y = rng.uniform(-3000, 3000, (2, 50))
+    ra, dec = star_at(x, y)
+    pa = np.array([0.0, 45.0, 200.0])
+    available = guide_star_availability(RA, DEC, ra, dec, pa)
+    assert available.shape == (3, 50)
+    assert available.any() and not available.all()
+    # the same as checking one PA at a time in the detector frame
+    for n in range(3):
+        xd, yd = unrotate_offsets(x / 3600, y / 3600, pa[n])
+        inside = points_in_polygon(xd, yd, guider_outline())
+        np.testing.assert_array_equal(available[n], inside)
+    assert guide_star_availability(RA, DEC, ra, dec, 0.0).shape == (50,)
+
+
+def test_guide_pa_ranges():
+    # a star 2000" North leaves the hole only around a PA of 180
+    ra, dec = star_at(0.0, 2000.0)
+    ranges, nstars = guide_pa_ranges(RA, DEC, [ra], [dec])
+    assert nstars.shape == (360,)
+    assert len(ranges) == 1
+    start, end = ranges[0]
+    # the range wraps through zero
+    assert 180 < start < 360 < end < 360 + 180
+    assert nstars[0] == 1 and nstars[180] == 0
+
+    # a second star 2000" East covers the gap
+    ra2, dec2 = star_at(2000.0, 0.0)
+    ranges, nstars = guide_pa_ranges(RA, DEC, [ra, ra2], [dec, dec2], step=2.0)
+    assert ranges == [(0.0, 358.0)]
+    assert nstars.shape == (180,) and nstars.max() == 2
+    assert guide_pa_ranges(RA, DEC, [], [])[0] == []
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.image_cache`.
+"""
+import logging
+import mmap
+import os
+
+import numpy as np
+import pytest
+from astropy.io import fits
+
+from hcam_finder.image_cache import (
+    ImageCache,
+    calc_cut_levels,
+    load_fits,
+    sample_pixels,
+    scaled_value,
+)
+
+
+def write_fits(path, data, **header):
+    hdu = fits.PrimaryHDU(data)
+    for key, value in header.items():
+        hdu.header[key] = value
+    hdu.writeto(str(path), overwrite=True)
+    return str(path)
+
+
+def memory_mapped(data):
+    """
+    Whether an array is a view of a memory-mapped file
+    """
+    while data is not None:
+        if isinstance(data, (mmap.mmap, np.memmap)):
+            return True
+        data = getattr(data, "base", None)
+    return False
+
+
+@pytest.fixture
+def logger():
+    return logging.getLogger("test")
+
+
+def test_load_fits_memory_maps_raw_data(tmp_path, logger):
+    raw = np.arange(300 * 400, dtype=np.int16).reshape(300, 400)
+    hdu = fits.PrimaryHDU(raw)
+    hdu.header["BSCALE"] = 2.0
+    hdu.header["BZERO"] = 32768.0
+    # keep the integers on disk as they are
+    hdu.writeto(str(tmp_path / "raw.fits"))
+    image = load_fits(str(tmp_path / "raw.fits"), logger)
+    try:
+        data = image.get_data()
+        assert memory_mapped(data)
+        assert data.dtype.kind == "i"
+        np.testing.assert_array_equal(data, raw)
+        assert scaled_value(image, 10) == 2.0 * 10 + 32768.0
+        assert scaled_value(image, None) is None
+    finally:
+        image.get("hdulist").close()
+
+
+def test_load_fits_finds_image_extension(tmp_path, logger):
+    path = str(tmp_path / "ext.fits")
+    data = np.ones((20, 30), dtype=np.float32)
+    fits.HDUList([fits.PrimaryHDU(), fits.ImageHDU(data)]).writeto(path)
+    image = load_fits(path, logger)
+    assert image.get_data().shape == (20, 30)
+    assert scaled_value(image, 5.0) == 5.0
+    image.get("hdulist").close()
+
+    fits.PrimaryHDU().writeto(path, overwrite=True)
+    with pytest.raises(ValueError):
+        load_fits(path, logger)
+
+
+def test_image_cache_reuses_entries(tmp_path, logger):
+    cache = ImageCache(logger, maxsize=2)
+    rng = np.random.default_rng(2)
+    paths = [
+        write_fits(tmp_path / "{}.fits".format(n), rng.normal(size=(64, 64)))
+        for n in range(3)
+    ]
+    first = cache.get_entry(paths[0])
+    assert cache.get_entry(paths[0]) is first
+    assert cache.load(paths[0]) is first.image
+
+    # a changed file is loaded again
+    write_fits(paths[0], rng.normal(size=(64, 64)))
+    mtime = os.path.getmtime(paths[0]) + 10
+    os.utime(paths[0], (mtime, mtime))
+    again = cache.get_entry(paths[0])
+    assert again is not first
+
+    # the least recently used entry is dropped, and its file closed
+    cache.get_entry(paths[1])
+    cache.get_entry(paths[2])
+    hdulist = again.image.get("hdulist")
+    cache.get_entry(paths[0])
+    assert cache.get_entry(paths[0]) is not again
+    assert hdulist._file.closed
+    cache.clear()
+
+
+def test_sample_pixels_skips_nan():
+    data = np.random.default_rng(3).normal(size=(2000, 3000))
+    data[::7] = np.nan
+    sample = sample_pixels(data, nsample=10000)
+    assert np.all(np.isfinite(sample))
+    assert 5000 < sample.size <= 10000
+    assert sample_pixels(np.full((50, 50), np.nan)).size == 0
+
+
+def test_calc_cut_levels_ignore_stars_and_nan():
+    rng = np.random.default_rng(4)
+    data = rng.normal(1000.0, 20.0, (400, 500))
+    # a few bright stars, which zscale should ignore
+    data[rng.integers(0, 400, 50), rng.integers(0, 500, 50)] = 60000.0
+    data[:10] = np.nan
+    lo, hi = calc_cut_levels(data)
+    # the sky sits between the cuts, which are nowhere near the stars
+    assert 1000.0 - 10 * 20 < lo < 1000.0 < hi < 1000.0 + 10 * 20
+    assert calc_cut_levels(np.full((50, 50), np.nan)) == (0.0, 1.0)
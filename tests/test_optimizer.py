@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.optimizer`.
+"""
+import numpy as np
+from ginga.misc import Bunch
+
+from hcam_finder import optimizer
+from hcam_finder.footprint import unrotate_offsets
+from hcam_finder.optimizer import (
+    optimize_pointing,
+    score_configurations,
+    search_pointings,
+)
+
+
+def brute_force(stars, target, windows, nods, pa, offset):
+    """
+    Count stars in a window at every nod position, one at a time
+    """
+
+    def kept(xy):
+        for x0, y0, x1, y1 in windows:
+            ok = True
+            for nod in nods:
+                x, y = unrotate_offsets(*(xy - offset - nod), pa)
+                ok &= x0 <= x <= x1 and y0 <= y <= y1
+            if ok:
+                return True
+        return False
+
+    if target is not None and not kept(target):
+        return -1
+    return sum(kept(star) for star in stars)
+
+
+def test_score_matches_brute_force():
+    rng = np.random.default_rng(3)
+    stars = rng.uniform(-0.03, 0.03, (40, 2))
+    target = np.array([-0.01, 0.0])
+    windows = np.array([[-0.02, -0.01, 0.0, 0.01], [0.005, -0.01, 0.02, 0.01]])
+    nods = rng.uniform(-5, 5, (4, 2)) / 3600
+    pas = np.array([0.0, 30.0, 135.0, 270.0])
+    offsets = rng.uniform(-0.005, 0.005, (6, 2))
+    ncomps = score_configurations(stars, target, windows, nods, pas, offsets)
+    for i, pa in enumerate(pas):
+        for j, offset in enumerate(offsets):
+            expected = brute_force(stars, target, windows, nods, pa, offset)
+            assert ncomps[i, j] == expected
+    # without a target, nothing is ruled out
+    ncomps = score_configurations(stars, None, windows, nods, pas, offsets)
+    assert np.all(ncomps >= 0)
+
+
+def test_optimize_pointing_finds_best():
+    # one window, and a row of stars along x that only fits when rotated
+    windows = np.array([[-0.001, -0.01, 0.001, 0.01]])
+    stars = np.column_stack((np.linspace(-0.008, 0.008, 5), np.zeros(5)))
+    nods = np.zeros((1, 2))
+    best = optimize_pointing(stars, None, windows, nods, pa_step=10.0, processes=1)
+    assert best[0].ncomps == 5
+    assert best[0].pa % 180 == 90
+    np.testing.assert_allclose([best[0].dx, best[0].dy], 0, atol=1e-12)
+
+
+def test_optimize_pointing_needs_target():
+    windows = np.array([[-0.001, -0.001, 0.001, 0.001]])
+    best = optimize_pointing(
+        np.zeros((0, 2)), np.array([1.0, 1.0]), windows, np.zeros((1, 2)), processes=1
+    )
+    assert best == []
+
+
+def test_optimize_pointing_in_parallel(monkeypatch):
+    rng = np.random.default_rng(4)
+    stars = rng.uniform(-0.02, 0.02, (30, 2))
+    windows = np.array([[-0.01, -0.005, 0.0, 0.005], [0.002, -0.005, 0.012, 0.005]])
+    nods = rng.uniform(-3, 3, (3, 2)) / 3600
+    args = (stars, np.zeros(2), windows, nods)
+    serial = optimize_pointing(*args, pa_step=10.0, processes=1)
+    monkeypatch.setattr(optimizer, "MIN_PARALLEL_TESTS", 0)
+    parallel = optimize_pointing(*args, pa_step=10.0, processes=2)
+    assert parallel == serial
+
+
+def test_search_pointings_rotator_pa():
+    # as `test_optimize_pointing_finds_best`, off the equator
+    setup = Bunch.Bunch(
+        ra=150.0,
+        dec=-30.0,
+        stars=np.column_stack((np.linspace(-0.008, 0.008, 5), np.zeros(5))),
+        target=None,
+        windows=np.array([[-0.001, -0.01, 0.001, 0.01]]),
+        nods=np.zeros((1, 2)),
+        pa_step=10.0,
+        offset_max=10 / 3600,
+        offset_step=5 / 3600,
+        pa_offset=30.0,
+        EofN=True,
+    )
+    best = search_pointings(setup, processes=1)
+    assert best[0].ncomps == 5
+    assert best[0].rotator_pa == (30.0 + best[0].pa) % 360
+    np.testing.assert_allclose([best[0].ra, best[0].dec], [150.0, -30.0])
+    setup.EofN = False
+    best = search_pointings(setup, processes=1)
+    assert best[0].rotator_pa == (30.0 - best[0].pa) % 360
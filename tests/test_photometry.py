@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.photometry`.
+"""
+import numpy as np
+import pytest
+
+from hcam_finder.photometry import (
+    PEAK_SATURATED,
+    PEAK_WARN,
+    aperture_photometry,
+    scale_peak_counts,
+)
+
+
+def test_aperture_photometry_point_sources():
+    data = np.full((100, 100), 50.0)
+    data[30, 40] += 1000.0
+    data[60, 70] += 300.0
+    flux, sky = aperture_photometry(data, [40, 70.4], [30, 59.7])
+    np.testing.assert_allclose(flux, [1000, 300])
+    np.testing.assert_allclose(sky, 50)
+
+
+def test_aperture_photometry_gaussian():
+    yy, xx = np.mgrid[:64, :64]
+    sigma = 1.0
+    r2 = (xx - 31.3) ** 2 + (yy - 32.6) ** 2
+    data = 10 + 5000 / (2 * np.pi * sigma**2) * np.exp(-0.5 * r2 / sigma**2)
+    flux, sky = aperture_photometry(data, [31.3], [32.6], radius=4.0)
+    assert flux[0] == pytest.approx(5000, rel=0.01)
+    assert sky[0] == pytest.approx(10, abs=0.01)
+
+
+def test_aperture_photometry_off_image():
+    data = np.ones((50, 50))
+    flux, sky = aperture_photometry(data, [2.0, 25.0, 48.0], [25.0, 25.0, 25.0])
+    assert np.isnan(flux[0]) and np.isnan(flux[2])
+    assert flux[1] == pytest.approx(0)
+
+
+def test_scale_peak_counts():
+    peak, level = scale_peak_counts([12.0, 10.0, 9.0, 8.0], 10.0, 20000.0)
+    np.testing.assert_allclose(peak, 20000 * 10 ** (-0.4 * np.array([2, 0, -1, -2])))
+    assert peak[2] > PEAK_WARN and peak[3] > PEAK_SATURATED
+    np.testing.assert_array_equal(level, [0, 0, 1, 2])
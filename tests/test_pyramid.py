@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.pyramid`.
+"""
+import logging
+
+import numpy as np
+import pytest
+from ginga.AstroImage import AstroImage
+from ginga.pilw.ImageViewPil import CanvasView
+
+from hcam_finder.pyramid import (
+    PyramidViewMixin,
+    _downsample,
+    build_pyramid,
+    pyramid_level,
+)
+
+
+class PyramidView(PyramidViewMixin, CanvasView):
+    pass
+
+
+def test_downsample_block_average():
+    data = np.arange(7 * 9, dtype=np.int16).reshape(7, 9)
+    expected = data[:6, :8].reshape(3, 2, 4, 2).mean(axis=(1, 3))
+    # a few rows at a time, as for a memory-mapped image
+    for chunk_rows in (2, 3, 512):
+        out = _downsample(data, chunk_rows=chunk_rows)
+        assert out.dtype == np.float32
+        np.testing.assert_allclose(out, expected)
+
+
+def test_build_pyramid(tmp_path):
+    data = np.random.default_rng(1).uniform(0, 100, (600, 1100))
+    fname = tmp_path / "data.npy"
+    np.save(fname, data.astype(np.float32))
+    levels = build_pyramid(np.load(fname, mmap_mode="r"))
+    assert [level.shape for level in levels] == [(300, 550), (150, 275)]
+    expected = data.reshape(150, 4, 275, 4).mean(axis=(1, 3))
+    np.testing.assert_allclose(levels[1], expected, rtol=1e-5)
+    assert build_pyramid(np.zeros((200, 200))) == []
+
+
+@pytest.mark.parametrize(
+    "scale, level",
+    [(2.0, 0), (1.0, 0), (0.6, 0), (0.5, 1), (0.3, 1), (0.25, 2), (0.01, 3), (0, 0)],
+)
+def test_pyramid_level(scale, level):
+    assert pyramid_level(scale, 3) == level
+
+
+def view(data, pyramid, zoom):
+    logger = logging.getLogger("test")
+    viewer = PyramidView(logger)
+    viewer.configure_surface(200, 200)
+    image = AstroImage(logger=logger)
+    image.load_data(data)
+    if pyramid:
+        image.set(pyramid=build_pyramid(data))
+    viewer.set_image(image)
+    viewer.cut_levels(0, 1)
+    viewer.zoom_to(zoom)
+    return viewer
+
+
+def test_view_draws_from_pyramid():
+    yy, xx = np.mgrid[:1024, :1024]
+    data = (0.5 + 0.5 * np.sin(xx / 60.0) * np.cos(yy / 90.0)).astype(np.float32)
+    viewer = view(data, True, -4)
+    assert viewer.get_scale() == pytest.approx(0.2)
+
+    # the renderer is given the visible part of the level binned by 4
+    cvs_img = viewer.get_canvas().get_objects()[0]
+    levels = viewer.get_image().get("pyramid")
+    stand_in = viewer._pyramid_canvas_image(cvs_img, levels)
+    assert stand_in.scale_x == 4 * cvs_img.scale_x
+    assert stand_in.get_image().get_data().shape == levels[1].shape
+    # binned pixel 0 is centred on the middle of its 4x4 data pixels
+    assert (stand_in.x, stand_in.y) == (cvs_img.x + 1.5, cvs_img.y + 1.5)
+
+    # and the view looks as it does drawn from the full data
+    binned = viewer.get_image_as_array().astype(float)
+    full = view(data, False, -4).get_image_as_array().astype(float)
+    assert np.mean(np.abs(binned - full)) < 2
+    # nothing changes when zoomed in
+    zoomed = view(data, True, 2)
+    assert zoomed._pyramid_canvas_image(cvs_img, levels) is cvs_img
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.render`.
+"""
+import logging
+
+import numpy as np
+import pytest
+from ginga.canvas.types.all import Image as ImageObject
+from ginga.pilw.ImageViewPil import CanvasView
+from ginga.RGBImage import RGBImage
+from ginga.util import dp
+from PIL import Image
+
+from hcam_finder.render import (
+    BACKGROUND,
+    ChartTransform,
+    canvas_shapes,
+    colour_lut,
+    draw_shapes,
+    render_image,
+)
+
+LUT = colour_lut("gray", "ramp")
+
+
+def rotated(angle, centre=(50.0, 40.0), half=(30.0, 20.0)):
+    """
+    Corners of a chart turned by `angle` (deg) on the data
+    """
+    c, s = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+    across, down = np.array([c, s]) * half[0], np.array([s, -c]) * half[1]
+    top_left = np.asarray(centre) - across - down
+    return [top_left, top_left + 2 * across, top_left + 2 * down]
+
+
+@pytest.mark.parametrize("flip_x", [False, True])
+def test_chart_transform_from_rect(flip_x):
+    transform = ChartTransform.from_rect((-0.5, -0.5, 199.5, 99.5), 400, flip_x)
+    assert (transform.width, transform.height) == (400, 200)
+    assert transform.scale == pytest.approx(2)
+    corners = transform.to_chart([(-0.5, 99.5), (199.5, -0.5)])
+    expected = [(400, 0), (0, 200)] if flip_x else [(0, 0), (400, 200)]
+    np.testing.assert_allclose(corners, expected, atol=1e-9)
+
+    x, y = transform.data_grid()
+    assert x.shape == (1, 400) and y.shape == (200, 1)
+    assert np.all(np.diff(x) < 0) if flip_x else np.all(np.diff(x) > 0)
+    assert np.all(np.diff(y, axis=0) < 0)
+
+
+@pytest.mark.parametrize("angle", [0.0, 30.0, 90.0, 200.0])
+def test_chart_transform_inverse(angle):
+    transform = ChartTransform(rotated(angle), 300, 200)
+    assert transform.scale == pytest.approx(5)
+    xy = np.random.default_rng(1).uniform(0, 100, (3, 5, 2))
+    np.testing.assert_allclose(transform.to_data(transform.to_chart(xy)), xy)
+    uv = transform.to_chart(xy)
+    np.testing.assert_allclose(transform.to_chart(transform.to_data(uv)), uv)
+
+    # the grid of pixel centres agrees with to_data
+    x, y = transform.data_grid()
+    x, y = np.broadcast_arrays(x, y)
+    assert x.shape == (200, 300)
+    centre = transform.to_data((10.5, 20.5))
+    np.testing.assert_allclose([x[20, 10], y[20, 10]], centre)
+
+
+@pytest.mark.parametrize(
+    "turn", [dict(), dict(rot=30), dict(swap=True), dict(rot=100, fx=True, fy=True)]
+)
+def test_chart_transform_from_viewer(turn):
+    logger = logging.getLogger("test")
+    viewer = CanvasView(logger)
+    viewer.configure_surface(300, 200)
+    viewer.set_image(
+        dp.create_blank_image(150.0, -30.0, 0.1, 1e-4, 0.0, logger=logger)
+    )
+    viewer.set_pan(450.0, 520.0)
+    viewer.zoom_to(2)
+    viewer.transform(
+        turn.get("fx", False), turn.get("fy", False), turn.get("swap", False)
+    )
+    viewer.rotate(turn.get("rot", 0.0))
+
+    transform = ChartTransform.from_viewer(viewer, 600)
+    assert (transform.width, transform.height) == (600, 400)
+    xy = np.random.default_rng(2).uniform(400, 500, (10, 2))
+    window = viewer.tform["data_to_window"].to_(xy)
+    # the viewer rounds window positions to whole pixels
+    np.testing.assert_allclose(transform.to_chart(xy), 2 * window, atol=1.0)
+
+
+def test_render_image_edges():
+    data = 20 * np.arange(12.0).reshape(3, 4)
+    # two chart pixels per data pixel, one data pixel beyond each edge
+    transform = ChartTransform.from_rect((-1.5, -1.5, 4.5, 3.5), 12)
+    rgb = render_image(data, (0, 255), transform, LUT)
+    assert rgb.shape == (10, 12, 3)
+    outside = np.ones((10, 12), dtype=bool)
+    outside[2:8, 2:10] = False
+    assert np.all(rgb[outside] == BACKGROUND)
+    # North up: the last data row is at the top
+    levels = data[::-1].astype(int)
+    expected = LUT[np.repeat(np.repeat(levels, 2, axis=0), 2, axis=1)]
+    np.testing.assert_array_equal(rgb[2:8, 2:10], expected)
+
+    # entirely off the image
+    transform = ChartTransform.from_rect((10, 10, 20, 20), 5)
+    assert np.all(render_image(data, (0, 255), transform, LUT) == BACKGROUND)
+
+
+def test_render_image_turned():
+    data = np.random.default_rng(3).uniform(0, 100, (40, 60))
+    transform = ChartTransform.from_rect((-0.5, -0.5, 59.5, 39.5), 60)
+    north_up = render_image(data, (0, 100), transform, LUT)
+    # the same region, turned a quarter turn anticlockwise
+    turned = ChartTransform([(59.5, 39.5), (59.5, -0.5), (-0.5, 39.5)], 40, 60)
+    rgb = render_image(data, (0, 100), turned, LUT)
+    np.testing.assert_array_equal(rgb, np.rot90(north_up))
+
+
+@pytest.mark.parametrize("size, level", [(1024, 0), (600, 0), (400, 1), (100, 3)])
+def test_render_image_pyramid_level(size, level):
+    # each level filled with its own value, to see which one is drawn
+    data = np.zeros((1024, 1024))
+    pyramid = [np.full((1024 >> n, 1024 >> n), 10.0 * n) for n in range(1, 4)]
+    transform = ChartTransform.from_rect((-0.5, -0.5, 1023.5, 1023.5), size)
+    rgb = render_image(data, (0, 255), transform, LUT, pyramid)
+    assert np.all(rgb == LUT[10 * level])
+
+
+def test_draw_image_overlay():
+    rgba = np.zeros((4, 4, 4), dtype=np.uint8)
+    rgba[1, 2] = (255, 0, 0, 255)
+    overlay = ImageObject(0, 0, RGBImage(data_np=rgba, order="RGBA"))
+    shapes = canvas_shapes([overlay])
+    assert [shape.kind for shape in shapes] == ["image"]
+
+    transform = ChartTransform.from_rect((-0.5, -0.5, 3.5, 3.5), 8)
+    chart = Image.new("RGB", (8, 8), "white")
+    draw_shapes(chart, shapes, transform)
+    rgb = np.asarray(chart)
+    red = np.all(rgb == (255, 0, 0), axis=-1)
+    # image row 1 is data y = 1, drawn North up
+    expected = np.zeros((8, 8), dtype=bool)
+    expected[4:6, 4:6] = True
+    np.testing.assert_array_equal(red, expected)
+    assert np.all(rgb[~red] == 255)
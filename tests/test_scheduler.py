@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.scheduler`.
+"""
+import pytest
+
+from hcam_finder import scheduler
+from hcam_finder.scheduler import RedrawScheduler
+
+
+class EventLoop(object):
+    """
+    The parts of the Tk event loop a scheduler uses, run by hand
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.jobs = {}
+        self._next = 0
+
+    def _add(self, when, func):
+        self._next += 1
+        self.jobs[self._next] = (when, func)
+        return self._next
+
+    def after(self, ms, func):
+        return self._add(self.now + ms / 1000, func)
+
+    def after_idle(self, func):
+        return self._add(self.now, func)
+
+    def after_cancel(self, job):
+        del self.jobs[job]
+
+    def run(self, until):
+        """
+        Run everything due up to a time (s), in order
+        """
+        while True:
+            due = [(when, job) for job, (when, _) in self.jobs.items() if when <= until]
+            if not due:
+                break
+            when, job = min(due)
+            self.now = max(self.now, when)
+            self.jobs.pop(job)[1]()
+        self.now = until
+
+
+@pytest.fixture
+def loop(monkeypatch):
+    loop = EventLoop()
+    monkeypatch.setattr(scheduler.time, "time", lambda: loop.now)
+    return loop
+
+
+def test_requests_are_merged(loop):
+    calls = []
+    redraw = RedrawScheduler(loop, lambda *args: calls.append(args))
+    for n in range(10):
+        redraw.request(n, "arg")
+    assert redraw.pending and calls == []
+    loop.run(0.0)
+    assert calls == [(9, "arg")] and not redraw.pending
+
+
+def test_at_most_one_redraw_per_frame(loop):
+    calls = []
+    redraw = RedrawScheduler(loop, lambda *args: calls.append(loop.now), frame_ms=20)
+    # a drag: a request every 5 ms for 100 ms
+    for n in range(20):
+        redraw.request()
+        loop.run(loop.now + 0.005)
+    loop.run(1.0)
+    assert len(calls) == 6
+    assert all(b - a >= 0.02 - 1e-9 for a, b in zip(calls[:-1], calls[1:]))
+    # the last request is never lost
+    assert calls[-1] >= 0.095
+
+
+def test_cancel_and_flush(loop):
+    calls = []
+    redraw = RedrawScheduler(loop, lambda *args: calls.append(args))
+    redraw.request(1)
+    redraw.cancel()
+    loop.run(1.0)
+    assert calls == [] and not loop.jobs
+
+    redraw.request(2)
+    redraw.flush()
+    assert calls == [(2,)] and not loop.jobs
+    # nothing pending, nothing to do
+    redraw.flush()
+    assert calls == [(2,)]
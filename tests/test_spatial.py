@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.spatial`.
+"""
+import numpy as np
+import pytest
+
+from hcam_finder.spatial import BoxTree
+
+
+def brute_force(boxes, x, y, tol=0.0):
+    inside = (
+        (boxes[:, 0] - tol <= x)
+        & (x <= boxes[:, 2] + tol)
+        & (boxes[:, 1] - tol <= y)
+        & (y <= boxes[:, 3] + tol)
+    )
+    return list(np.flatnonzero(inside))
+
+
+@pytest.mark.parametrize("nboxes", [1, 7, 8, 9, 100, 1000])
+def test_query_matches_brute_force(nboxes):
+    rng = np.random.default_rng(nboxes)
+    lo = rng.uniform(0, 100, (nboxes, 2))
+    boxes = np.hstack((lo, lo + rng.uniform(0.5, 10, (nboxes, 2))))
+    tree = BoxTree(boxes, range(nboxes))
+    assert len(tree) == nboxes
+    for x, y in rng.uniform(-5, 115, (200, 2)):
+        assert tree.query(x, y) == brute_force(boxes, x, y)
+        assert tree.query(x, y, tol=2.0) == brute_force(boxes, x, y, tol=2.0)
+
+
+def test_query_returns_items_in_order_given():
+    boxes = [(0, 0, 10, 10), (5, 5, 6, 6), (-1, -1, 20, 20)]
+    tree = BoxTree(boxes, ["a", "b", "c"], node_size=2)
+    assert tree.query(5.5, 5.5) == ["a", "b", "c"]
+    assert tree.query(15, 15) == ["c"]
+    assert tree.query(30, 30) == []
+
+
+def test_empty_tree():
+    tree = BoxTree(np.zeros((0, 4)), [])
+    assert len(tree) == 0
+    assert tree.query(0.0, 0.0) == []
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.star_catalog`.
+"""
+import numpy as np
+import pytest
+
+from hcam_finder.geometry import add_offsets_radec
+from hcam_finder.star_catalog import (
+    StarCatalog,
+    angular_separation,
+    healpix_index,
+    propagate_positions,
+    write_catalog,
+)
+
+
+def random_sky(n, seed=0):
+    rng = np.random.default_rng(seed)
+    ra = rng.uniform(0, 360, n)
+    dec = np.degrees(np.arcsin(rng.uniform(-1, 1, n)))
+    return ra, dec
+
+
+def test_healpix_index_covers_every_cell():
+    ra, dec = random_sky(100000)
+    cells = healpix_index(ra, dec, 2)
+    assert np.array_equal(np.unique(cells), np.arange(12 * 4**2))
+
+
+def test_healpix_index_is_nested():
+    ra, dec = random_sky(10000)
+    np.testing.assert_array_equal(
+        healpix_index(ra, dec, 5) >> 2, healpix_index(ra, dec, 4)
+    )
+
+
+@pytest.fixture
+def field(tmp_path):
+    """
+    A catalog of stars scattered around RA 0, Dec 0, and near the pole
+    """
+    rng = np.random.default_rng(2)
+    centres = [(0.0, 0.0), (359.9, -0.2), (45.0, 89.5)]
+    ra, dec = [], []
+    for ra0, dec0 in centres:
+        dx, dy = rng.uniform(-1, 1, (2, 3000))
+        r, d = add_offsets_radec(ra0, dec0, dx, dy)
+        ra.append(r)
+        dec.append(d)
+    ra, dec = np.concatenate(ra), np.concatenate(dec)
+    mag = rng.uniform(8, 20, len(ra))
+    write_catalog(str(tmp_path), ra, dec, mag, order=7, ident=np.arange(len(ra)))
+    return StarCatalog(str(tmp_path)), ra, dec, mag
+
+
+@pytest.mark.parametrize(
+    "ra0, dec0, radius",
+    [(0.0, 0.0, 0.3), (359.95, 0.1, 0.5), (0.05, -0.3, 0.05), (200.0, 89.6, 0.4)],
+)
+def test_cone_matches_brute_force(field, ra0, dec0, radius):
+    catalog, ra, dec, mag = field
+    expected = np.flatnonzero(angular_separation(ra0, dec0, ra, dec) <= radius)
+    sources = catalog.cone(ra0, dec0, radius)
+    assert len(expected) > 0
+    assert sorted(sources["ident"]) == sorted(expected)
+    np.testing.assert_array_equal(sources["ra"], ra[sources["ident"]])
+    assert np.all(np.diff(sources["mag"]) >= 0)
+
+
+def test_cone_mag_limit(field):
+    catalog, ra, dec, mag = field
+    keep = (angular_separation(0.0, 0.0, ra, dec) <= 0.5) & (mag <= 12)
+    sources = catalog.cone(0.0, 0.0, 0.5, mag_limit=12)
+    assert sorted(sources["ident"]) == sorted(np.flatnonzero(keep))
+
+
+def test_cone_is_cached(field):
+    catalog = field[0]
+    assert catalog.cone(0.0, 0.0, 0.2) is catalog.cone(0.0, 0.0, 0.2)
+
+
+def test_propagate_positions():
+    ra, dec = propagate_positions(
+        [10.0, 10.0, 10.0],
+        [60.0, 60.0, 60.0],
+        [1000.0, 0.0, np.nan],
+        [0.0, 1000.0, 0.0],
+        36,
+    )
+    # 36 arcsec in 36 years, with the RA motion including cos(dec)
+    sep = 3600 * angular_separation(10.0, 60.0, ra, dec)
+    np.testing.assert_allclose(sep, [36, 36, 0], atol=1e-6)
+    assert ra[0] == pytest.approx(10 + 0.02, rel=1e-6)
+    assert dec[1] == pytest.approx(60 + 0.01, rel=1e-6)
+
+
+def test_cone_moves_stars_to_epoch(tmp_path):
+    # a fast star 20 arcsec North of the cone edge, moving South into it,
+    # and a still one just inside the cone
+    ra = np.array([150.0, 150.0])
+    dec = np.array([20.0 + 30 / 3600, 20.0 + 9 / 3600])
+    write_catalog(
+        str(tmp_path),
+        ra,
+        dec,
+        [10.0, 11.0],
+        epoch=2016.0,
+        pmra=[0.0, 0.0],
+        pmdec=[-5000.0, 0.0],
+    )
+    catalog = StarCatalog(str(tmp_path))
+    radius = 10 / 3600
+    assert len(catalog.cone(150.0, 20.0, radius)["ra"]) == 1
+    sources = catalog.cone(150.0, 20.0, radius, epoch=2021.0)
+    assert len(sources["ra"]) == 2
+    assert 3600 * (sources["dec"][0] - 20.0) == pytest.approx(5.0, abs=1e-6)
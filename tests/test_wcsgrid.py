@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for `hcam_finder.wcsgrid`.
+"""
+import logging
+
+import numpy as np
+import pytest
+from ginga.util import dp
+
+from hcam_finder.wcsgrid import GridWCS
+
+TOL = 0.05
+
+
+def make_image(ra, dec, size=2000, px_scale=1.0, rotation=20.0):
+    return dp.create_blank_image(
+        ra,
+        dec,
+        size * px_scale / 3600,
+        px_scale / 3600,
+        rotation,
+        cdbase=[-1, 1],
+        logger=logging.getLogger("test"),
+    )
+
+
+def separation(ra1, dec1, ra2, dec2):
+    """
+    Small separations (arcsec)
+    """
+    dra = ((ra1 - ra2 + 180) % 360 - 180) * np.cos(np.radians(dec2))
+    return 3600 * np.hypot(dra, dec1 - dec2)
+
+
+# the second field straddles RA = 0, the third is close to the pole
+@pytest.mark.parametrize("ra, dec", [(150.0, -30.0), (0.05, 10.0), (80.0, 88.0)])
+def test_grid_wcs_matches_exact(ra, dec):
+    image = make_image(ra, dec)
+    grid = GridWCS(image, tol=TOL)
+    assert grid.valid and grid.error <= TOL
+
+    rng = np.random.default_rng(5)
+    x = rng.uniform(-0.5, image.width - 0.5, 2000)
+    y = rng.uniform(-0.5, image.height - 0.5, 2000)
+    sky = np.asarray(image.wcs.datapt_to_wcspt(np.column_stack((x, y))))
+    ra_est, dec_est = grid.pixtoradec(x, y)
+    assert np.all(separation(ra_est, dec_est, sky[:, 0], sky[:, 1]) < TOL)
+    assert np.all((ra_est >= 0) & (ra_est < 360))
+
+    # single positions take a quicker path to the same answer
+    for n in range(10):
+        ra1, dec1 = grid.pixtoradec(float(x[n]), float(y[n]))
+        assert (ra1, dec1) == pytest.approx((ra_est[n], dec_est[n]), abs=1e-10)
+
+
+def test_grid_wcs_refines_spacing():
+    image = make_image(150.0, -30.0, size=1000, px_scale=10.0)
+    coarse = GridWCS(image, tol=10.0)
+    fine = GridWCS(image, tol=TOL)
+    assert coarse.valid and fine.valid
+    assert fine.spacing < coarse.spacing
+    assert fine.error <= TOL < coarse.error
+
+
+def test_grid_wcs_gives_up():
+    image = make_image(150.0, -30.0, size=1000, px_scale=10.0)
+    grid = GridWCS(image, tol=1e-6, min_spacing=32)
+    assert not grid.valid and grid.error > 1e-6